@@ -0,0 +1,85 @@
+"""Compares one batch /funFacts request against N single-landmark requests.
+
+Runs the GET handler in-process against moto with a simulated DynamoDB
+round trip, since moto itself answers in microseconds. API Gateway and
+Lambda invocation overhead is not included, so the real saving per
+avoided request is larger than shown here.
+
+    python -m benchmarks.batch_fun_facts --landmarks 20 --latency-ms 10
+"""
+import argparse
+import importlib
+import statistics
+import time
+
+import boto3
+from moto import mock_aws
+
+from benchmarks.local_aws import add_latency, create_bucket, create_tables
+
+
+def seed(dynamodb, landmarks, facts_per_landmark):
+    table = dynamodb.Table("FunFact")
+    with table.batch_writer() as batch:
+        for i in range(landmarks):
+            for j in range(facts_per_landmark):
+                batch.put_item(Item={
+                    "landmarkId": f"L{i}",
+                    "funFactId": f"L{i}-F{j}",
+                    "funFactTitle": f"Fun fact {j}",
+                    "description": "x" * 300,
+                    "imageName": f"L{i}-F{j}",
+                })
+    return [f"L{i}" for i in range(landmarks)]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--landmarks", type=int, default=20)
+    parser.add_argument("--facts", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb")
+        create_tables(dynamodb)
+        create_bucket(boto3.client("s3"))
+        landmark_ids = seed(dynamodb, args.landmarks, args.facts)
+
+        get_fun_fact = importlib.import_module("get_fun_fact")
+        add_latency(get_fun_fact.clients.client("dynamodb"), args.latency_ms / 1000)
+
+        def sequential():
+            get_fun_fact.read_cache.clear()
+            for landmark_id in landmark_ids:
+                get_fun_fact.handler({"resource": "/funFacts",
+                                      "queryStringParameters": {"landmarkId": landmark_id}}, None)
+
+        def batch():
+            get_fun_fact.read_cache.clear()
+            get_fun_fact.handler({"resource": "/funFacts",
+                                  "queryStringParameters": {"landmarkIds": ",".join(landmark_ids)}}, None)
+
+        sequential_ms = timed(sequential, args.repeat)
+        batch_ms = timed(batch, args.repeat)
+
+    print(f"landmarks={args.landmarks} facts/landmark={args.facts} "
+          f"simulated RTT={args.latency_ms:g} ms concurrency={get_fun_fact.BATCH_CONCURRENCY}")
+    print(f"{'mode':<24}{'median ms':>12}")
+    print(f"{'sequential x' + str(args.landmarks):<24}{sequential_ms:>12.1f}")
+    print(f"{'batch x1':<24}{batch_ms:>12.1f}")
+    print(f"speedup: {sequential_ms / batch_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
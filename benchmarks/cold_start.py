@@ -0,0 +1,87 @@
+"""Import and init time per Lambda handler, each in a fresh interpreter.
+
+Every run copies exactly the files a function is packaged with
+(HANDLER_MODULES in the stack) into a temporary directory and imports
+the handler there, so a module missing from the package fails here
+before it fails in Lambda. Init time is the cost of creating each AWS
+client the handler uses on its first request.
+
+    python -m benchmarks.cold_start --runs 10
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.local_aws import LAMBDA_DIR
+from fun_facts_backend.fun_facts_backend_stack import HANDLER_MODULES
+
+# Clients each handler creates while serving a typical first request
+HANDLER_SERVICES = {
+    "GetFunFactHandler": ["dynamodb", "s3"],
+    "AddFunFactHandler": ["dynamodb"],
+    "UserHandler": ["dynamodb"],
+    "InteractionHandler": ["dynamodb"],
+    "LikeAggregator": ["dynamodb"],
+    "SearchIndexBuilder": ["dynamodb", "s3"],
+    "SnapshotGenerator": ["dynamodb", "s3"],
+    "ImageProcessor": ["dynamodb", "s3"],
+    "LeaderboardUpdater": ["dynamodb"],
+    "ClusterUpdater": ["dynamodb"],
+}
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+import clients
+services = {{}}
+for service in {services!r}:
+    service_start = time.perf_counter()
+    clients.{factory}(service)
+    services[service] = (time.perf_counter() - service_start) * 1000
+print(json.dumps({{"import_ms": (imported - start) * 1000, "services_ms": services}}))
+"""
+
+
+def measure(function_id):
+    """Runs one cold import of a function's package and returns its timings."""
+    modules = HANDLER_MODULES[function_id]
+    with tempfile.TemporaryDirectory() as package_dir:
+        for module in modules:
+            shutil.copy(os.path.join(LAMBDA_DIR, f"{module}.py"), package_dir)
+
+        # The user handler works through the DynamoDB resource layer
+        factory = "resource" if modules[0] == "add_fun_fact" else "client"
+        code = CHILD.format(module=modules[0], services=HANDLER_SERVICES[function_id], factory=factory)
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1", AWS_DEFAULT_REGION="us-east-1")
+        env.pop("PYTHONPATH", None)
+        result = subprocess.run([sys.executable, "-c", code], cwd=package_dir, env=env,
+                                capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'function':<20}{'files':>6}{'import ms':>11}  init ms per client")
+    for function_id, modules in HANDLER_MODULES.items():
+        runs = [measure(function_id) for _ in range(args.runs)]
+        import_ms = statistics.median(run["import_ms"] for run in runs)
+        services = {
+            service: statistics.median(run["services_ms"][service] for run in runs)
+            for service in HANDLER_SERVICES[function_id]
+        }
+        init = ", ".join(f"{service} {ms:.1f}" for service, ms in services.items())
+        print(f"{function_id:<20}{len(modules):>6}{import_ms:>11.1f}  {init}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Compression level vs. CPU time vs. bytes saved for GET payloads.
+
+Builds representative /funFacts, /landmarks and batch /funFacts bodies
+from firestore_data/, with real-length presigned image URLs, and
+compresses each with every gzip level (and brotli quality if the
+brotli package is installed).
+
+    python -m benchmarks.compression
+"""
+import argparse
+import json
+import os
+import time
+
+import boto3
+
+import benchmarks.local_aws  # noqa: F401  (puts lambda/ on sys.path)
+import compression
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "firestore_data")
+
+
+def load(name):
+    with open(os.path.join(DATA_DIR, name)) as f:
+        return json.load(f)
+
+
+def payloads():
+    s3 = boto3.client("s3")
+
+    def with_url(item, image_attribute):
+        url = s3.generate_presigned_url("get_object", Params={"Bucket": "fun-facts-images",
+                                                              "Key": f"{item[image_attribute]}.jpeg"}, ExpiresIn=3600)
+        return dict(item, imageUrl=url)
+
+    fun_facts = [with_url(fun_fact, "imageName") for fun_fact in load("funFacts.json")]
+    landmarks = [with_url(landmark, "image") for landmark in load("landmarks.json")]
+
+    by_landmark = {}
+    for fun_fact in fun_facts:
+        by_landmark.setdefault(fun_fact["landmarkId"], []).append(fun_fact)
+    batch = {"results": {landmark_id: {"items": items} for landmark_id, items in list(by_landmark.items())[:25]},
+             "errors": {}}
+
+    encode = json.JSONEncoder(separators=(",", ":")).encode
+    return {
+        "funFacts x20": encode(fun_facts[:20]).encode(),
+        "landmarks x20": encode(landmarks[:20]).encode(),
+        "batch x25": encode(batch).encode(),
+    }
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    settings = [("gzip", level) for level in range(1, 10)]
+    if compression.brotli:
+        settings += [("br", quality) for quality in (0, 1, 2, 4, 5, 6, 9, 11)]
+
+    print(f"{'payload':<15}{'encoding':<10}{'level':>6}{'bytes':>9}{'ratio':>8}{'saved':>9}{'ms':>8}")
+    for name, data in payloads().items():
+        print(f"{name:<15}{'identity':<10}{'-':>6}{len(data):>9}{1:>8.2f}{0:>9}{0:>8.2f}")
+        for encoding, level in settings:
+            compressed, ms = best_of(lambda: compression.compress(data, encoding, level), args.repeat)
+            print(f"{name:<15}{encoding:<10}{level:>6}{len(compressed):>9}"
+                  f"{len(compressed) / len(data):>8.2f}{len(data) - len(compressed):>9}{ms:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
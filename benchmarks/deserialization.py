@@ -0,0 +1,75 @@
+"""Micro-benchmark of DynamoDB response conversion for the GET handler.
+
+Compares the boto3 resource path (TypeDeserializer to Decimal, then
+json.dumps with a Decimal default hook) against the dynamo module's
+direct conversion to ints and floats and a pre-built encoder, over
+items shaped like firestore_data/funFacts.json.
+
+    python -m benchmarks.deserialization --scales 10 100 1000
+"""
+import argparse
+import json
+import os
+import time
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+import benchmarks.local_aws  # noqa: F401  (puts lambda/ on sys.path)
+import dynamo
+from get_fun_fact import decimal_default, json_encoder
+
+FUN_FACTS_PATH = os.path.join(os.path.dirname(__file__), "..", "firestore_data", "funFacts.json")
+
+
+def load_wire_items(scale):
+    # Attribute-value items as the low-level client returns them
+    with open(FUN_FACTS_PATH) as f:
+        fun_facts = json.load(f, parse_float=Decimal)
+
+    serializer = TypeSerializer()
+    base = [{name: serializer.serialize(value) for name, value in fun_fact.items()} for fun_fact in fun_facts]
+    items = []
+    for i in range(scale):
+        for item in base:
+            item = dict(item, funFactId={"S": f"{item['id']['S']}-{i}"})
+            items.append(item)
+    return items
+
+
+def resource_path(items):
+    deserializer = TypeDeserializer()
+    converted = [{name: deserializer.deserialize(value) for name, value in item.items()} for item in items]
+    return json.dumps(converted, default=decimal_default)
+
+
+def fast_path(items):
+    return json_encoder.encode([dynamo.deserialize_item(item) for item in items])
+
+
+def best_of(fn, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(items)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6}{'items':>9}{'resource ms':>14}{'fast ms':>10}{'speedup':>9}")
+    for scale in args.scales:
+        items = load_wire_items(scale)
+        assert json.loads(resource_path(items[:200])) == json.loads(fast_path(items[:200]))
+        resource_ms = best_of(resource_path, items, args.repeat)
+        fast_ms = best_of(fast_path, items, args.repeat)
+        print(f"{scale:>5}x{len(items):>9}{resource_ms:>14.1f}{fast_ms:>10.1f}{resource_ms / fast_ms:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
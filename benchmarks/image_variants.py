@@ -0,0 +1,74 @@
+"""Bytes saved per view by serving resized image variants.
+
+Uploads sample photos to a local moto S3 bucket, runs the image processor
+on them as S3 would, and reports the bytes a client downloads for each
+app view with and without the size hint. Images are left unprocessed in
+the given fraction to show the fallback to originals.
+
+    python -m benchmarks.image_variants --images 20 --unprocessed 0.1
+"""
+import argparse
+
+import boto3
+from moto import mock_aws
+
+from benchmarks import synthetic
+from benchmarks.local_aws import create_bucket, create_tables
+import dynamo
+import image_processor
+import images
+
+BUCKET = "fun-facts-images"
+
+# App views, the size hint each uses and how many images it shows
+VIEWS = {
+    "map list": ("thumb", 20),
+    "landmark card": ("small", 5),
+    "fun fact detail": ("medium", 1),
+}
+
+
+def s3_event(key):
+    return {"Records": [{"s3": {"bucket": {"name": BUCKET}, "object": {"key": key}}}]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--unprocessed", type=float, default=0.1, help="Fraction of images left unprocessed")
+    args = parser.parse_args()
+
+    with mock_aws():
+        create_tables(boto3.resource("dynamodb"))
+        s3 = boto3.client("s3")
+        create_bucket(s3)
+
+        names = [f"sample-{i}" for i in range(args.images)]
+        processed = names[:round(len(names) * (1 - args.unprocessed))]
+        for seed, name in enumerate(names):
+            s3.put_object(Bucket=BUCKET, Key=images.original_key(name), Body=synthetic.sample_jpeg(seed=seed))
+        for name in processed:
+            image_processor.handler(s3_event(images.original_key(name)), None)
+
+        records = {item["imageName"]: item for item in dynamo.batch_get(
+            boto3.client("dynamodb"), images.image_variants_table_name, [{"imageName": name} for name in names])}
+        original_bytes = {
+            name: s3.head_object(Bucket=BUCKET, Key=images.original_key(name))["ContentLength"] for name in names
+        }
+
+    print(f"{len(processed)}/{len(names)} images processed")
+    print(f"{'view':<18}{'format':>7}{'images':>8}{'original KB':>13}{'served KB':>11}{'saved':>8}")
+    for view, (size, count) in VIEWS.items():
+        shown = (names * count)[:count]
+        for image_format in images.VARIANT_FORMATS:
+            original = sum(original_bytes[name] for name in shown)
+            # Without a variant the handler serves the original
+            served = sum(records.get(name, {}).get("variants", {}).get(images.variant_id(size, image_format),
+                                                                        original_bytes[name])
+                         for name in shown)
+            print(f"{view:<18}{image_format:>7}{count:>8}{original / 1024:>13.0f}{served / 1024:>11.0f}"
+                  f"{1 - served / original:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+"""Load test of the GET and user handlers against the local stand-in.
+
+Seeds moto with synthetic data at each scale factor, then drives each
+workload, a weighted mix of endpoints, at a fixed concurrency. Every
+workload runs in a child forked from the seeded process, so its caches
+start cold and its peak RSS is its own. Reports latency percentiles and
+throughput per endpoint, DynamoDB capacity as the stand-in reports it,
+and peak RSS per workload; --profile adds the handlers' own per-phase
+metrics. Single-endpoint workloads give per-endpoint capacity and memory.
+Results are written as JSON so runs on two commits can be compared with
+--baseline.
+
+    python -m benchmarks.load_test --scales 1 100 --requests 2000 --out results.json
+    python -m benchmarks.load_test --scales 100 --workloads browse --baseline results.json
+
+Handlers run in-process, so API Gateway and Lambda overheads are not
+included; --latency-ms adds a simulated DynamoDB round trip. Scale 10000
+seeds about 2.3 million items into moto's memory and needs several GB of
+RAM and a long seeding phase.
+"""
+import argparse
+import datetime
+import importlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from moto import mock_aws
+
+from benchmarks import synthetic
+from benchmarks.local_aws import LAMBDA_DIR, CapacityMeter, add_latency, create_bucket, create_tables
+import cluster_updater
+import search
+
+LOADER_PATH = os.path.join(os.path.dirname(__file__), "..", "scripts", "add_dynamodb_data.py")
+BUCKET = "fun-facts-images"
+
+SEARCH_QUERIES = ["empire state", "#flatiron", "brooklyn bridge", "ghost", "central park", "built in 1931",
+                  "#empirestate observation deck", "subway"]
+
+
+class Data:
+    """Ids and coordinates of the seeded data that workloads draw from."""
+
+    def __init__(self, landmarks, users):
+        self.landmark_ids = [landmark["id"] for landmark in landmarks]
+        self.coordinates = [(float(landmark["coordinates"]["latitude"]), float(landmark["coordinates"]["longitude"]))
+                            for landmark in landmarks]
+        self.users = users
+        # Last ETag seen per landmark, for revalidating clients
+        self.etags = {}
+
+
+def get_fun_facts(rng, data):
+    return "get", {"resource": "/funFacts", "queryStringParameters": {"landmarkId": rng.choice(data.landmark_ids)}}
+
+
+def get_fun_facts_summary(rng, data):
+    return "get", {"resource": "/funFacts", "queryStringParameters": {
+        "landmarkId": rng.choice(data.landmark_ids), "fields": "summary"}}
+
+
+def get_fun_facts_batch(rng, data):
+    landmark_ids = rng.sample(data.landmark_ids, min(10, len(data.landmark_ids)))
+    return "get", {"resource": "/funFacts", "queryStringParameters": {"landmarkIds": ",".join(landmark_ids)}}
+
+
+def revalidate_fun_facts(rng, data):
+    landmark_id = rng.choice(data.landmark_ids)
+    event = {"resource": "/funFacts", "queryStringParameters": {"landmarkId": landmark_id}}
+    if landmark_id in data.etags:
+        event["headers"] = {"If-None-Match": data.etags[landmark_id]}
+    return "get", event
+
+
+def get_landmark_detail(rng, data):
+    return "get", {"resource": "/landmarks/{id}", "pathParameters": {"id": rng.choice(data.landmark_ids)},
+                   "queryStringParameters": None}
+
+
+def get_landmarks(rng, data):
+    return "get", {"resource": "/landmarks", "queryStringParameters": {"pageSize": "50"}}
+
+
+def get_nearby(rng, data):
+    latitude, longitude = rng.choice(data.coordinates)
+    return "get", {"resource": "/landmarks", "queryStringParameters": {
+        "lat": str(latitude + rng.uniform(-0.005, 0.005)),
+        "lon": str(longitude + rng.uniform(-0.005, 0.005)),
+        "radius": "1000",
+    }}
+
+
+def get_clusters(rng, data):
+    # A map 4 tiles wide and 3 high around a landmark
+    latitude, longitude = rng.choice(data.coordinates)
+    zoom = rng.randint(8, 14)
+    half_width = 2 * 360 / 2 ** zoom
+    half_height = 0.75 * half_width
+    return "get", {"resource": "/landmarks", "queryStringParameters": {
+        "bbox": f"{latitude - half_height},{longitude - half_width},{latitude + half_height},{longitude + half_width}",
+        "zoom": str(zoom),
+    }}
+
+
+def get_search(rng, data):
+    return "get", {"resource": "/search", "queryStringParameters": {"q": rng.choice(SEARCH_QUERIES)}}
+
+
+def post_user(rng, data):
+    return "user", {"body": json.dumps(rng.choice(data.users))}
+
+
+def post_users_batch(rng, data):
+    return "user", {"body": json.dumps({"users": rng.sample(data.users, min(25, len(data.users)))})}
+
+
+ENDPOINTS = {
+    "GET /funFacts": get_fun_facts,
+    "GET /funFacts summary": get_fun_facts_summary,
+    "GET /funFacts batch": get_fun_facts_batch,
+    "GET /funFacts revalidate": revalidate_fun_facts,
+    "GET /landmarks": get_landmarks,
+    "GET /landmarks/{id}": get_landmark_detail,
+    "GET /landmarks nearby": get_nearby,
+    "GET /landmarks clusters": get_clusters,
+    "GET /search": get_search,
+    "POST /users": post_user,
+    "POST /users batch": post_users_batch,
+}
+
+# Weighted endpoint mixes; every endpoint also runs alone as its own workload
+WORKLOADS = dict(
+    {name: {name: 1} for name in ENDPOINTS},
+    browse={"GET /funFacts": 35, "GET /funFacts revalidate": 20, "GET /landmarks nearby": 20, "GET /landmarks": 10,
+            "GET /search": 10, "POST /users": 5},
+    sync={"POST /users": 40, "POST /users batch": 10, "GET /funFacts batch": 30, "GET /funFacts": 20},
+)
+
+
+def load_loader():
+    spec = importlib.util.spec_from_file_location("add_dynamodb_data", LOADER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def seed(scale):
+    """Loads scaled landmarks, fun facts and users, builds the cluster pyramid and publishes the search index.
+
+    Returns a Data.
+    """
+    loader = load_loader()
+    client = boto3.client("dynamodb")
+    landmarks = [loader.clean_landmark(record) for record in synthetic.landmarks(scale)]
+    fun_facts = [loader.clean_fun_fact(record) for record in synthetic.fun_facts(scale)]
+    # One worker: moto's backend is not safe under concurrent writes
+    loader.load_records(landmarks, "Landmark", workers=1, client=client)
+    cluster_updater.rebuild_all()
+    loader.load_records(fun_facts, "FunFact", workers=1, client=client)
+    users = list(synthetic.users(scale))
+    loader.load_records(users, "User", workers=1, client=client)
+    search.publish_index(boto3.client("s3"), BUCKET, search.build_index(fun_facts))
+    return Data(landmarks, users)
+
+
+def fresh_handlers():
+    # Import the handlers in the workload's process so no warm state is shared
+    for module_name, module in list(sys.modules.items()):
+        if getattr(module, "__file__", None) and module.__file__.startswith(LAMBDA_DIR):
+            del sys.modules[module_name]
+    return importlib.import_module("get_fun_fact"), importlib.import_module("add_fun_fact")
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def percentile(sorted_samples, fraction):
+    return sorted_samples[min(len(sorted_samples) - 1, int(len(sorted_samples) * fraction))]
+
+
+def summarize(samples, seconds):
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "throughput": round(len(samples) / seconds, 1),
+        "meanMs": round(statistics.fmean(samples), 3),
+        "p50Ms": round(percentile(samples, 0.50), 3),
+        "p95Ms": round(percentile(samples, 0.95), 3),
+        "p99Ms": round(percentile(samples, 0.99), 3),
+    }
+
+
+def run_workload(workload, data, args):
+    """Runs one workload in the current process and returns its results."""
+    start_rss = current_rss_mb()
+    if args.profile:
+        os.environ["METRICS_OUTPUT"] = "profile"
+    get_fun_fact, add_fun_fact = fresh_handlers()
+    handlers = {"get": get_fun_fact.handler, "user": add_fun_fact.handler}
+
+    meter = CapacityMeter()
+    for client in (get_fun_fact.clients.client("dynamodb"), add_fun_fact.clients.resource("dynamodb").meta.client):
+        meter.attach(client)
+        if args.latency_ms:
+            add_latency(client, args.latency_ms / 1000)
+
+    mix = WORKLOADS[workload]
+    names = list(mix)
+    weights = [mix[name] for name in names]
+
+    def request(i):
+        rng = random.Random(args.seed * 1_000_003 + i)
+        endpoint = rng.choices(names, weights)[0]
+        handler_name, event = ENDPOINTS[endpoint](rng, data)
+        started = time.perf_counter()
+        try:
+            response = handlers[handler_name](event, None)
+            ok = response["statusCode"] < 500
+        except Exception:
+            response = None
+            ok = False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if response and endpoint == "GET /funFacts revalidate" and "ETag" in response.get("headers", {}):
+            data.etags[event["queryStringParameters"]["landmarkId"]] = response["headers"]["ETag"]
+        return endpoint, elapsed_ms, ok
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        # Warm up connections, clients and caches before measuring
+        list(pool.map(request, range(-args.warmup, 0)))
+        meter.reset()
+        get_fun_fact.metrics.reset()
+        started = time.perf_counter()
+        results = list(pool.map(request, range(args.requests)))
+        seconds = time.perf_counter() - started
+
+    endpoints = {}
+    for name in names:
+        samples = [elapsed_ms for endpoint, elapsed_ms, _ in results if endpoint == name]
+        if samples:
+            endpoints[name] = dict(summarize(samples, seconds),
+                                   errors=sum(1 for endpoint, _, ok in results if endpoint == name and not ok))
+
+    peak = peak_rss_mb()
+    profile = None
+    if args.profile:
+        print(f"{workload}\n{get_fun_fact.metrics.summary()}", file=sys.stderr)
+        profile = get_fun_fact.metrics.profile()
+    return {
+        "workload": workload,
+        "concurrency": args.concurrency,
+        "requests": args.requests,
+        "seconds": round(seconds, 3),
+        "throughput": round(args.requests / seconds, 1),
+        "errors": sum(1 for _, _, ok in results if not ok),
+        "readCapacity": round(meter.read, 1),
+        "writeCapacity": round(meter.write, 1),
+        "capacityPerRequest": round((meter.read + meter.write) / args.requests, 3),
+        "peakRssMb": round(peak, 1),
+        "rssGrowthMb": round(max(peak - start_rss, 0.0), 1),
+        "endpoints": endpoints,
+        "profile": profile,
+    }
+
+
+def _child(workload, data, args, conn):
+    try:
+        conn.send(run_workload(workload, data, args))
+    except BaseException as e:
+        conn.send({"workload": workload, "failed": repr(e)})
+    finally:
+        conn.close()
+
+
+def run_isolated(workload, data, args):
+    # fork keeps the seeded moto backend; the child's changes die with it
+    context = multiprocessing.get_context("fork")
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_child, args=(workload, data, args, sender))
+    process.start()
+    sender.close()
+    result = receiver.recv()
+    process.join()
+    return result
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                  check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, check=True).stdout.strip())
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    previous = {}
+    for result in (baseline or {}).get("results", []):
+        for endpoint, stats in result.get("endpoints", {}).items():
+            previous[(result["scale"], result["workload"], endpoint)] = stats
+
+    print(f"{'scale':>6} {'workload':<26}{'endpoint':<26}{'req/s':>9}{'p50':>8}{'p95':>8}{'p99':>8}{'err':>5}"
+          f"{'cap/req':>9}{'rss MB':>8}" + ("  p95 vs baseline" if baseline else ""))
+    for result in results:
+        if "failed" in result:
+            print(f"{result['scale']:>5}x {result['workload']:<26}failed: {result['failed']}")
+            continue
+        for endpoint, stats in result["endpoints"].items():
+            line = (f"{result['scale']:>5}x {result['workload']:<26}{endpoint:<26}{stats['throughput']:>9.1f}"
+                    f"{stats['p50Ms']:>8.2f}{stats['p95Ms']:>8.2f}{stats['p99Ms']:>8.2f}{stats['errors']:>5}"
+                    f"{result['capacityPerRequest']:>9.2f}{result['peakRssMb']:>8.0f}")
+            before = previous.get((result["scale"], result["workload"], endpoint))
+            if before:
+                line += f"  {stats['p95Ms'] / before['p95Ms'] - 1:+.0%}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--workloads", nargs="+", choices=sorted(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=1000, help="Measured requests per workload")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per workload")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Simulated DynamoDB round trip")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", action="store_true", help="Report the handlers' per-phase metrics")
+    parser.add_argument("--out", help="Write results as JSON")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare p95 latency against")
+    args = parser.parse_args()
+
+    results = []
+    for scale in args.scales:
+        with mock_aws():
+            create_tables(boto3.resource("dynamodb"))
+            create_bucket(boto3.client("s3"))
+            started = time.perf_counter()
+            data = seed(scale)
+            print(f"Seeded {scale}x in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+            for workload in args.workloads:
+                results.append(dict(run_isolated(workload, data, args), scale=scale))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({
+                "revision": git_revision(),
+                "createdAt": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": vars(args),
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
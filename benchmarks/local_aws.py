@@ -0,0 +1,173 @@
+"""Local DynamoDB/S3 stand-in for tests and benchmarks, backed by moto."""
+import os
+import sys
+import threading
+import time
+
+import boto3
+
+# The Lambda handlers live in lambda/, which is not an importable package name
+LAMBDA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lambda"))
+if LAMBDA_DIR not in sys.path:
+    sys.path.insert(0, LAMBDA_DIR)
+
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+os.environ.setdefault("AWS_ACCESS_KEY_ID", "testing")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "testing")
+
+
+def create_tables(dynamodb):
+    # Mirrors the tables defined in FunFactsBackendStack
+    dynamodb.create_table(
+        TableName="Landmark",
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[
+            {"AttributeName": "id", "AttributeType": "S"},
+            {"AttributeName": "geohashPrefix", "AttributeType": "S"},
+            {"AttributeName": "geohash", "AttributeType": "S"},
+            {"AttributeName": "city", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": "geohashIndex",
+            "KeySchema": [
+                {"AttributeName": "geohashPrefix", "KeyType": "HASH"},
+                {"AttributeName": "geohash", "KeyType": "RANGE"},
+            ],
+            "Projection": {"ProjectionType": "ALL"},
+        }, {
+            "IndexName": "cityIndex",
+            "KeySchema": [{"AttributeName": "city", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="FunFact",
+        KeySchema=[
+            {"AttributeName": "landmarkId", "KeyType": "HASH"},
+            {"AttributeName": "funFactId", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "landmarkId", "AttributeType": "S"},
+            {"AttributeName": "funFactId", "AttributeType": "S"},
+        ],
+        GlobalSecondaryIndexes=[{
+            "IndexName": "summaryIndex",
+            "KeySchema": [
+                {"AttributeName": "landmarkId", "KeyType": "HASH"},
+                {"AttributeName": "funFactId", "KeyType": "RANGE"},
+            ],
+            "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["funFactTitle", "imageName", "likes"]},
+        }],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="User",
+        KeySchema=[{"AttributeName": "userId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "userId", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="UserInteraction",
+        KeySchema=[
+            {"AttributeName": "userId", "KeyType": "HASH"},
+            {"AttributeName": "interactionId", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "userId", "AttributeType": "S"},
+            {"AttributeName": "interactionId", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="LikeCounter",
+        KeySchema=[{"AttributeName": "counterId", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "counterId", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="ImageVariant",
+        KeySchema=[{"AttributeName": "imageName", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "imageName", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="Leaderboard",
+        KeySchema=[{"AttributeName": "city", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "city", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="LandmarkCluster",
+        KeySchema=[
+            {"AttributeName": "tile", "KeyType": "HASH"},
+            {"AttributeName": "cell", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "tile", "AttributeType": "S"},
+            {"AttributeName": "cell", "AttributeType": "S"},
+        ],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    dynamodb.create_table(
+        TableName="LandmarkClusterMember",
+        KeySchema=[{"AttributeName": "id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+
+def create_bucket(s3):
+    s3.create_bucket(Bucket="fun-facts-images")
+
+
+def add_latency(client, seconds, operations=("Query", "Scan", "GetItem", "BatchGetItem", "PutItem",
+                                              "UpdateItem", "BatchWriteItem", "DeleteItem")):
+    """Sleeps before each call to emulate the network round trip moto does not have."""
+    def sleep(**kwargs):
+        time.sleep(seconds)
+
+    service = client.meta.service_model.service_name
+    for operation in operations:
+        client.meta.events.register(f"before-call.{service}.{operation}", sleep)
+
+
+READ_OPERATIONS = ("GetItem", "Query", "Scan", "BatchGetItem", "TransactGetItems")
+WRITE_OPERATIONS = ("PutItem", "UpdateItem", "DeleteItem", "BatchWriteItem", "TransactWriteItems")
+
+
+class CapacityMeter:
+    """Sums the DynamoDB capacity reported to the clients it is attached to.
+
+    Every call is made with ReturnConsumedCapacity=TOTAL unless it asks for
+    more already. moto's figures follow the item-size rules only roughly.
+    """
+
+    def __init__(self):
+        self.read = 0.0
+        self.write = 0.0
+        self._lock = threading.Lock()
+
+    def attach(self, client):
+        def request_capacity(params, **kwargs):
+            params.setdefault("ReturnConsumedCapacity", "TOTAL")
+
+        def record(parsed, model, **kwargs):
+            capacity = parsed.get("ConsumedCapacity") or []
+            if isinstance(capacity, dict):
+                capacity = [capacity]
+            units = sum(entry.get("CapacityUnits", 0) for entry in capacity)
+            with self._lock:
+                if model.name in READ_OPERATIONS:
+                    self.read += units
+                else:
+                    self.write += units
+
+        for operation in READ_OPERATIONS + WRITE_OPERATIONS:
+            client.meta.events.register(f"provide-client-params.dynamodb.{operation}", request_capacity)
+            client.meta.events.register(f"after-call.dynamodb.{operation}", record)
+
+    def reset(self):
+        with self._lock:
+            self.read = 0.0
+            self.write = 0.0
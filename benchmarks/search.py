@@ -0,0 +1,94 @@
+"""Search index build, load and query cost on a scaled fun fact corpus.
+
+Builds the index from synthetic fun facts cleaned like the loader does,
+then times loading the gzipped artifact and answering a fixed query mix,
+against a linear substring match over the same facts (what a filtered
+table scan does, without its network and read costs).
+
+    python -m benchmarks.search --scales 1 100
+"""
+import argparse
+import gzip
+import importlib.util
+import os
+import statistics
+import time
+
+import benchmarks.local_aws  # noqa: F401  (puts lambda/ on sys.path)
+import search
+from benchmarks import synthetic
+
+LOADER_PATH = os.path.join(os.path.dirname(__file__), "..", "scripts", "add_dynamodb_data.py")
+
+QUERIES = ["empire state", "#flatiron", "brooklyn bridge history", "ghost", "central park #centralpark",
+           "built in 1931", "movie filmed here", "#empirestate observation deck"]
+
+
+def load_loader():
+    spec = importlib.util.spec_from_file_location("add_dynamodb_data", LOADER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def linear_search(fun_facts, text, limit):
+    terms, tags = search.parse_query(text)
+    hits = []
+    for fun_fact in fun_facts:
+        fact_tags = {search.normalize_tag(tag) for tag in fun_fact.get("tags") or ()}
+        if not set(tags) <= fact_tags:
+            continue
+        haystack = f"{fun_fact.get('funFactTitle', '')} {fun_fact.get('description', '')}".lower()
+        score = sum(haystack.count(term) for term in terms) + len(tags)
+        if score:
+            hits.append((score, fun_fact["funFactId"]))
+    hits.sort(reverse=True)
+    return hits[:limit]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return samples[len(samples) // 2], samples[int(len(samples) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 100])
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    loader = load_loader()
+
+    print(f"{'scale':>6}{'facts':>8}{'build s':>9}{'artifact KB':>13}{'load ms':>9}"
+          f"{'p50 us':>9}{'p99 us':>9}{'linear p50 us':>15}")
+    for scale in args.scales:
+        fun_facts = [loader.clean_fun_fact(record) for record in synthetic.fun_facts(scale)]
+
+        start = time.perf_counter()
+        artifact = search.build_index(fun_facts)
+        build_s = time.perf_counter() - start
+        data = gzip.compress(search.encode_artifact(artifact), mtime=0)
+
+        start = time.perf_counter()
+        index = search.SearchIndex(search.read_artifact(data))
+        load_ms = (time.perf_counter() - start) * 1000
+
+        indexed = []
+        for _ in range(args.rounds):
+            for query in QUERIES:
+                start = time.perf_counter()
+                index.search(query, 20)
+                indexed.append((time.perf_counter() - start) * 1e6)
+
+        linear = []
+        for query in QUERIES:
+            start = time.perf_counter()
+            linear_search(fun_facts, query, 20)
+            linear.append((time.perf_counter() - start) * 1e6)
+
+        p50, p99 = percentiles(indexed)
+        print(f"{scale:>5}x{len(index):>8}{build_s:>9.2f}{len(data) / 1024:>13.0f}{load_ms:>9.0f}"
+              f"{p50:>9.0f}{p99:>9.0f}{statistics.median(linear):>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Synthetic Firestore-shaped data scaled up from firestore_data/.
+
+Each scale step copies every source record with a new id, jittered
+coordinates (and a matching geohash) and fun facts re-pointed at the
+copied landmarks, so the shape and value distribution match the real
+export at any size.
+"""
+import copy
+import io
+import json
+import os
+import random
+
+import benchmarks.local_aws  # noqa: F401  (puts lambda/ on sys.path)
+import geo
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "firestore_data")
+
+
+def load_source(name):
+    with open(os.path.join(DATA_DIR, f"{name}.json")) as f:
+        return json.load(f)
+
+
+def scaled_id(source_id, copy_index):
+    return source_id if copy_index == 0 else f"{source_id}-{copy_index}"
+
+
+def landmarks(scale, seed=0):
+    rng = random.Random(seed)
+    source = load_source("landmarks")
+    for copy_index in range(scale):
+        for landmark in source:
+            landmark = copy.deepcopy(landmark)
+            landmark["id"] = scaled_id(landmark["id"], copy_index)
+            if copy_index:
+                # Spread copies over roughly 20 km around the original
+                latitude = landmark["coordinates"]["latitude"] + rng.uniform(-0.1, 0.1)
+                longitude = landmark["coordinates"]["longitude"] + rng.uniform(-0.1, 0.1)
+                landmark["coordinates"] = {"latitude": latitude, "longitude": longitude}
+                landmark["l"] = [latitude, longitude]
+                landmark["g"] = geo.encode(latitude, longitude)
+                landmark["likes"] = rng.randint(0, 50)
+            yield landmark
+
+
+def fun_facts(scale, seed=0):
+    rng = random.Random(seed)
+    source = load_source("funFacts")
+    for copy_index in range(scale):
+        for fun_fact in source:
+            fun_fact = copy.deepcopy(fun_fact)
+            fun_fact["id"] = scaled_id(fun_fact["id"], copy_index)
+            fun_fact["landmarkId"] = scaled_id(fun_fact["landmarkId"], copy_index)
+            if copy_index:
+                fun_fact["likes"] = rng.randint(0, 50)
+                fun_fact["approvalCount"] = rng.randint(0, 10)
+            yield fun_fact
+
+
+def users(scale, seed=0):
+    # User profiles in the shape the /users endpoint accepts
+    rng = random.Random(seed)
+    source = load_source("users")
+    for copy_index in range(scale):
+        for user in source:
+            yield {
+                "userId": scaled_id(user["uid"], copy_index),
+                "username": user["userName"],
+                "email": user["email"],
+                "profilePicture": user.get("photoURL"),
+                "userCategory": user.get("level", "Rookie") if copy_index == 0 else rng.choice(
+                    ["Rookie", "Explorer", "Expert"]),
+            }
+
+
+def write_ndjson(records, path):
+    count = 0
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+            count += 1
+    return count
+
+
+def write_json_array(records, path):
+    # Same layout as the Firestore export: an indented JSON array
+    with open(path, "w") as f:
+        f.write("[\n")
+        for count, record in enumerate(records):
+            if count:
+                f.write(",\n")
+            f.write(json.dumps(record, indent=4))
+        f.write("\n]\n")
+
+
+def sample_jpeg(width=2048, height=1536, seed=0, quality=90):
+    """Returns a photo-sized JPEG with smooth gradients and fine noise.
+
+    Pure gradients compress unrealistically well and pure noise badly;
+    the mix lands near the size of a phone photo at the same resolution.
+    """
+    from PIL import Image, ImageFilter
+
+    rng = random.Random(seed)
+    channels = [
+        Image.linear_gradient("L").rotate(rng.uniform(0, 360)).resize((width, height))
+        for _ in range(3)
+    ]
+    image = Image.merge("RGB", channels)
+    noise = Image.effect_noise((width, height), 60).convert("RGB").filter(ImageFilter.GaussianBlur(1))
+    image = Image.blend(image, noise, 0.35)
+
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
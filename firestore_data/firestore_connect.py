@@ -1,16 +1,74 @@
+import argparse
+import base64
+import datetime
+import json
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import firebase_admin
 from firebase_admin import credentials
 from google.cloud import firestore
 from google.cloud.firestore_v1 import _helpers
-import json
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+CREDENTIALS_FILE = "funfacts-5b1a9-firebase-adminsdk-zcx1s-f0c4a47e26.json"
+
+# Collections exported by default
+COLLECTIONS = ["landmarks", "funFacts", "users", "hashtags", "disputes"]
+
+# Field each collection's incremental exports are filtered on. Documents
+# carry no update time, so the submission date is the best available: an
+# incremental export picks up new documents but not edits to older ones,
+# which still need a full export. Collections without such a field are
+# always exported in full, with a warning.
+WATERMARK_FIELDS = {"funFacts": "dateSubmitted", "disputes": "dateSubmitted"}
+
+WATERMARKS_FILE = "watermarks.json"
+
+_db = None
+
+
+def get_db():
+    # Connect on first use so the module can be imported without credentials
+    global _db
+    if _db is None:
+        cred = credentials.Certificate(CREDENTIALS_FILE)
+        firebase_admin.initialize_app(cred)
+        _db = firestore.Client()
+    return _db
+
+
+# Converters for Firestore types that are not JSON serializable, checked in
+# order, so register subclasses before their base classes
+CONVERTERS = []
+
+
+def register_converter(value_type, converter):
+    CONVERTERS.append((value_type, converter))
 
-cred = credentials.Certificate("funfacts-5b1a9-firebase-adminsdk-zcx1s-f0c4a47e26.json")
-firebase_admin.initialize_app(cred)
 
-db = firestore.Client()
+register_converter(firestore.GeoPoint, lambda value: {"latitude": value.latitude, "longitude": value.longitude})
+register_converter(_helpers.DatetimeWithNanoseconds, lambda value: value.isoformat())
+register_converter(datetime.datetime, lambda value: value.isoformat())
+register_converter(firestore.DocumentReference, lambda value: value.path)
+register_converter(bytes, lambda value: base64.b64encode(value).decode())
 
 
-def get_document(collection_name, document_id):
+def convert_value(value):
+    for value_type, converter in CONVERTERS:
+        if isinstance(value, value_type):
+            return converter(value)
+    if isinstance(value, dict):
+        return {key: convert_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [convert_value(item) for item in value]
+    return value
+
+
+def get_document(collection_name, document_id, db=None):
+    db = db or get_db()
+
     # Reference to the collection
     collection_ref = db.collection(collection_name)
 
@@ -27,29 +85,96 @@ def get_document(collection_name, document_id):
         print("No such document!")
 
 
-def get_all_documents(collection_name):
+def export_collection(collection_name, path, db=None, since=None, watermark_field=None):
+    """Streams a collection to an NDJSON file as documents arrive.
 
-    # Reference to the collection
-    collection_ref = db.collection(collection_name)
+    With since, only documents whose watermark_field is later than since
+    are exported. Documents without the field are never matched by such a
+    query, so collections lacking it need a full export. The file is written
+    under a temporary name and renamed when complete. Returns the number of
+    documents and the latest watermark seen, None without watermark_field.
+    """
+    db = db or get_db()
+    query = db.collection(collection_name)
+    if since is not None and watermark_field is not None:
+        query = query.where(filter=FieldFilter(watermark_field, ">", since))
+
+    count = 0
+    watermark = since
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        for doc in query.stream():
+            doc_dict = doc.to_dict()
+            value = doc_dict.get(watermark_field) if watermark_field else None
+            if isinstance(value, datetime.datetime) and (watermark is None or value > watermark):
+                watermark = value
+            f.write(json.dumps(convert_value(doc_dict)))
+            f.write("\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return {"documents": count, "watermark": watermark}
+
+
+def load_watermarks(out_dir):
+    path = os.path.join(out_dir, WATERMARKS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {name: datetime.datetime.fromisoformat(value) for name, value in json.load(f).items()}
+
+
+def save_watermarks(out_dir, watermarks):
+    path = os.path.join(out_dir, WATERMARKS_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump({name: value.isoformat() for name, value in watermarks.items()}, f, indent=4)
+    os.replace(f"{path}.tmp", path)
+
+
+def export_collections(collections, out_dir, db=None, workers=4, incremental=False,
+                       watermark_fields=WATERMARK_FIELDS):
+    """Exports several collections in parallel, one NDJSON file each.
+
+    Incremental exports only move documents past the watermark saved by the
+    previous run and write them to {collection}.changes.ndjson. Collections
+    with no watermark field in watermark_fields, or whose documents lack
+    it, are exported in full with a warning. Watermarks are saved once
+    every collection has been exported.
+    """
+    db = db or get_db()
+    watermarks = load_watermarks(out_dir)
+    if incremental:
+        for collection_name in collections:
+            if collection_name not in watermark_fields:
+                warnings.warn(f"{collection_name} has no watermark field; exporting it in full")
+
+    def export(collection_name):
+        watermark_field = watermark_fields.get(collection_name)
+        since = watermarks.get(collection_name) if incremental and watermark_field else None
+        suffix = "changes.ndjson" if since is not None else "ndjson"
+        path = os.path.join(out_dir, f"{collection_name}.{suffix}")
+        return export_collection(collection_name, path, db, since, watermark_field)
 
-    # Get all documents in the collection
-    documents = collection_ref.stream()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = dict(zip(collections, executor.map(export, collections)))
 
-    # Iterate over all documents, serialize GeoPoint  and convert to JSON
-    dicts = []
-    for doc in documents:
-        doc_dict = doc.to_dict()
-        for key, value in doc_dict.items():
-            if isinstance(value, firestore.GeoPoint):
-                doc_dict[key] = {"latitude": value.latitude, "longitude": value.longitude}
-            elif isinstance(value, _helpers.DatetimeWithNanoseconds):
-                doc_dict[key] = value.isoformat()
-        dicts.append(doc_dict)
-    json.dump(dicts, open(f"{collection_name}.json", "w"), indent=4)
+    for collection_name, result in results.items():
+        if result["watermark"] is not None:
+            watermarks[collection_name] = result["watermark"]
+        elif collection_name in watermark_fields and collection_name not in watermarks and result["documents"]:
+            warnings.warn(f"No {collection_name} document has {watermark_fields[collection_name]}; "
+                          "its next incremental export will be full")
+    save_watermarks(out_dir, watermarks)
+    return {name: result["documents"] for name, result in results.items()}
 
 
 if __name__ == '__main__':
-    collection = "users"
+    parser = argparse.ArgumentParser(description="Export Firestore collections as NDJSON")
+    parser.add_argument("collections", nargs="*", default=COLLECTIONS)
+    parser.add_argument("--out-dir", default=".")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only export documents past the saved watermark; collections in "
+                             f"{', '.join(WATERMARK_FIELDS)} only, the others are exported in full")
+    args = parser.parse_args()
 
-    # Fetch a document
-    get_all_documents(collection)
\ No newline at end of file
+    print(export_collections(args.collections, args.out_dir, workers=args.workers, incremental=args.incremental))
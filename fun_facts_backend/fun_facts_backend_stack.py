@@ -7,9 +7,46 @@ from aws_cdk import (
     CfnOutput,
     RemovalPolicy,
     aws_s3 as s3,
+    aws_s3_notifications as s3_notifications,
+    aws_secretsmanager as secretsmanager,
+    aws_lambda_event_sources as lambda_event_sources,
+    Duration,
 )
 from constructs import Construct
 
+# Modules each Lambda function ships from lambda/, its handler module first.
+# Every function is packaged with only these files, so a handler's imports
+# must be listed here.
+HANDLER_MODULES = {
+    "GetFunFactHandler": [
+        "get_fun_fact", "clients", "clusters", "metrics", "compression", "dynamo", "etags", "geo", "images",
+        "leaderboard", "pagination", "projection", "read_cache", "search", "snapshots", "url_cache",
+    ],
+    "AddFunFactHandler": ["add_fun_fact", "clients", "metrics"],
+    "UserHandler": ["add_fun_fact", "clients", "metrics"],
+    "InteractionHandler": ["interactions", "clients", "like_counters", "metrics"],
+    "LikeAggregator": ["like_aggregator", "clients", "dynamo", "like_counters", "metrics"],
+    "SearchIndexBuilder": ["search_index_builder", "clients", "metrics", "dynamo", "search"],
+    "SnapshotGenerator": [
+        "snapshot_generator", "clients", "metrics", "dynamo", "leaderboard", "leaderboard_updater", "projection",
+        "snapshots",
+    ],
+    # Pillow comes from the layer named by the pillowLayerArn context value
+    "ImageProcessor": ["image_processor", "clients", "metrics", "dynamo", "images"],
+    "LeaderboardUpdater": [
+        "leaderboard_updater", "clients", "metrics", "dynamo", "leaderboard", "projection", "snapshots",
+    ],
+    "ClusterUpdater": ["cluster_updater", "clients", "metrics", "dynamo", "clusters", "geo"],
+}
+
+
+def handler_code(function_id):
+    # Package only the function's own modules out of the shared lambda/ directory
+    return _lambda.Code.from_asset(
+        "lambda",
+        exclude=["*"] + [f"!{module}.py" for module in HANDLER_MODULES[function_id]]
+    )
+
 
 class FunFactsBackendStack(Stack):
 
@@ -23,8 +60,31 @@ class FunFactsBackendStack(Stack):
             partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.RETAIN,
+            # Feeds the city snapshot generator
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES
         )
 
+        # Add a global secondary index for nearby landmark queries by geohash prefix
+        landmarks_table.add_global_secondary_index(
+            index_name="geohashIndex",
+            partition_key=dynamodb.Attribute(name="geohashPrefix", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="geohash", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.ALL,
+        )
+
+        # Add a global secondary index for building city snapshots and
+        # leaderboards. CloudFormation creates at most one GSI per table
+        # update, so a deployed Landmark table without geohashIndex or
+        # cityIndex takes two deploys: first `cdk deploy -c stageCityIndex=true`,
+        # which leaves cityIndex out, then `cdk deploy` once geohashIndex is
+        # ACTIVE. Snapshots and leaderboards fail in between.
+        if str(self.node.try_get_context("stageCityIndex")).lower() != "true":
+            landmarks_table.add_global_secondary_index(
+                index_name="cityIndex",
+                partition_key=dynamodb.Attribute(name="city", type=dynamodb.AttributeType.STRING),
+                projection_type=dynamodb.ProjectionType.ALL,
+            )
+
         # Define the FunFacts table
         fun_facts_table = dynamodb.Table(
             self, "FunFact",
@@ -32,7 +92,20 @@ class FunFactsBackendStack(Stack):
             partition_key=dynamodb.Attribute(name="landmarkId", type=dynamodb.AttributeType.STRING),
             sort_key=dynamodb.Attribute(name="funFactId", type=dynamodb.AttributeType.STRING),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
-            removal_policy=RemovalPolicy.RETAIN
+            removal_policy=RemovalPolicy.RETAIN,
+            # Feeds the search index builder
+            stream=dynamodb.StreamViewType.NEW_AND_OLD_IMAGES
+        )
+
+        # Add a global secondary index with the table's keys for the summary
+        # view of fun fact lists; it projects only the attributes that view
+        # returns, so its queries read items a fraction of the full size
+        fun_facts_table.add_global_secondary_index(
+            index_name="summaryIndex",
+            partition_key=dynamodb.Attribute(name="landmarkId", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="funFactId", type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["funFactTitle", "imageName", "likes"],
         )
 
         # Define the User table
@@ -44,23 +117,64 @@ class FunFactsBackendStack(Stack):
             removal_policy=RemovalPolicy.RETAIN
         )
 
-        # Define the UserInteractions table
-        # user_interactions_table = dynamodb.Table(
-        #     self, "UserInteraction",
-        #     table_name="UserInteraction",
-        #     partition_key=dynamodb.Attribute(name="funFactId", type=dynamodb.AttributeType.STRING),
-        #     sort_key=dynamodb.Attribute(name="interactionId", type=dynamodb.AttributeType.STRING),
-        #     billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
-        #     removal_policy=RemovalPolicy.RETAIN
-        # )
-        #
-        # # Add a global secondary index for fetching interactions by user
-        # user_interactions_table.add_global_secondary_index(
-        #     index_name="userIdIndex",
-        #     partition_key=dynamodb.Attribute(name="userId", type=dynamodb.AttributeType.STRING),
-        #     sort_key=dynamodb.Attribute(name="createdAt", type=dynamodb.AttributeType.STRING),
-        #     projection_type=dynamodb.ProjectionType.ALL,
-        # )
+        # Define the UserInteractions table, keyed by user so the likes of a
+        # popular fun fact spread over every liker's partition
+        user_interactions_table = dynamodb.Table(
+            self, "UserInteraction",
+            table_name="UserInteraction",
+            partition_key=dynamodb.Attribute(name="userId", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="interactionId", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN
+        )
+
+        # Define the sharded like counters, one partition key per shard; the
+        # stream feeds the aggregator
+        like_counters_table = dynamodb.Table(
+            self, "LikeCounter",
+            table_name="LikeCounter",
+            partition_key=dynamodb.Attribute(name="counterId", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN,
+            stream=dynamodb.StreamViewType.KEYS_ONLY
+        )
+
+        # Define the table recording which image variants exist
+        image_variants_table = dynamodb.Table(
+            self, "ImageVariant",
+            table_name="ImageVariant",
+            partition_key=dynamodb.Attribute(name="imageName", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN
+        )
+
+        # Define the table holding each city's trending fun facts board
+        leaderboard_table = dynamodb.Table(
+            self, "Leaderboard",
+            table_name="Leaderboard",
+            partition_key=dynamodb.Attribute(name="city", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN
+        )
+
+        # Define the table holding the map cluster pyramid, one partition per tile
+        cluster_table = dynamodb.Table(
+            self, "LandmarkCluster",
+            table_name="LandmarkCluster",
+            partition_key=dynamodb.Attribute(name="tile", type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name="cell", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN
+        )
+
+        # Define the table recording where each landmark is counted in the pyramid
+        cluster_members_table = dynamodb.Table(
+            self, "LandmarkClusterMember",
+            table_name="LandmarkClusterMember",
+            partition_key=dynamodb.Attribute(name="id", type=dynamodb.AttributeType.STRING),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.RETAIN
+        )
 
         # Define an S3 bucket
         bucket = s3.Bucket(self,
@@ -78,16 +192,28 @@ class FunFactsBackendStack(Stack):
             principals=[iam.ServicePrincipal("apigateway.amazonaws.com")]
         ))
 
+        # Define the key used to sign pagination tokens
+        page_token_secret = secretsmanager.Secret(
+            self, "PageTokenSecret",
+            generate_secret_string=secretsmanager.SecretStringGenerator(
+                exclude_punctuation=True,
+                password_length=64
+            )
+        )
+
         # Define the Lambda function for GET operations
         get_lambda = _lambda.Function(
             self, "GetFunFactHandler",
             runtime=_lambda.Runtime.PYTHON_3_12,
             handler="get_fun_fact.handler",
-            code=_lambda.Code.from_asset("lambda"),
+            code=handler_code("GetFunFactHandler"),
             environment={
                 "FUN_FACTS_TABLE_NAME": fun_facts_table.table_name,
                 "LANDMARKS_TABLE_NAME": landmarks_table.table_name,
                 "USERS_TABLE_NAME": user_table.table_name,
+                "PAGE_TOKEN_SECRET_ARN": page_token_secret.secret_arn,
+                "SEARCH_INDEX_BUCKET": bucket.bucket_name,
+                "SNAPSHOT_BUCKET": bucket.bucket_name,
             }
         )
 
@@ -96,15 +222,21 @@ class FunFactsBackendStack(Stack):
         landmarks_table.grant_read_data(get_lambda)
         user_table.grant_read_data(get_lambda)
 
+        # The signing key is read at run time, so it is not in the function's configuration
+        page_token_secret.grant_read(get_lambda)
+
         # Grant the Lambda function read access to the S3 bucket
         bucket.grant_read(get_lambda)
+        image_variants_table.grant_read_data(get_lambda)
+        leaderboard_table.grant_read_data(get_lambda)
+        cluster_table.grant_read_data(get_lambda)
 
         # Define the Lambda function for ADD operations
         add_lambda = _lambda.Function(
             self, "AddFunFactHandler",
             runtime=_lambda.Runtime.PYTHON_3_12,
             handler="add_fun_fact.handler",
-            code=_lambda.Code.from_asset("lambda"),
+            code=handler_code("AddFunFactHandler"),
             environment={
                 "FUN_FACTS_TABLE_NAME": fun_facts_table.table_name,
                 "LANDMARKS_TABLE_NAME": landmarks_table.table_name,
@@ -121,8 +253,9 @@ class FunFactsBackendStack(Stack):
         user_lambda = _lambda.Function(
             self, "UserHandler",
             runtime=_lambda.Runtime.PYTHON_3_12,
-            handler="user_handler.handler",
-            code=_lambda.Code.from_asset("lambda"),
+            # The user metadata handler lives in add_fun_fact.py
+            handler="add_fun_fact.handler",
+            code=handler_code("UserHandler"),
             environment={
                 "USERS_TABLE_NAME": user_table.table_name,
             }
@@ -131,11 +264,186 @@ class FunFactsBackendStack(Stack):
         # Grant the Lambda function read/write access to the User table
         user_table.grant_read_write_data(user_lambda)
 
+        # Define the Lambda function for like/unlike events
+        interaction_lambda = _lambda.Function(
+            self, "InteractionHandler",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="interactions.handler",
+            code=handler_code("InteractionHandler"),
+            environment={
+                "LIKE_COUNTER_SHARDS": "10",
+            }
+        )
+
+        # Grant the Lambda function write access to the interactions and counters
+        user_interactions_table.grant_write_data(interaction_lambda)
+        like_counters_table.grant_write_data(interaction_lambda)
+
+        # Define the Lambda function folding counter shards into fun fact likes
+        like_aggregator = _lambda.Function(
+            self, "LikeAggregator",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="like_aggregator.handler",
+            code=handler_code("LikeAggregator"),
+            environment={
+                # Must match the InteractionHandler's, which writes the shards
+                "LIKE_COUNTER_SHARDS": "10",
+            }
+        )
+
+        like_counters_table.grant_read_data(like_aggregator)
+        fun_facts_table.grant_write_data(like_aggregator)
+
+        # Batch counter changes for up to a minute so a burst of likes on one
+        # fact is folded once per batch instead of once per like
+        like_aggregator.add_event_source(lambda_event_sources.DynamoEventSource(
+            like_counters_table,
+            starting_position=_lambda.StartingPosition.LATEST,
+            batch_size=1000,
+            max_batching_window=Duration.seconds(60),
+            retry_attempts=3
+        ))
+
+        # Define the Lambda function rebuilding the search index
+        search_index_builder = _lambda.Function(
+            self, "SearchIndexBuilder",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="search_index_builder.handler",
+            code=handler_code("SearchIndexBuilder"),
+            timeout=Duration.minutes(5),
+            memory_size=1024,
+            environment={
+                "SEARCH_INDEX_BUCKET": bucket.bucket_name,
+            }
+        )
+
+        fun_facts_table.grant_read_data(search_index_builder)
+        bucket.grant_read_write(search_index_builder)
+
+        # Rebuild when facts enter or leave the approved set, at most once per
+        # batching window. Edits to approved facts, likes included, also match;
+        # the handler skips batches that change no indexed attribute.
+        search_index_builder.add_event_source(lambda_event_sources.DynamoEventSource(
+            fun_facts_table,
+            starting_position=_lambda.StartingPosition.LATEST,
+            batch_size=1000,
+            max_batching_window=Duration.minutes(5),
+            retry_attempts=3,
+            filters=[
+                _lambda.FilterCriteria.filter({"dynamodb": {"NewImage": {"funFactStatus": {
+                    "S": _lambda.FilterRule.is_equal("APPROVED")}}}}),
+                _lambda.FilterCriteria.filter({"dynamodb": {"OldImage": {"funFactStatus": {
+                    "S": _lambda.FilterRule.is_equal("APPROVED")}}}}),
+            ]
+        ))
+
+        # Define the Lambda function regenerating per-city snapshots
+        snapshot_generator = _lambda.Function(
+            self, "SnapshotGenerator",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="snapshot_generator.handler",
+            code=handler_code("SnapshotGenerator"),
+            timeout=Duration.minutes(5),
+            memory_size=512,
+            environment={
+                "SNAPSHOT_BUCKET": bucket.bucket_name,
+            }
+        )
+
+        landmarks_table.grant_read_data(snapshot_generator)
+        fun_facts_table.grant_read_data(snapshot_generator)
+        bucket.grant_read_write(snapshot_generator)
+        leaderboard_table.grant_read_write_data(snapshot_generator)
+
+        # Regenerate the cities a batch of landmark and fun fact changes
+        # touches, at most once per batching window per table. DynamoDB
+        # Streams serves at most two readers per shard, and the FunFact
+        # stream has this function and the search index builder, so the
+        # leaderboards are updated from the same FunFact batches.
+        for table in (landmarks_table, fun_facts_table):
+            snapshot_generator.add_event_source(lambda_event_sources.DynamoEventSource(
+                table,
+                starting_position=_lambda.StartingPosition.LATEST,
+                batch_size=1000,
+                max_batching_window=Duration.minutes(1),
+                retry_attempts=3
+            ))
+
+        # Define the Lambda function rebuilding the per-city leaderboards when
+        # invoked with {"all": true}; the snapshot generator keeps them current
+        leaderboard_updater = _lambda.Function(
+            self, "LeaderboardUpdater",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="leaderboard_updater.handler",
+            code=handler_code("LeaderboardUpdater"),
+            timeout=Duration.minutes(5),
+            memory_size=512,
+        )
+
+        landmarks_table.grant_read_data(leaderboard_updater)
+        fun_facts_table.grant_read_data(leaderboard_updater)
+        leaderboard_table.grant_read_write_data(leaderboard_updater)
+
+        # Define the Lambda function keeping the map cluster pyramid current
+        cluster_updater = _lambda.Function(
+            self, "ClusterUpdater",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="cluster_updater.handler",
+            code=handler_code("ClusterUpdater"),
+            timeout=Duration.minutes(5),
+            memory_size=512,
+        )
+
+        landmarks_table.grant_read_data(cluster_updater)
+        cluster_table.grant_read_write_data(cluster_updater)
+        cluster_members_table.grant_read_write_data(cluster_updater)
+
+        # Counts are adjusted with ADD in transactions with the membership
+        # items, so retried records are not counted twice. The function
+        # reports the record it failed on and retries resume from there.
+        cluster_updater.add_event_source(lambda_event_sources.DynamoEventSource(
+            landmarks_table,
+            starting_position=_lambda.StartingPosition.LATEST,
+            batch_size=100,
+            max_batching_window=Duration.seconds(10),
+            bisect_batch_on_error=True,
+            report_batch_item_failures=True,
+            retry_attempts=3
+        ))
+
+        # Define the Lambda function producing resized image variants. Pillow is
+        # not packaged with the function; pass a layer providing it with
+        # `cdk deploy -c pillowLayerArn=<arn>`. Until then the processor fails
+        # and the GET handler keeps serving originals.
+        pillow_layer_arn = self.node.try_get_context("pillowLayerArn")
+        image_processor = _lambda.Function(
+            self, "ImageProcessor",
+            runtime=_lambda.Runtime.PYTHON_3_12,
+            handler="image_processor.handler",
+            code=handler_code("ImageProcessor"),
+            timeout=Duration.minutes(1),
+            memory_size=1024,
+            layers=[_lambda.LayerVersion.from_layer_version_arn(self, "PillowLayer", pillow_layer_arn)]
+            if pillow_layer_arn else None,
+        )
+
+        bucket.grant_read_write(image_processor)
+        image_variants_table.grant_write_data(image_processor)
+
+        # Originals are uploaded as {imageName}.jpeg at the top of the bucket
+        bucket.add_event_notification(
+            s3.EventType.OBJECT_CREATED,
+            s3_notifications.LambdaDestination(image_processor),
+            s3.NotificationKeyFilter(suffix=".jpeg")
+        )
+
         # Create the API Gateway
         api = apigateway.RestApi(
             self, "funFactsApi",
             rest_api_name="Fun Facts Service",
-            description="This service serves fun facts."
+            description="This service serves fun facts.",
+            # Lets GET handlers return base64 encoded, compressed bodies
+            binary_media_types=["*/*"]
         )
 
         # Create the /funFacts resource
@@ -144,7 +452,24 @@ class FunFactsBackendStack(Stack):
         # Integrate GET Lambda function
         get_integration = apigateway.LambdaIntegration(get_lambda)
         fun_facts.add_method("GET", get_integration, request_parameters={
-            'method.request.querystring.landmarkId': True
+            'method.request.querystring.landmarkId': False,
+            'method.request.querystring.landmarkIds': False,
+            'method.request.querystring.pageSize': False,
+            'method.request.querystring.nextToken': False,
+            'method.request.querystring.imageSize': False,
+            'method.request.querystring.imageFormat': False,
+            'method.request.querystring.fields': False,
+        })
+
+        # Create the /funFacts/top resource for a city's trending fun facts
+        top_fun_facts = fun_facts.add_resource("top")
+        top_fun_facts.add_method("GET", get_integration, request_parameters={
+            'method.request.querystring.city': True,
+            'method.request.querystring.state': True,
+            'method.request.querystring.country': True,
+            'method.request.querystring.k': False,
+            'method.request.querystring.imageSize': False,
+            'method.request.querystring.imageFormat': False,
         })
 
         # Create the /landmarks resource
@@ -153,7 +478,41 @@ class FunFactsBackendStack(Stack):
         # Integrate GET Lambda function
         get_integration = apigateway.LambdaIntegration(get_lambda)
         landmarks.add_method("GET", get_integration, request_parameters={
-            'method.request.querystring.pageSize': False
+            'method.request.querystring.pageSize': False,
+            'method.request.querystring.nextToken': False,
+            'method.request.querystring.lat': False,
+            'method.request.querystring.lon': False,
+            'method.request.querystring.radius': False,
+            'method.request.querystring.city': False,
+            'method.request.querystring.state': False,
+            'method.request.querystring.country': False,
+            'method.request.querystring.snapshot': False,
+            'method.request.querystring.bbox': False,
+            'method.request.querystring.zoom': False,
+            'method.request.querystring.imageSize': False,
+            'method.request.querystring.imageFormat': False,
+            'method.request.querystring.fields': False,
+        })
+
+        # Create the /landmarks/{id} resource for a landmark's detail document
+        landmark = landmarks.add_resource("{id}")
+        landmark.add_method("GET", get_integration, request_parameters={
+            'method.request.path.id': True,
+            'method.request.querystring.pageSize': False,
+            'method.request.querystring.imageSize': False,
+            'method.request.querystring.imageFormat': False,
+            'method.request.querystring.fields': False,
+        })
+
+        # Create the /search resource
+        search = api.root.add_resource("search")
+
+        # Integrate GET Lambda function
+        get_integration = apigateway.LambdaIntegration(get_lambda)
+        search.add_method("GET", get_integration, request_parameters={
+            'method.request.querystring.q': False,
+            'method.request.querystring.prefix': False,
+            'method.request.querystring.pageSize': False,
         })
 
         # Integrate ADD Lambda function
@@ -167,6 +526,13 @@ class FunFactsBackendStack(Stack):
         user_integration = apigateway.LambdaIntegration(user_lambda)
         users.add_method("POST", user_integration)
 
+        # Create the /interactions resource
+        interactions = api.root.add_resource("interactions")
+
+        # Integrate Interaction Lambda function for likes
+        interaction_integration = apigateway.LambdaIntegration(interaction_lambda)
+        interactions.add_method("POST", interaction_integration)
+
         # Output the API endpoint
         CfnOutput(self, "ApiEndpoint", value=api.url)
 
@@ -174,5 +540,9 @@ class FunFactsBackendStack(Stack):
         CfnOutput(self, "LandmarksTableName", value=landmarks_table.table_name)
         CfnOutput(self, "FunFactsTableName", value=fun_facts_table.table_name)
         CfnOutput(self, "UserTableName", value=user_table.table_name)
-        # CfnOutput(self, "UserInteractionsTableName", value=user_interactions_table.table_name)
+        CfnOutput(self, "UserInteractionsTableName", value=user_interactions_table.table_name)
+        CfnOutput(self, "ImageVariantsTableName", value=image_variants_table.table_name)
+        CfnOutput(self, "LeaderboardTableName", value=leaderboard_table.table_name)
+        CfnOutput(self, "LandmarkClusterTableName", value=cluster_table.table_name)
+        CfnOutput(self, "LandmarkClusterMemberTableName", value=cluster_members_table.table_name)
         CfnOutput(self, "BucketName", value=bucket.bucket_name)
@@ -1,57 +1,117 @@
 import os
-import boto3
+import base64
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from boto3.dynamodb.conditions import Attr
+from decimal import Decimal
 
-dynamodb = boto3.resource('dynamodb')
-users_table = dynamodb.Table('User')
+import clients
+import metrics
 
+users_table_name = 'User'
 
-def handler(event, context):
-    body = json.loads(event['body'])
-    user_id = body.get('userId')
+# Batch user sync
+MAX_BATCH_USERS = int(os.environ.get('MAX_BATCH_USERS', 100))
+USER_SYNC_CONCURRENCY = int(os.environ.get('USER_SYNC_CONCURRENCY', 8))
+sync_executor = ThreadPoolExecutor(max_workers=USER_SYNC_CONCURRENCY)
 
-    # Check if the user exists
-    response = users_table.get_item(Key={'userId': user_id})
-    user_exists = 'Item' in response
-
-    if user_exists:
-        # Update user metadata
-        update_expression = "set username = :u, email = :e, profilePicture = :p, userCategory = :c, updatedAt = :a"
-        expression_attribute_values = {
-            ':u': body['username'],
-            ':e': body['email'],
-            ':p': body.get('profilePicture', None),
-            ':c': body.get('userCategory', 'Rookie'),
-            ':a': datetime.now().isoformat()
-        }
 
-        users_table.update_item(
-            Key={'userId': user_id},
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_attribute_values
-        )
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError
 
-        message = 'User metadata updated successfully'
-    else:
-        # Create new user metadata
-        user_metadata = {
-            'userId': user_id,
-            'username': body['username'],
-            'email': body['email'],
-            'createdAt': datetime.now().isoformat(),
-            'profilePicture': body.get('profilePicture', None),
-            'userCategory': body.get('userCategory', 'Rookie'),
-        }
-
-        users_table.put_item(Item=user_metadata)
-        message = 'User metadata added successfully'
 
+def response(status_code, body):
     return {
-        'statusCode': 201,
-        'body': json.dumps({'message': message, 'userId': user_id}),
+        'statusCode': status_code,
+        'body': json.dumps(body, default=decimal_default),
         'headers': {
             'Content-Type': 'application/json'
         }
-    }
\ No newline at end of file
+    }
+
+
+def upsert_user(profile):
+    """Creates or updates a user in one round trip and returns (item, created)."""
+    now = datetime.now().isoformat()
+    values = {
+        'username': profile['username'],
+        'email': profile['email'],
+        'profilePicture': profile.get('profilePicture', None),
+        'userCategory': profile.get('userCategory', 'Rookie'),
+        'updatedAt': now,
+    }
+
+    # createdAt is only set on first write, so concurrent logins cannot race
+    # into two creates; the resource's client is thread-safe, the Table is not
+    result = clients.resource('dynamodb').meta.client.update_item(
+        TableName=users_table_name,
+        Key={'userId': profile['userId']},
+        UpdateExpression="set username = :u, email = :e, profilePicture = :p, userCategory = :c, updatedAt = :a, "
+                         "createdAt = if_not_exists(createdAt, :a)",
+        ExpressionAttributeValues={
+            ':u': values['username'],
+            ':e': values['email'],
+            ':p': values['profilePicture'],
+            ':c': values['userCategory'],
+            ':a': now
+        },
+        ReturnValues='ALL_OLD'
+    )
+
+    # The user was created by this write if it had no createdAt before;
+    # if_not_exists keeps an existing one, even an empty one
+    old = result.get('Attributes', {})
+    created = not old.get('createdAt')
+    return dict(old, **values, createdAt=old.get('createdAt', now)), created
+
+
+def sync_user(profile):
+    # Per-item result for batch syncs; one bad profile does not fail the batch
+    user_id = profile.get('userId') if isinstance(profile, dict) else None
+    try:
+        if not user_id:
+            raise ValueError('userId is required')
+        _, created = upsert_user(profile)
+    except KeyError as e:
+        return {'userId': user_id, 'status': 'error', 'error': f'Missing field: {e.args[0]}'}
+    except Exception as e:
+        return {'userId': user_id, 'status': 'error', 'error': str(e)}
+    return {'userId': user_id, 'status': 'created' if created else 'updated'}
+
+
+@metrics.instrument
+def handler(event, context):
+    # API Gateway base64 encodes bodies because binary media types are enabled
+    body = event['body']
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    body = json.loads(body)
+    if not isinstance(body, dict):
+        return response(400, {'error': 'Body must be a JSON object'})
+
+    if 'users' in body:
+        # Batch sync, e.g. from the identity provider
+        users = body['users']
+        if not isinstance(users, list) or len(users) > MAX_BATCH_USERS:
+            return response(400, {'error': f'users must be a list of at most {MAX_BATCH_USERS} profiles'})
+
+        results = list(sync_executor.map(metrics.bind(sync_user), users))
+        return response(200, {
+            'results': results,
+            'failed': sum(1 for result in results if result['status'] == 'error'),
+        })
+
+    user_id = body.get('userId')
+    try:
+        item, created = upsert_user(body)
+    except KeyError as e:
+        return response(400, {'error': f'Missing field: {e.args[0]}'})
+
+    if created:
+        message = 'User metadata added successfully'
+    else:
+        message = 'User metadata updated successfully'
+
+    return response(201, {'message': message, 'userId': user_id, 'user': item})
@@ -0,0 +1,54 @@
+import threading
+
+import boto3
+
+import metrics
+
+# AWS clients are created on first use and shared for the life of the
+# container. Creating one loads its service model, which is a large part
+# of cold start time, so requests that never touch a service never pay
+# for it. boto3 clients are thread-safe once created; creation is not,
+# hence the lock.
+
+_clients = {}
+_resources = {}
+_lock = threading.Lock()
+
+
+def _tracked(service_client):
+    # DynamoDB calls report the capacity they consume to the metrics of the invocation
+    if service_client.meta.service_model.service_name == 'dynamodb':
+        metrics.track_capacity(service_client)
+    return service_client
+
+
+def client(service_name):
+    try:
+        return _clients[service_name]
+    except KeyError:
+        with _lock:
+            if service_name not in _clients:
+                _clients[service_name] = _tracked(boto3.client(service_name))
+            return _clients[service_name]
+
+
+def resource(service_name):
+    try:
+        return _resources[service_name]
+    except KeyError:
+        with _lock:
+            if service_name not in _resources:
+                _resources[service_name] = boto3.resource(service_name)
+                _tracked(_resources[service_name].meta.client)
+            return _resources[service_name]
+
+
+def table(table_name):
+    return resource('dynamodb').Table(table_name)
+
+
+def reset():
+    # Drops every cached client, e.g. between tests
+    with _lock:
+        _clients.clear()
+        _resources.clear()
@@ -0,0 +1,283 @@
+import random
+import time
+import traceback
+
+import clients
+import clusters
+import dynamo
+import geo
+import metrics
+
+landmarks_table_name = 'Landmark'
+
+GEOHASH_INDEX_NAME = 'geohashIndex'
+
+# Transactions on cells another batch is writing are cancelled; they are
+# retried after a short backoff
+MAX_CONFLICT_RETRIES = 5
+
+
+def _key(cell):
+    return dynamo.serialize_item({'tile': clusters.tile_key(cell), 'cell': cell})
+
+
+def counted_position(landmark_id):
+    # Where the pyramid counts a landmark, from its membership item
+    member = dynamo.get_item(clients.client('dynamodb'), TableName=clusters.cluster_members_table_name,
+                             Key={'id': landmark_id}, ConsistentRead=True)
+    return (member['latitude'], member['longitude'], member['geohash']) if member else None
+
+
+def cell_deltas(counted, target):
+    # Net (count, sumLat, sumLon) change of each cell moving a landmark between counted() positions
+    deltas = {}
+    for position, sign in ((counted, -1), (target, 1)):
+        if position:
+            latitude, longitude, geohash = position
+            for cell in clusters.cells_of(geohash):
+                count, sum_lat, sum_lon = deltas.get(cell, (0, 0, 0))
+                deltas[cell] = (count + sign, sum_lat + sign * latitude, sum_lon + sign * longitude)
+    return {cell: delta for cell, delta in deltas.items() if any(delta)}
+
+
+def count_at(landmark_id, target):
+    """Moves a landmark's share of the counts and sums to target, a counted() position, or removes it for None.
+
+    The membership item and the cells are written in one transaction,
+    conditional on the membership read, so applying a change again finds
+    the landmark already counted at target and writes nothing.
+    """
+    dynamodb_client = clients.client('dynamodb')
+    names = {'#geohash': 'geohash', '#lat': 'latitude', '#lon': 'longitude'}
+    for attempt in range(MAX_CONFLICT_RETRIES + 1):
+        counted = counted_position(landmark_id)
+        if counted == target:
+            return
+        if counted:
+            condition = {
+                'ConditionExpression': '#geohash = :geohash AND #lat = :lat AND #lon = :lon',
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': dynamo.serialize_item(
+                    {':lat': counted[0], ':lon': counted[1], ':geohash': counted[2]}),
+            }
+        else:
+            condition = {'ConditionExpression': 'attribute_not_exists(id)'}
+        if target:
+            member_write = {'Put': dict(condition, TableName=clusters.cluster_members_table_name,
+                                        Item=dynamo.serialize_item(clusters.member(landmark_id, target)))}
+        else:
+            member_write = {'Delete': dict(condition, TableName=clusters.cluster_members_table_name,
+                                           Key={'id': {'S': landmark_id}})}
+        cell_writes = [{'Update': {
+            'TableName': clusters.cluster_table_name,
+            'Key': _key(cell),
+            'UpdateExpression': 'ADD #count :count, sumLat :lat, sumLon :lon',
+            'ExpressionAttributeNames': {'#count': 'count'},
+            'ExpressionAttributeValues': dynamo.serialize_item({':count': count, ':lat': sum_lat, ':lon': sum_lon}),
+        }} for cell, (count, sum_lat, sum_lon) in sorted(cell_deltas(counted, target).items())]
+
+        try:
+            dynamodb_client.transact_write_items(TransactItems=[member_write] + cell_writes)
+            return
+        except dynamodb_client.exceptions.TransactionCanceledException as e:
+            reasons = {reason.get('Code') for reason in e.response.get('CancellationReasons', [])}
+            # Conflicts on the top cells, which every landmark shares, or a
+            # membership changed since it was read: read it again and retry
+            if attempt == MAX_CONFLICT_RETRIES or not reasons & {'TransactionConflict', 'ConditionalCheckFailed'}:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def offer_representative(geohash, landmark, previous_likes=None):
+    """Makes landmark the representative of each of its cells it outranks.
+
+    Returns the cells where it already was the representative and has lost
+    likes since previous_likes, whose representative must be chosen again.
+    """
+    dynamodb_client = clients.client('dynamodb')
+    likes = landmark.get('likes', 0)
+    demoted = []
+    for cell in clusters.cells_of(geohash):
+        try:
+            response = dynamodb_client.update_item(
+                TableName=clusters.cluster_table_name,
+                Key=_key(cell),
+                UpdateExpression='SET rep = :rep, repLikes = :likes, repId = :id',
+                ConditionExpression='attribute_not_exists(repId) OR repId = :id OR repLikes < :likes '
+                                    'OR (repLikes = :likes AND repId > :id)',
+                ExpressionAttributeValues=dynamo.serialize_item({
+                    ':rep': clusters.representative(landmark), ':likes': likes, ':id': landmark['id'],
+                }),
+                ReturnValues='ALL_OLD',
+            )
+        except dynamodb_client.exceptions.ConditionalCheckFailedException:
+            continue
+        # Judged by the record rather than the cell, so a replayed record
+        # still finds the cells it demoted
+        was_representative = response.get('Attributes', {}).get('repId', {}).get('S') == landmark['id']
+        if was_representative and previous_likes is not None and previous_likes > likes:
+            demoted.append(cell)
+    return demoted
+
+
+def cells_represented_by(geohash, landmark_id):
+    # The landmark's cells it is the representative of
+    items = dynamo.batch_get(
+        clients.client('dynamodb'), clusters.cluster_table_name,
+        [{'tile': clusters.tile_key(cell), 'cell': cell} for cell in clusters.cells_of(geohash)],
+        ProjectionExpression='cell, repId'
+    )
+    return [item['cell'] for item in items if item.get('repId') == landmark_id]
+
+
+def cell_candidates(cell):
+    # Landmarks that may represent a cell: its landmarks at the finest
+    # level, otherwise the representatives of its child cells
+    if len(cell) == clusters.CLUSTER_MAX_PRECISION:
+        return dynamo.all_items(
+            dynamo.query, clients.client('dynamodb'), TableName=landmarks_table_name, IndexName=GEOHASH_INDEX_NAME,
+            KeyConditionExpression='geohashPrefix = :prefix AND begins_with(geohash, :cell)',
+            ExpressionAttributeValues={':prefix': cell[:geo.GEOHASH_INDEX_PRECISION], ':cell': cell},
+        )
+    children = dynamo.all_items(
+        dynamo.query, clients.client('dynamodb'), TableName=clusters.cluster_table_name,
+        KeyConditionExpression='tile = :tile AND begins_with(cell, :cell)',
+        ExpressionAttributeValues={':tile': clusters.tile_key(cell + '0'), ':cell': cell},
+    )
+    return [child['rep'] for child in children if child.get('count', 0) > 0 and 'rep' in child]
+
+
+def choose_representative(cell):
+    """Chooses a cell's representative again from its candidates.
+
+    The write is conditional on the representative read before choosing,
+    so a landmark offered meanwhile is not overwritten by a stale choice;
+    the cell is read and its representative chosen again instead.
+    """
+    dynamodb_client = clients.client('dynamodb')
+    for attempt in range(MAX_CONFLICT_RETRIES + 1):
+        current = dynamo.get_item(
+            dynamodb_client, TableName=clusters.cluster_table_name,
+            Key={'tile': clusters.tile_key(cell), 'cell': cell},
+            ProjectionExpression='repId, repLikes', ConsistentRead=True
+        ) or {}
+        if 'repId' in current:
+            condition = 'repId = :oldId AND repLikes = :oldLikes'
+            values = {':oldId': current['repId'], ':oldLikes': current.get('repLikes', 0)}
+        else:
+            condition = 'attribute_not_exists(repId)'
+            values = {}
+
+        candidates = cell_candidates(cell)
+        if candidates:
+            best = max(candidates, key=clusters.rank)
+            expression = 'SET rep = :rep, repLikes = :likes, repId = :id'
+            values.update({':rep': clusters.representative(best), ':likes': best.get('likes', 0), ':id': best['id']})
+        elif current:
+            expression = 'REMOVE rep, repLikes, repId'
+        else:
+            return
+
+        try:
+            dynamodb_client.update_item(
+                TableName=clusters.cluster_table_name,
+                Key=_key(cell),
+                UpdateExpression=expression,
+                ConditionExpression=condition,
+                **({'ExpressionAttributeValues': dynamo.serialize_item(values)} if values else {})
+            )
+            return
+        except dynamodb_client.exceptions.ConditionalCheckFailedException:
+            if attempt == MAX_CONFLICT_RETRIES:
+                raise
+
+
+def choose_representatives(cells):
+    """Chooses the representative of each cell again, finest level first."""
+    for cell in sorted(set(cells), key=len, reverse=True):
+        choose_representative(cell)
+
+
+def apply_change(old, new):
+    """Counts one landmark at its new image's location. Returns cells to re-represent.
+
+    Every step can be repeated, so a record retried after a failure is
+    applied once.
+    """
+    old_location, new_location = clusters.location(old), clusters.location(new)
+    count_at((new or old)['id'], clusters.counted(new_location))
+    stale = []
+    if old_location and old_location != new_location:
+        # Cells the landmark left must choose a representative from what remains
+        stale.extend(cell for cell in cells_represented_by(old_location[2], old['id'])
+                     if not new_location or not new_location[2].startswith(cell))
+    if new_location:
+        stale.extend(offer_representative(new_location[2], new, old.get('likes', 0) if old else None))
+    return stale
+
+
+def _changed(change):
+    # False for edits to attributes clusters do not show
+    old, new = change.get('OldImage'), change.get('NewImage')
+    if old is None or new is None:
+        return True
+    return any(old.get(name) != new.get(name) for name in clusters.REPRESENTATIVE_ATTRIBUTES + ('geohash',))
+
+
+def rebuild_all():
+    """Rebuilds the whole pyramid and the memberships from a scan of the Landmark table, e.g. to backfill."""
+    dynamodb_client = clients.client('dynamodb')
+    landmarks = dynamo.all_items(dynamo.scan, dynamodb_client, TableName=landmarks_table_name)
+    pyramid = clusters.build_pyramid(landmarks)
+    dynamo.batch_put(dynamodb_client, clusters.cluster_table_name, list(pyramid.values()))
+    stale = [
+        {'tile': item['tile'], 'cell': item['cell']}
+        for item in dynamo.all_items(dynamo.scan, dynamodb_client, TableName=clusters.cluster_table_name,
+                                     ProjectionExpression='tile, cell')
+        if item['cell'] not in pyramid
+    ]
+    dynamo.batch_delete(dynamodb_client, clusters.cluster_table_name, stale)
+
+    members = {}
+    for landmark in landmarks:
+        position = clusters.counted(clusters.location(landmark))
+        if position:
+            members[landmark['id']] = clusters.member(landmark['id'], position)
+    dynamo.batch_put(dynamodb_client, clusters.cluster_members_table_name, list(members.values()))
+    dynamo.batch_delete(dynamodb_client, clusters.cluster_members_table_name, [
+        {'id': item['id']}
+        for item in dynamo.all_items(dynamo.scan, dynamodb_client, TableName=clusters.cluster_members_table_name,
+                                     ProjectionExpression='id')
+        if item['id'] not in members
+    ])
+    return {'cells': len(pyramid), 'deleted': len(stale)}
+
+
+@metrics.instrument
+def handler(event, context):
+    # Invoked with Landmark stream records, or directly with {"all": true}
+    # to rebuild the pyramid from the table. A failed record is reported so
+    # Lambda retries the batch from it rather than from the start.
+    if event.get('all'):
+        return rebuild_all()
+
+    stale = []
+    applied = 0
+    failures = []
+    for record in event.get('Records', []):
+        change = record['dynamodb']
+        if not _changed(change):
+            continue
+        old, new = (dynamo.deserialize_item(change[image]) if image in change else None
+                    for image in ('OldImage', 'NewImage'))
+        try:
+            stale.extend(apply_change(old, new))
+        except Exception:
+            traceback.print_exc()
+            failures = [{'itemIdentifier': change['SequenceNumber']}]
+            break
+        applied += 1
+    choose_representatives(stale)
+    metrics.add('records', applied)
+    metrics.add('failedRecords', len(failures))
+    return {'applied': applied, 'rechosen': len(set(stale)), 'batchItemFailures': failures}
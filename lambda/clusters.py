@@ -0,0 +1,145 @@
+import os
+
+import geo
+
+# Map clusters of landmarks: a pyramid of geohash cells, one level per
+# precision from 1 to CLUSTER_MAX_PRECISION. Each non-empty cell is an item
+# of the LandmarkCluster table holding the number of landmarks in it, the
+# sums of their coordinates for the centroid, and its representative, the
+# most liked landmark. Counts and sums are updated with ADD as landmarks
+# change, so the pyramid is never rebuilt to take in a new landmark. Each
+# landmark's membership item in the LandmarkClusterMember table records
+# where it is counted and is written in the same transaction as the ADDs,
+# so a replayed stream record never counts a landmark twice.
+#
+# A map view at some zoom reads the cells of one precision covering its
+# box. Cells are stored under their tile, the cell's prefix two characters
+# shorter, so a view reads a few partitions of at most 1024 cells whatever
+# the number of landmarks.
+
+cluster_table_name = 'LandmarkCluster'
+cluster_members_table_name = 'LandmarkClusterMember'
+
+CLUSTER_MAX_PRECISION = int(os.environ.get('CLUSTER_MAX_PRECISION', 7))
+TILE_DEPTH = 2
+
+# Zoom from which a view gets landmarks instead of clusters
+POINTS_ZOOM = int(os.environ.get('CLUSTER_POINTS_ZOOM', 17))
+MAX_ZOOM = 22
+
+# Upper bound on the cells or landmarks one view returns
+MAX_CLUSTER_CELLS = int(os.environ.get('MAX_CLUSTER_CELLS', 1024))
+MAX_POINTS = int(os.environ.get('MAX_CLUSTER_POINTS', 500))
+
+# Coordinate sums are integers of 1e-7 degrees, so ADDs never drift and an
+# incrementally kept cell equals a rebuilt one
+COORDINATE_SCALE = 10 ** 7
+
+REPRESENTATIVE_ATTRIBUTES = ('id', 'name', 'type', 'image', 'likes', 'coordinates')
+
+
+def tile_key(cell):
+    return f'{len(cell)}:{cell[:max(len(cell) - TILE_DEPTH, 0)]}'
+
+
+def location(landmark):
+    # Returns (latitude, longitude, geohash) of a landmark, or None if it has no coordinates
+    coordinates = landmark.get('coordinates') if landmark else None
+    if not coordinates:
+        return None
+    latitude, longitude = float(coordinates['latitude']), float(coordinates['longitude'])
+    geohash = landmark.get('geohash') or geo.encode(latitude, longitude, CLUSTER_MAX_PRECISION)
+    return latitude, longitude, geohash
+
+
+def scaled(degrees):
+    return round(degrees * COORDINATE_SCALE)
+
+
+def counted(found):
+    # The (scaled latitude, scaled longitude, geohash) a location is counted as, or None
+    if found is None:
+        return None
+    latitude, longitude, geohash = found
+    return scaled(latitude), scaled(longitude), geohash
+
+
+def member(landmark_id, position):
+    # Membership item recording that a landmark is counted at a counted() position
+    latitude, longitude, geohash = position
+    return {'id': landmark_id, 'latitude': latitude, 'longitude': longitude, 'geohash': geohash}
+
+
+def cells_of(geohash):
+    # The landmark's cell at every level of the pyramid
+    return [geohash[:precision] for precision in range(1, CLUSTER_MAX_PRECISION + 1)]
+
+
+def representative(landmark):
+    return {name: landmark[name] for name in REPRESENTATIVE_ATTRIBUTES if name in landmark}
+
+
+def rank(landmark):
+    # Representatives are the most liked landmark, ties going to the lowest id
+    return landmark.get('likes', 0), _reverse(landmark['id'])
+
+
+def _reverse(text):
+    # Orders strings in reverse, so max() prefers the lowest; the end marker
+    # ranks an id above the longer ids it is a prefix of
+    return tuple(-ord(char) for char in text) + (1,)
+
+
+def build_pyramid(landmarks):
+    """Returns {cell: cluster item} of every level for the given landmarks."""
+    cells = {}
+    for landmark in landmarks:
+        found = location(landmark)
+        if found is None:
+            continue
+        latitude, longitude, geohash = found
+        for cell in cells_of(geohash):
+            item = cells.setdefault(cell, {'tile': tile_key(cell), 'cell': cell, 'count': 0, 'sumLat': 0,
+                                           'sumLon': 0})
+            item['count'] += 1
+            item['sumLat'] += scaled(latitude)
+            item['sumLon'] += scaled(longitude)
+            if 'rep' not in item or rank(landmark) > rank(item['rep']):
+                item['rep'] = representative(landmark)
+    for item in cells.values():
+        item['repLikes'] = item['rep'].get('likes', 0)
+        item['repId'] = item['rep']['id']
+    return cells
+
+
+def cluster(item):
+    # The response form of a cluster item
+    count = item['count']
+    return {
+        'cell': item['cell'],
+        'count': count,
+        'latitude': round(item['sumLat'] / count / COORDINATE_SCALE, 6),
+        'longitude': round(item['sumLon'] / count / COORDINATE_SCALE, 6),
+        'landmark': item.get('rep'),
+    }
+
+
+def parse_view(params):
+    """Returns (south, west, north, east, zoom) of a bbox=south,west,north,east&zoom= request."""
+    try:
+        south, west, north, east = (float(value) for value in params['bbox'].split(','))
+    except ValueError:
+        raise ValueError('bbox must be south,west,north,east')
+    zoom = int(params['zoom'])
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        raise ValueError('bbox out of range; split views crossing the antimeridian in two')
+    if not 0 <= zoom <= MAX_ZOOM:
+        raise ValueError(f'zoom must be between 0 and {MAX_ZOOM}')
+    return south, west, north, east, zoom
+
+
+def precision_for(zoom):
+    # Precision of the clusters drawn at zoom, or None to draw landmarks
+    if zoom >= POINTS_ZOOM:
+        return None
+    return min(geo.zoom_precision(zoom), CLUSTER_MAX_PRECISION)
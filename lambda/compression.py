@@ -0,0 +1,93 @@
+import base64
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    # Brotli is optional; without it only gzip is offered
+    brotli = None
+
+MIN_COMPRESS_BYTES = int(os.environ.get('MIN_COMPRESS_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.environ.get('BROTLI_QUALITY', 4))
+
+# Server preference, best first
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def compress(data, encoding, level=None):
+    if encoding == 'gzip':
+        # mtime=0 keeps the output identical for identical bodies
+        return gzip.compress(data, compresslevel=GZIP_LEVEL if level is None else level, mtime=0)
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY if level is None else level)
+    raise ValueError(f'Unsupported encoding: {encoding}')
+
+
+def parse_accept_encoding(header):
+    # Returns {coding: q} for an Accept-Encoding header
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        codings[coding] = q
+    return codings
+
+
+def choose_encoding(header):
+    """Picks the best supported encoding the client accepts, or None."""
+    if not header:
+        return None
+    codings = parse_accept_encoding(header)
+    wildcard = codings.get('*', 0.0)
+
+    best = None
+    best_q = 0.0
+    for encoding in ENCODINGS:
+        q = codings.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def get_header(event, name):
+    # API Gateway passes headers as sent, so match names case-insensitively
+    name = name.lower()
+    for key, value in (event.get('headers') or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+
+def compress_response(event, response):
+    """Compresses a proxy response body when the client accepts it and it is large enough."""
+    headers = response.setdefault('headers', {})
+    headers['Vary'] = 'Accept-Encoding'
+
+    body = response.get('body')
+    if not body or response.get('isBase64Encoded'):
+        return response
+
+    data = body.encode()
+    if len(data) < MIN_COMPRESS_BYTES:
+        return response
+
+    encoding = choose_encoding(get_header(event, 'Accept-Encoding'))
+    if encoding is None:
+        return response
+
+    response['body'] = base64.b64encode(compress(data, encoding)).decode()
+    response['isBase64Encoded'] = True
+    headers['Content-Encoding'] = encoding
+    return response
@@ -0,0 +1,159 @@
+import base64
+import random
+import time
+
+# Fast conversion between DynamoDB attribute values and plain Python types.
+#
+# The boto3 resource layer turns every number into a Decimal, which then
+# needs a json default hook per numeric field. These helpers work with the
+# low-level client and produce ints and floats directly. Numbers with more
+# precision than a float holds lose it; none of our attributes need that.
+
+
+def _number(value):
+    if '.' in value or 'e' in value or 'E' in value:
+        return float(value)
+    return int(value)
+
+
+def _binary(value):
+    # Binary values are returned base64 encoded so they stay JSON safe
+    return base64.b64encode(value).decode()
+
+
+_DESERIALIZERS = {
+    'S': lambda value: value,
+    'N': _number,
+    'BOOL': lambda value: value,
+    'NULL': lambda value: None,
+    'M': lambda value: {k: _deserialize(v) for k, v in value.items()},
+    'L': lambda value: [_deserialize(v) for v in value],
+    'SS': list,
+    'NS': lambda value: [_number(v) for v in value],
+    'B': _binary,
+    'BS': lambda value: [_binary(v) for v in value],
+}
+
+
+def _deserialize(attribute_value):
+    for type_name, value in attribute_value.items():
+        return _DESERIALIZERS[type_name](value)
+
+
+def deserialize_item(item):
+    return {name: _deserialize(value) for name, value in item.items()}
+
+
+def serialize_value(value):
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float)):
+        return {'N': repr(value)}
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, dict):
+        return {'M': serialize_item(value)}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize_value(v) for v in value]}
+    raise TypeError(f'Unsupported attribute value: {value!r}')
+
+
+def serialize_item(item):
+    return {name: serialize_value(value) for name, value in item.items()}
+
+
+def _request(kwargs):
+    kwargs = dict(kwargs)
+    for name in ('ExpressionAttributeValues', 'ExclusiveStartKey'):
+        if name in kwargs:
+            kwargs[name] = serialize_item(kwargs[name])
+    return kwargs
+
+
+def _response(response):
+    response['Items'] = [deserialize_item(item) for item in response.get('Items', ())]
+    if 'LastEvaluatedKey' in response:
+        response['LastEvaluatedKey'] = deserialize_item(response['LastEvaluatedKey'])
+    return response
+
+
+def get_item(client, **kwargs):
+    """Client get_item taking a plain Python Key. Returns the item, or None if there is none."""
+    kwargs['Key'] = serialize_item(kwargs['Key'])
+    item = client.get_item(**_request(kwargs)).get('Item')
+    return deserialize_item(item) if item is not None else None
+
+
+def query(client, **kwargs):
+    """Client query taking and returning plain Python values."""
+    return _response(client.query(**_request(kwargs)))
+
+
+def scan(client, **kwargs):
+    """Client scan taking and returning plain Python values."""
+    return _response(client.scan(**_request(kwargs)))
+
+
+def all_items(operation, client, **kwargs):
+    """Runs query or scan through every page, following LastEvaluatedKey. Returns all the items."""
+    items = []
+    while True:
+        response = operation(client, **kwargs)
+        items.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+# BatchGetItem accepts at most 100 keys per request
+BATCH_GET_SIZE = 100
+
+
+def batch_get(client, table_name, keys, max_retries=5, **kwargs):
+    """Reads items by plain Python keys with BatchGetItem.
+
+    Keys are sent in chunks of 100 and unprocessed keys are retried with
+    jittered backoff. Extra kwargs, e.g. ProjectionExpression, apply to
+    every request. Returns the items found, in no particular order.
+    """
+    items = []
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table_name: dict(kwargs, Keys=[serialize_item(key) for key in keys[start:start + BATCH_GET_SIZE]])}
+        for attempt in range(max_retries + 1):
+            response = client.batch_get_item(RequestItems=request)
+            items.extend(deserialize_item(item) for item in response['Responses'].get(table_name, ()))
+            request = response.get('UnprocessedKeys')
+            if not request:
+                break
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+        else:
+            raise RuntimeError(f'{len(request[table_name]["Keys"])} keys of {table_name} left unprocessed')
+    return items
+
+
+# BatchWriteItem accepts at most 25 requests per call
+BATCH_WRITE_SIZE = 25
+
+
+def _batch_write(client, table_name, requests, max_retries):
+    for start in range(0, len(requests), BATCH_WRITE_SIZE):
+        request = {table_name: requests[start:start + BATCH_WRITE_SIZE]}
+        for attempt in range(max_retries + 1):
+            request = client.batch_write_item(RequestItems=request).get('UnprocessedItems')
+            if not request:
+                break
+            time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+        else:
+            raise RuntimeError(f'{len(request[table_name])} writes to {table_name} left unprocessed')
+
+
+def batch_put(client, table_name, items, max_retries=5):
+    """Writes plain Python items with BatchWriteItem, retrying unprocessed ones like batch_get."""
+    _batch_write(client, table_name, [{'PutRequest': {'Item': serialize_item(item)}} for item in items], max_retries)
+
+
+def batch_delete(client, table_name, keys, max_retries=5):
+    """Deletes items by plain Python keys with BatchWriteItem."""
+    _batch_write(client, table_name, [{'DeleteRequest': {'Key': serialize_item(key)}} for key in keys], max_retries)
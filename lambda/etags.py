@@ -0,0 +1,45 @@
+import hashlib
+import json
+
+
+def fingerprint(value):
+    # Content hash of a read result
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class Fingerprints:
+    """Content hashes of read results, memoized on their read cache entries.
+
+    Values served from the read cache are shared and never mutated, so a
+    value's hash stays valid for as long as its entry holds it. Keeping the
+    hash on the entry leaves the cache's byte budget in charge of memory.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get(self, value):
+        return self.cache.memoize(value, fingerprint)
+
+
+def make_etag(*parts):
+    # Weak entity tag over everything that decides the response content.
+    # Presigned URLs differ between containers signing the same data, so
+    # equal tags promise equivalent bodies, not identical bytes.
+    return 'W/"' + hashlib.sha256('\0'.join(map(str, parts)).encode()).hexdigest()[:32] + '"'
+
+
+def matches(if_none_match, etag):
+    """True if an If-None-Match header value matches etag.
+
+    If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    """
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix('W/')
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag == '*' or tag.removeprefix('W/') == opaque:
+            return True
+    return False
@@ -0,0 +1,149 @@
+import math
+
+# Base32 alphabet used by geohash (no a, i, l, o)
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Length of the geohash prefix used as the partition key of the Landmark
+# geohashIndex GSI. Must match scripts/add_dynamodb_data.py.
+GEOHASH_INDEX_PRECISION = 4
+
+# Finest precision we will query the GSI sort key with
+GEOHASH_MAX_PRECISION = 9
+
+# Upper bound on the number of cells a single nearby query may cover
+MAX_COVERING_CELLS = 9
+
+# Cells of the GSI partition precision a query may read when no precision
+# fits MAX_COVERING_CELLS, as for wide areas far from the equator. Covers
+# the largest radius up to latitude 60; larger areas are rejected.
+MAX_QUERY_CELLS = 42
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def encode(latitude, longitude, precision=10):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if longitude >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits = bits << 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    # Returns the (height, width) of a geohash cell in degrees
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    # Great-circle distance between two points in meters
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def bounding_box(latitude, longitude, radius_m):
+    # Returns (south, west, north, east) of the box enclosing the circle
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = max(math.cos(math.radians(latitude)), 1e-12)
+    d_lon = min(math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat)), 180.0)
+    return (max(latitude - d_lat, -90.0), max(longitude - d_lon, -180.0),
+            min(latitude + d_lat, 90.0), min(longitude + d_lon, 180.0))
+
+
+def _steps(start, end, step):
+    # Points from start to end (inclusive) spaced one cell apart, so every
+    # cell the interval crosses is hit at least once
+    points = []
+    value = start
+    while value < end:
+        points.append(value)
+        value += step
+    points.append(end)
+    return points
+
+
+def covering_cells(latitude, longitude, radius_m):
+    """Returns the set of geohash cells covering a circle.
+
+    Picks the finest precision (never coarser than the GSI partition
+    precision) whose covering stays within MAX_COVERING_CELLS cells.
+    Queries that cross the antimeridian are clipped at +/-180. Raises
+    ValueError if the partition precision needs over MAX_QUERY_CELLS cells.
+    """
+    return box_covering_cells(*bounding_box(latitude, longitude, radius_m))
+
+
+def box_covering_cells(south, west, north, east):
+    # Like covering_cells, for a box
+    if box_cell_count(south, west, north, east, GEOHASH_INDEX_PRECISION) > MAX_QUERY_CELLS:
+        raise ValueError(f'area needs more than {MAX_QUERY_CELLS} index cells')
+    precision = GEOHASH_INDEX_PRECISION
+    for candidate in range(GEOHASH_MAX_PRECISION, GEOHASH_INDEX_PRECISION - 1, -1):
+        if box_cell_count(south, west, north, east, candidate) <= MAX_COVERING_CELLS:
+            precision = candidate
+            break
+
+    return box_cells(south, west, north, east, precision)
+
+
+def box_cells(south, west, north, east, precision):
+    # Returns the set of geohash cells of a precision covering a box
+    height, width = cell_size(precision)
+    cells = set()
+    for lat in _steps(south, north, height):
+        for lon in _steps(west, east, width):
+            cells.add(encode(lat, lon, precision))
+    return cells
+
+
+def box_cell_count(south, west, north, east, precision):
+    # Number of cells box_cells returns, without listing them
+    height, width = cell_size(precision)
+    rows = math.floor(north / height) - math.floor(south / height) + 1
+    cols = math.floor(east / width) - math.floor(west / width) + 1
+    return rows * cols
+
+
+def zoom_precision(zoom):
+    """Returns the coarsest geohash precision whose cells are at most half a map tile wide at zoom.
+
+    A web map tile spans 360 / 2**zoom degrees of longitude.
+    """
+    precision = 1
+    while (5 * precision + 1) // 2 < zoom + 1:
+        precision += 1
+    return precision
@@ -1,23 +1,121 @@
 import os
-import boto3
-from boto3.dynamodb.conditions import Key
 import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 from decimal import Decimal
 
-# DynamoDB Resource
-dynamodb = boto3.resource('dynamodb')
+import clients
+import clusters
+import compression
+import dynamo
+import etags
+import geo
+import images
+import leaderboard
+import metrics
+import pagination
+import projection
+import search
+import snapshots
+from read_cache import ReadCache
+from url_cache import PresignedUrlCache
 
-# S3 Client
-s3_client = boto3.client('s3')
+# S3 Bucket
 bucket_name = 'fun-facts-images'
 
 # Tables
-fun_facts_table = dynamodb.Table("FunFact")
-landmarks_table = dynamodb.Table("Landmark")
+fun_facts_table_name = "FunFact"
+landmarks_table_name = "Landmark"
+users_table_name = "User"
+
+
+# DynamoDB reads go through the shared low-level client. Items are converted
+# by the dynamo module, which yields native ints and floats instead of Decimals.
+def query(**kwargs):
+    return dynamo.query(clients.client('dynamodb'), **kwargs)
+
+
+def scan(**kwargs):
+    return dynamo.scan(clients.client('dynamodb'), **kwargs)
+
+# Keys every fun fact and landmark response includes, whatever its fields
+FUN_FACT_KEY = ('landmarkId', 'funFactId')
+LANDMARK_KEY = ('id',)
+
+# Attributes of a landmark's detail document, and the public profile of each
+# fun fact's submitter; emails are never exposed
+LANDMARK_DETAIL_FIELDS = tuple(sorted(projection.VIEWS['landmarks']['full']))
+SUBMITTER_FIELDS = ('userId', 'username', 'profilePicture', 'userCategory')
+
+# Nearby landmark search
+GEOHASH_INDEX_NAME = 'geohashIndex'
+DEFAULT_RADIUS_M = float(os.environ.get('DEFAULT_RADIUS_M', 1000))
+MAX_RADIUS_M = float(os.environ.get('MAX_RADIUS_M', 50000))
+
+# Multi-landmark fun fact queries
+MAX_BATCH_LANDMARKS = int(os.environ.get('MAX_BATCH_LANDMARKS', 25))
+BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', 8))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY)
+# Reported for a landmark whose page failed; the exception itself is only logged
+BATCH_READ_ERROR = 'Could not read fun facts'
+
+
+def sign_url(key, expires_in):
+    return clients.client('s3').generate_presigned_url('get_object', Params={'Bucket': bucket_name, 'Key': key}, ExpiresIn=expires_in)
+
+
+# Presigned URLs are reused across warm invocations until their time bucket ends
+url_cache = PresignedUrlCache(
+    sign_url,
+    expires_in=3600,
+    bucket_seconds=int(os.environ.get('URL_CACHE_BUCKET_SECONDS', 900)),
+    max_size=int(os.environ.get('URL_CACHE_MAX_SIZE', 2048)),
+)
 
 
 def generate_presigned_url(key):
-    return s3_client.generate_presigned_url('get_object', Params={'Bucket': bucket_name, 'Key': key}, ExpiresIn=3600)
+    return url_cache.get(key)
+
+
+# Query results are reused across warm invocations; cached values must not be mutated
+read_cache = ReadCache(
+    max_bytes=int(os.environ.get('READ_CACHE_MAX_BYTES', 16 * 1024 * 1024)),
+    ttl=float(os.environ.get('READ_CACHE_TTL', 60)),
+    stale_ttl=float(os.environ.get('READ_CACHE_STALE_TTL', 300)),
+    executor=batch_executor,
+)
+
+DEBUG = os.environ.get('DEBUG', '').lower() == 'true'
+
+# Serve original images unless the request asks for a variant
+ORIGINAL_IMAGES = (images.ORIGINAL, images.DEFAULT_FORMAT)
+
+# How long clients may reuse a response before revalidating it. Image URLs
+# stay valid at least 45 minutes after they are served, so every max-age is
+# well inside that; search follows the index's refresh interval.
+CACHE_CONTROL = {
+    'funFacts': 'private, max-age=60',
+    'landmarks': 'private, max-age=300',
+    'nearby': 'private, max-age=60',
+    'snapshot': 'private, max-age=60',
+    'search': 'public, max-age=300',
+    'landmark': 'private, max-age=60',
+    'top': 'public, max-age=60',
+    'clusters': 'public, max-age=60',
+}
+
+# Content hashes of read results, used for ETags without re-serializing them
+fingerprints = etags.Fingerprints(read_cache)
+
+
+def invalidate_fun_facts(landmark_id):
+    # Called by fun fact writes so this container stops serving the old list;
+    # other containers pick up the change once READ_CACHE_TTL has passed
+    return read_cache.invalidate(f'funFacts:{landmark_id}')
+
+
+def invalidate_landmarks():
+    return read_cache.invalidate('landmarks')
 
 
 def decimal_default(obj):
@@ -26,47 +124,658 @@ def decimal_default(obj):
     raise TypeError
 
 
+# Built once; items from the dynamo module never reach the default hook
+json_encoder = json.JSONEncoder(separators=(',', ':'), default=decimal_default)
+
+
+def error_response(status_code, message):
+    return {
+        'statusCode': status_code,
+        'body': json.dumps({'error': message}),
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
+
+
+def fun_facts_page(landmark_id, page_size, token=None, fields=None):
+    # Returns (items, next_key) for one page of a landmark's fun facts,
+    # with only the given fields unless fields is None
+    scope = f'/funFacts:{landmark_id}'
+    start_key = pagination.decode_token(token, scope) if token else None
+
+    kwargs = {
+        'TableName': fun_facts_table_name,
+        'KeyConditionExpression': 'landmarkId = :landmarkId',
+        'ExpressionAttributeValues': {':landmarkId': landmark_id},
+        **projection.projection(fields),
+    }
+    # The index has the table's keys, so tokens work with either
+    if projection.summary_index(fields):
+        kwargs['IndexName'] = projection.SUMMARY_INDEX_NAME
+
+    return read_cache.get(
+        ('/funFacts', landmark_id, page_size, token, fields),
+        lambda: pagination.read_page(query, kwargs, page_size, FUN_FACT_KEY, start_key),
+        tags=(f'funFacts:{landmark_id}',)
+    )
+
+
+def batch_fun_fact_pages(landmark_ids, page_size, fields=None):
+    # Query each landmark's partition concurrently. Returns {landmark id: page},
+    # where a page is (items, next_key) or the exception reading it raised.
+    futures = {
+        landmark_id: batch_executor.submit(metrics.bind(fun_facts_page), landmark_id, page_size, fields=fields)
+        for landmark_id in landmark_ids
+    }
+
+    pages = {}
+    for landmark_id, future in futures.items():
+        try:
+            pages[landmark_id], _ = future.result()
+        except Exception as e:
+            traceback.print_exc()
+            pages[landmark_id] = e
+    return pages
+
+
+def batch_fun_facts(landmark_ids, page_size, image_hint=ORIGINAL_IMAGES, pages=None, fields=None):
+    # Failures are reported per id
+    if pages is None:
+        pages = batch_fun_fact_pages(landmark_ids, page_size, fields)
+
+    results = {}
+    errors = {}
+    for landmark_id, page in pages.items():
+        if isinstance(page, Exception):
+            errors[landmark_id] = BATCH_READ_ERROR
+            continue
+        items, next_key = page
+
+        results[landmark_id] = {'items': items}
+        if next_key:
+            results[landmark_id]['nextToken'] = pagination.encode_token(next_key, f'/funFacts:{landmark_id}')
+
+    # Resolve every landmark's images together
+    urls = image_urls([item['imageName'] for result in results.values() for item in result['items']
+                       if 'imageName' in item], image_hint)
+    for result in results.values():
+        result['items'] = [add_image_url(item, 'imageName', urls) for item in result['items']]
+
+    return {'results': results, 'errors': errors}
+
+
+def parse_landmark_ids(value):
+    landmark_ids = list(dict.fromkeys(landmark_id for landmark_id in value.split(',') if landmark_id))
+    if not landmark_ids:
+        raise ValueError('landmarkIds is empty')
+    if len(landmark_ids) > MAX_BATCH_LANDMARKS:
+        raise ValueError(f'at most {MAX_BATCH_LANDMARKS} landmarkIds are allowed')
+    return landmark_ids
+
+
+def query_geohash_cell(cell, fields=None):
+    # Query one covering cell of the geohashIndex GSI, following pagination
+    key_condition = 'geohashPrefix = :prefix'
+    values = {':prefix': cell[:geo.GEOHASH_INDEX_PRECISION]}
+    if len(cell) > geo.GEOHASH_INDEX_PRECISION:
+        key_condition += ' AND begins_with(geohash, :cell)'
+        values[':cell'] = cell
+
+    def load():
+        kwargs = {
+            'TableName': landmarks_table_name,
+            'IndexName': GEOHASH_INDEX_NAME,
+            'KeyConditionExpression': key_condition,
+            'ExpressionAttributeValues': values,
+            **projection.projection(fields),
+        }
+        items = []
+        while True:
+            response = query(**kwargs)
+            items.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    # Cells are shared by every nearby query that overlaps them
+    items, _ = read_cache.get(('geohash', cell, fields), load, tags=('landmarks',))
+    return items
+
+
+def query_geohash_cells(cells, fields=None):
+    # Items of each cell, the cells read concurrently
+    futures = [batch_executor.submit(metrics.bind(query_geohash_cell), cell, fields) for cell in sorted(cells)]
+    return [future.result() for future in futures]
+
+
+def covering_items(latitude, longitude, radius, fields=None):
+    # Items of each geohash cell covering the circle; raises ValueError if it needs too many
+    return query_geohash_cells(geo.covering_cells(latitude, longitude, radius), fields)
+
+
+def nearby_landmarks(latitude, longitude, radius, cells=None, fields=None):
+    # Read only the geohash cells covering the circle, then filter by true distance
+    if cells is None:
+        cells = covering_items(latitude, longitude, radius, fields)
+    items = []
+    for cell_items in cells:
+        for item in cell_items:
+            coordinates = item['coordinates']
+            distance = geo.haversine(latitude, longitude,
+                                     float(coordinates['latitude']), float(coordinates['longitude']))
+            if distance <= radius:
+                items.append(dict(item, distance=round(distance, 1)))
+
+    items.sort(key=lambda item: item['distance'])
+    return items
+
+
+def cluster_tile(tile):
+    # Every non-empty cell of one tile of the cluster pyramid
+    def load():
+        kwargs = {
+            'TableName': clusters.cluster_table_name,
+            'KeyConditionExpression': 'tile = :tile',
+            'ExpressionAttributeValues': {':tile': tile},
+        }
+        items = []
+        while True:
+            response = query(**kwargs)
+            items.extend(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                return items
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    # Tiles are shared by every view that overlaps them
+    items, _ = read_cache.get(('clusters', tile), load, tags=('clusters',))
+    return items
+
+
+def view_clusters(tiles, cells):
+    # The clusters of the view's cells, skipping cells emptied by deletions
+    items = [item for tile_items in tiles for item in tile_items
+             if item['cell'] in cells and item.get('count', 0) > 0]
+    items.sort(key=lambda item: item['cell'])
+    return [clusters.cluster(item) for item in items]
+
+
+def view_landmarks(south, west, north, east, cells):
+    # The most liked MAX_POINTS landmarks inside the box
+    items = []
+    for cell_items in cells:
+        for item in cell_items:
+            coordinates = item['coordinates']
+            if (south <= float(coordinates['latitude']) <= north
+                    and west <= float(coordinates['longitude']) <= east):
+                items.append(item)
+    items.sort(key=clusters.rank, reverse=True)
+    return items[:clusters.MAX_POINTS]
+
+
+def city_snapshot(city):
+    # Returns the city's snapshot pointer, or None if it has no snapshot
+    slug = snapshots.city_slug(city)
+    pointer, _ = read_cache.get(
+        ('snapshot', slug),
+        lambda: snapshots.read_pointer(clients.client('s3'), snapshots.SNAPSHOT_BUCKET, slug),
+        tags=('snapshots',)
+    )
+    return pointer
+
+
+def snapshot_content(pointer, image_hint=ORIGINAL_IMAGES):
+    # Snapshot objects are content-addressed, so a cached copy is never stale
+    document, _ = read_cache.get(
+        ('snapshotContent', pointer['key']),
+        lambda: snapshots.read_snapshot(clients.client('s3'), snapshots.SNAPSHOT_BUCKET, pointer['key'])
+    )
+    urls = image_urls(pointer['images'], image_hint)
+    landmarks = [
+        add_image_url(dict(landmark, funFacts=[add_image_url(fun_fact, 'imageName', urls)
+                                               for fun_fact in landmark['funFacts']]), 'image', urls)
+        for landmark in document['landmarks']
+    ]
+    return dict(document, landmarks=landmarks)
+
+
+def get_landmark(landmark_id):
+    # Returns the landmark, or None if there is no such landmark
+    item, _ = read_cache.get(
+        ('landmark', landmark_id),
+        lambda: dynamo.get_item(clients.client('dynamodb'), TableName=landmarks_table_name, Key={'id': landmark_id},
+                                **projection.projection(LANDMARK_DETAIL_FIELDS)),
+        tags=('landmarks',)
+    )
+    return item
+
+
+def submitter_profiles(user_ids):
+    # Returns {user id: public profile} of the users among user_ids, read with one BatchGetItem
+    user_ids = tuple(sorted(set(user_ids)))
+    if not user_ids:
+        return {}
+
+    def load():
+        items = dynamo.batch_get(clients.client('dynamodb'), users_table_name,
+                                 [{'userId': user_id} for user_id in user_ids],
+                                 **projection.projection(SUBMITTER_FIELDS))
+        return {item['userId']: item for item in items}
+
+    profiles, _ = read_cache.get(('users', user_ids), load, tags=('users',))
+    return profiles
+
+
+def landmark_detail(landmark_id, page_size, fields=None):
+    """Reads a landmark, the first page of its fun facts and their submitters.
+
+    The landmark is read while the fun facts and then their submitters are,
+    so this takes about as long as the slower of the two. Returns
+    (landmark, page, profiles); landmark is None if it does not exist.
+    """
+    landmark = batch_executor.submit(metrics.bind(get_landmark), landmark_id)
+    page, _ = fun_facts_page(landmark_id, page_size, fields=fields)
+    items, _ = page
+    profiles = submitter_profiles(item['submittedBy'] for item in items if 'submittedBy' in item)
+    return landmark.result(), page, profiles
+
+
+def render_landmark_detail(landmark, page, profiles, image_hint=ORIGINAL_IMAGES):
+    # One document with the landmark, its fun facts and each fact's submitter
+    items, next_key = page
+    image_names = [item['imageName'] for item in items if 'imageName' in item]
+    if 'image' in landmark:
+        image_names.append(landmark['image'])
+    urls = image_urls(image_names, image_hint)
+    fun_facts = []
+    for item in items:
+        if 'submittedBy' in item:
+            item = dict(item, submitter=profiles.get(item['submittedBy']))
+        fun_facts.append(add_image_url(item, 'imageName', urls))
+
+    document = {'landmark': add_image_url(landmark, 'image', urls), 'funFacts': fun_facts}
+    if next_key:
+        # Further fun facts continue on /funFacts?landmarkId=
+        document['nextToken'] = pagination.encode_token(next_key, f"/funFacts:{landmark['id']}")
+    return document
+
+
+def city_leaderboard(city):
+    # Returns (board, revision) of the city's trending fun facts, an empty board if it has none
+    slug = snapshots.city_slug(city)
+    board, _ = read_cache.get(
+        ('leaderboard', slug),
+        lambda: leaderboard.read_board(clients.client('dynamodb'), slug),
+        tags=('leaderboard',)
+    )
+    return board
+
+
+def parse_city(params):
+    city = (params['city'], params.get('state'), params.get('country'))
+    if not all(city):
+        raise ValueError('city, state and country are required')
+    return city
+
+
+def image_variants(image_names):
+    # Returns {image name: variant ids} for the processed images among image_names
+    image_names = tuple(sorted(set(image_names)))
+    if not image_names:
+        return {}
+
+    def load():
+        items = dynamo.batch_get(
+            clients.client('dynamodb'), images.image_variants_table_name,
+            [{'imageName': image_name} for image_name in image_names],
+            ProjectionExpression='imageName, variants'
+        )
+        return {item['imageName']: sorted(item['variants']) for item in items}
+
+    # Unprocessed images are looked up again once the entry expires
+    variants, _ = read_cache.get(('imageVariants', image_names), load, tags=('imageVariants',))
+    return variants
+
+
+@metrics.phase('presign')
+def image_urls(image_names, image_hint):
+    # Returns {image name: pre-signed URL of the variant matching the hint}
+    size, image_format = image_hint
+    variants = image_variants(image_names) if size != images.ORIGINAL else {}
+    return {
+        image_name: generate_presigned_url(images.image_key(image_name, variants.get(image_name, ()), size,
+                                                            image_format))
+        for image_name in image_names
+    }
+
+
+def add_image_url(item, image_attribute, urls):
+    if image_attribute in item:
+        return dict(item, imageUrl=urls[item[image_attribute]])
+    return item
+
+
+def with_image_urls(items, image_attribute, image_hint=ORIGINAL_IMAGES):
+    # Copies the items, adding a pre-signed URL for each image
+    urls = image_urls([item[image_attribute] for item in items if image_attribute in item], image_hint)
+    return [add_image_url(item, image_attribute, urls) for item in items]
+
+
+def parse_location(params):
+    latitude = float(params['lat'])
+    longitude = float(params['lon'])
+    radius = float(params.get('radius', DEFAULT_RADIUS_M))
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('lat/lon out of range')
+    if not (0 < radius <= MAX_RADIUS_M):
+        raise ValueError(f'radius must be between 0 and {MAX_RADIUS_M:g} meters')
+    return latitude, longitude, radius
+
+
+def count_items(result):
+    # Items in a rendered body: fun facts, landmarks or search results
+    if isinstance(result, list):
+        return len(result)
+    if 'results' in result:
+        return sum(len(page['items']) for page in result['results'].values())
+    if 'funFacts' in result:
+        return 1 + len(result['funFacts'])
+    return len(result.get('landmarks', ())) + len(result.get('clusters', ()))
+
+
+def not_modified(event, headers):
+    return compression.compress_response(event, {
+        'statusCode': 304,
+        'body': '',
+        'headers': headers
+    })
+
+
+@metrics.instrument
 def handler(event, context):
+    try:
+        return respond(event)
+    finally:
+        # The container is frozen once this returns, so reloads of stale
+        # entries served by this request must finish first
+        read_cache.wait_for_refreshes()
+
+
+def respond(event):
     # Determine the requested endpoint
     resource = event['resource']
+    params = event.get('queryStringParameters') or {}
+    next_key = None
+    cache_status = None
+
+    try:
+        page_size = pagination.parse_page_size(params)
+    except ValueError as e:
+        return error_response(400, f'Invalid pageSize: {e}')
+
+    try:
+        image_hint = images.parse_image_hint(params)
+    except ValueError as e:
+        return error_response(400, f'Invalid image parameters: {e}')
+
+    # Each route reads its data, then sets the versions of what it read and
+    # a render() that adds image URLs. Rendering is skipped on a 304.
+    signed = True
 
     if resource == '/funFacts':
-        landmark_id = event['queryStringParameters']['landmarkId']
-        response = fun_facts_table.query(
-            KeyConditionExpression=Key('landmarkId').eq(landmark_id)
-        )
+        try:
+            fields = projection.parse_fields(params.get('fields'), 'funFacts', FUN_FACT_KEY)
+        except ValueError as e:
+            return error_response(400, f'Invalid fields: {e}')
+        # Images not asked for are not presigned
+        signed = fields is None or 'imageName' in fields
+
+    if resource == '/funFacts/top':
+        try:
+            city = parse_city(params)
+            k = leaderboard.parse_k(params)
+        except (KeyError, ValueError) as e:
+            return error_response(400, f'Invalid leaderboard parameters: {e}')
+
+        # The city's k best fun facts by time-decayed score, best first
+        board, revision = city_leaderboard(city)
+        # Every write of a board bumps its revision
+        versions = [revision]
+        cache_control = CACHE_CONTROL['top']
+
+        def render():
+            return with_image_urls(leaderboard.top(board, k), 'imageName', image_hint)
+
+    elif resource == '/funFacts' and 'landmarkIds' in params:
+        try:
+            landmark_ids = parse_landmark_ids(params['landmarkIds'])
+        except ValueError as e:
+            return error_response(400, f'Invalid landmarkIds: {e}')
+
+        # Return the first page of fun facts for every landmark, grouped by id
+        pages = batch_fun_fact_pages(landmark_ids, page_size, fields)
+        versions = [BATCH_READ_ERROR if isinstance(page, Exception) else fingerprints.get(page) for page in pages.values()]
+        cache_control = CACHE_CONTROL['funFacts']
+
+        def render():
+            return batch_fun_facts(landmark_ids, page_size, image_hint, pages)
+
+    elif resource == '/funFacts':
+        if 'landmarkId' not in params:
+            # Optional at the gateway since landmarkIds can replace it
+            return error_response(400, 'landmarkId or landmarkIds is required')
+        landmark_id = params['landmarkId']
+        scope = f'/funFacts:{landmark_id}'
+        try:
+            page, cache_status = fun_facts_page(landmark_id, page_size, params.get('nextToken'), fields)
+        except pagination.InvalidToken as e:
+            return error_response(400, str(e))
+        items, next_key = page
+        versions = [fingerprints.get(page)]
+        cache_control = CACHE_CONTROL['funFacts']
+
+        def render():
+            # Generate pre-signed URLs for images
+            return with_image_urls(items, 'imageName', image_hint)
 
-        items = response['Items']
+    elif resource == '/landmarks/{id}':
+        landmark_id = (event.get('pathParameters') or {}).get('id')
+        if not landmark_id:
+            return error_response(400, 'Landmark id is required')
+        try:
+            fields = projection.parse_fields(params.get('fields'), 'funFacts', FUN_FACT_KEY)
+        except ValueError as e:
+            return error_response(400, f'Invalid fields: {e}')
 
-        # Generate pre-signed URLs for images
-        for item in items:
-            if 'imageName' in item:
-                item['imageUrl'] = generate_presigned_url(f"{item['imageName']}.jpeg")
+        # The landmark, its fun facts and their submitters in one response
+        # instead of 2 + N client round trips
+        landmark, page, profiles = landmark_detail(landmark_id, page_size, fields)
+        if landmark is None:
+            return error_response(404, 'Landmark not found')
+        versions = [fingerprints.get(landmark), fingerprints.get(page), fingerprints.get(profiles)]
+        cache_control = CACHE_CONTROL['landmark']
+
+        def render():
+            return render_landmark_detail(landmark, page, profiles, image_hint)
+
+    elif resource == '/landmarks' and 'city' in params:
+        try:
+            city = parse_city(params)
+        except ValueError as e:
+            return error_response(400, f'Invalid city parameters: {e}')
+        mode = params.get('snapshot', 'url')
+        if mode not in ('url', 'content'):
+            return error_response(400, 'snapshot must be url or content')
+
+        pointer = city_snapshot(city)
+        if pointer is None:
+            return error_response(404, 'No snapshot for this city')
+        versions = [pointer['version']]
+        cache_control = CACHE_CONTROL['snapshot']
+
+        def render():
+            if mode == 'content':
+                return snapshot_content(pointer, image_hint)
+            # The client fetches the city's landmarks and top fun facts in one
+            # request to S3, with URLs for the images they reference
+            return {
+                'version': pointer['version'],
+                'url': generate_presigned_url(pointer['key']),
+                'imageUrls': image_urls(pointer['images'], image_hint),
+            }
 
     elif resource == '/landmarks':
-        # Return the first 20 items from the landmarks table
-        response = landmarks_table.scan(Limit=20)
-        items = response['Items']
+        view = 'bbox' in params or 'zoom' in params
+        nearby = 'lat' in params or 'lon' in params
+        try:
+            # Nearby and map view results are filtered by their coordinates
+            fields = projection.parse_fields(params.get('fields'), 'landmarks',
+                                             LANDMARK_KEY + ('coordinates',) if nearby or view else LANDMARK_KEY)
+        except ValueError as e:
+            return error_response(400, f'Invalid fields: {e}')
+        signed = fields is None or 'image' in fields
+
+        if view:
+            try:
+                south, west, north, east, zoom = clusters.parse_view(params)
+            except (KeyError, ValueError) as e:
+                return error_response(400, f'Invalid view parameters: {e}')
+            precision = clusters.precision_for(zoom)
+            cache_control = CACHE_CONTROL['clusters']
+
+            if precision is None:
+                # Zoomed in far enough to draw the landmarks themselves
+                try:
+                    cells = query_geohash_cells(geo.box_covering_cells(south, west, north, east), fields)
+                except ValueError as e:
+                    return error_response(400, f'bbox too large for zoom {zoom}: {e}')
+                versions = [fingerprints.get(cell_items) for cell_items in cells]
+
+                def render():
+                    items = view_landmarks(south, west, north, east, cells)
+                    return {'zoom': zoom, 'precision': None, 'clusters': [],
+                            'landmarks': with_image_urls(items, 'image', image_hint)}
+            else:
+                # One cluster per non-empty cell of the zoom's precision; the
+                # representatives' attributes are fixed, so fields is ignored
+                if geo.box_cell_count(south, west, north, east, precision) > clusters.MAX_CLUSTER_CELLS:
+                    return error_response(400, f'bbox too large for zoom {zoom}')
+                cells = geo.box_cells(south, west, north, east, precision)
+                tiles = [cluster_tile(tile) for tile in sorted({clusters.tile_key(cell) for cell in cells})]
+                versions = [fingerprints.get(tile_items) for tile_items in tiles]
+                signed = True
+
+                def render():
+                    found = view_clusters(tiles, cells)
+                    representatives = [item['landmark'] for item in found if item['landmark']]
+                    urls = image_urls([item['image'] for item in representatives if 'image' in item], image_hint)
+                    for item in found:
+                        if item['landmark']:
+                            item['landmark'] = add_image_url(item['landmark'], 'image', urls)
+                    return {'zoom': zoom, 'precision': precision, 'clusters': found, 'landmarks': []}
 
-        # Generate pre-signed URLs for images
-        for item in items:
-            if 'image' in item:
-                item['imageUrl'] = generate_presigned_url(f"{item['image']}.jpeg")
+        elif nearby:
+            try:
+                latitude, longitude, radius = parse_location(params)
+                # Return the closest pageSize landmarks within the radius
+                cells = covering_items(latitude, longitude, radius, fields)
+            except (KeyError, ValueError) as e:
+                return error_response(400, f'Invalid location parameters: {e}')
+
+            versions = [fingerprints.get(cell_items) for cell_items in cells]
+            cache_control = CACHE_CONTROL['nearby']
+
+            def render():
+                items = nearby_landmarks(latitude, longitude, radius, cells)[:page_size]
+                return with_image_urls(items, 'image', image_hint)
+        else:
+            scope = '/landmarks'
+            try:
+                start_key = pagination.start_key(params, scope)
+            except pagination.InvalidToken as e:
+                return error_response(400, str(e))
+
+            # Return one page of the landmarks table
+            page, cache_status = read_cache.get(
+                ('/landmarks', page_size, params.get('nextToken'), fields),
+                lambda: pagination.read_page(
+                    scan, {'TableName': landmarks_table_name, **projection.projection(fields)}, page_size,
+                    LANDMARK_KEY, start_key
+                ),
+                tags=('landmarks',)
+            )
+            items, next_key = page
+            versions = [fingerprints.get(page)]
+            cache_control = CACHE_CONTROL['landmarks']
+
+            def render():
+                # Generate pre-signed URLs for images
+                return with_image_urls(items, 'image', image_hint)
+
+    elif resource == '/search':
+        try:
+            index = search.get_index()
+        except Exception as e:
+            return error_response(503, f'Search index unavailable: {e}')
+
+        if 'prefix' in params:
+            # Autocomplete hashtags by prefix
+            def render():
+                return index.suggest_tags(params['prefix'], page_size)
+        elif 'q' in params:
+            # Rank approved fun facts by the query's terms and #hashtags
+            def render():
+                return index.search(params['q'], page_size)
+        else:
+            return error_response(400, 'q or prefix is required')
+        versions = [index.version]
+        cache_control = CACHE_CONTROL['search']
+        signed = False
 
     else:
         # Handle invalid resource requests
-        return {
-            'statusCode': 404,
-            'body': json.dumps({'error': 'Invalid resource'}),
-            'headers': {
-                'Content-Type': 'application/json'
-            }
-        }
+        return error_response(404, 'Invalid resource')
 
-    return {
-        'statusCode': 200,
-        'body': json.dumps(response['Items'], default=decimal_default),
-        'headers': {
-            'Content-Type': 'application/json'
-        }
+    metrics.mark('read')
+
+    # The ETag covers everything that decides the response bytes: the data
+    # read, the request, the encoding and, when the body holds signed URLs,
+    # the URL cache bucket they were signed in
+    etag = etags.make_etag(
+        resource, sorted(params.items()), *versions,
+        url_cache.current_bucket() if signed else '',
+        compression.choose_encoding(compression.get_header(event, 'Accept-Encoding'))
+    )
+    headers = {
+        'Content-Type': 'application/json',
+        'ETag': etag,
+        'Cache-Control': cache_control,
     }
+    if next_key:
+        headers['X-Next-Token'] = pagination.encode_token(next_key, scope)
+
+    # The client's copy is current, so nothing is presigned or serialized
+    if etags.matches(compression.get_header(event, 'If-None-Match'), etag):
+        body = None
+    else:
+        with metrics.phase('render'):
+            result = render()
+        with metrics.phase('serialize'):
+            body = json_encoder.encode(result)
+        metrics.add('itemsReturned', count_items(result))
+        metrics.add('bytesSerialized', len(body))
+
+    if DEBUG:
+        if cache_status:
+            headers['X-Cache'] = cache_status
+        headers['X-Cache-Stats'] = json.dumps({'read': read_cache.stats(), 'url': url_cache.stats()})
+
+    if body is None:
+        return not_modified(event, headers)
+
+    with metrics.phase('compress'):
+        return compression.compress_response(event, {
+            'statusCode': 200,
+            'body': body,
+            'headers': headers
+        })
@@ -0,0 +1,96 @@
+import io
+import os
+from datetime import datetime
+from urllib.parse import unquote_plus
+
+from PIL import Image, ImageOps
+
+import clients
+import dynamo
+import images
+import metrics
+
+JPEG_QUALITY = int(os.environ.get('JPEG_QUALITY', 80))
+WEBP_QUALITY = int(os.environ.get('WEBP_QUALITY', 75))
+
+# Re-uploading an original rewrites its variants under the same keys, so
+# they are cached for a day rather than forever
+VARIANT_CACHE_CONTROL = 'public, max-age=86400'
+
+CONTENT_TYPES = {
+    'webp': 'image/webp',
+    'jpeg': 'image/jpeg',
+}
+
+
+def encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def render_variants(original):
+    """Returns {variant id: bytes} for the variants worth serving.
+
+    Variants are never enlarged, and ones no smaller than the original are
+    dropped since serving the original costs the same.
+    """
+    image = Image.open(io.BytesIO(original))
+    # Apply the camera's orientation before the EXIF data is dropped
+    image = ImageOps.exif_transpose(image).convert('RGB')
+
+    variants = {}
+    # Largest first, each size resized from the previous one
+    for size, edge in sorted(images.VARIANT_SIZES.items(), key=lambda variant: -variant[1]):
+        image = image.copy()
+        image.thumbnail((edge, edge), Image.LANCZOS)
+        for image_format in images.VARIANT_FORMATS:
+            data = encode(image, image_format)
+            if len(data) < len(original):
+                variants[(size, image_format)] = data
+    return variants
+
+
+def process(bucket, key):
+    """Writes the variants of one original and records them. Returns the ImageVariant item."""
+    name = images.image_name(key)
+    s3 = clients.client('s3')
+    with metrics.phase('download'):
+        original = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    with metrics.phase('resize'):
+        variants = render_variants(original)
+
+    sizes = {}
+    with metrics.phase('upload'):
+        for (size, image_format), data in variants.items():
+            s3.put_object(Bucket=bucket, Key=images.variant_key(name, size, image_format), Body=data,
+                          ContentType=CONTENT_TYPES[image_format], CacheControl=VARIANT_CACHE_CONTROL)
+            sizes[images.variant_id(size, image_format)] = len(data)
+
+    # Recorded after the uploads so readers never pick a missing variant
+    item = {
+        'imageName': name,
+        'originalBytes': len(original),
+        'variants': sizes,
+        'processedAt': datetime.now().isoformat(),
+    }
+    clients.client('dynamodb').put_item(TableName=images.image_variants_table_name, Item=dynamo.serialize_item(item))
+    return item
+
+
+@metrics.instrument
+def handler(event, context):
+    # Invoked by S3 for new .jpeg objects; anything that is not an original
+    # at the top of the bucket is ignored
+    processed = []
+    for record in event.get('Records', []):
+        bucket = record['s3']['bucket']['name']
+        key = unquote_plus(record['s3']['object']['key'])
+        if images.image_name(key) is None:
+            continue
+        item = process(bucket, key)
+        processed.append({'imageName': item['imageName'], 'variants': sorted(item['variants'])})
+    return {'processed': processed}
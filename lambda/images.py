@@ -0,0 +1,68 @@
+# Resized image variants of the originals in the images bucket.
+#
+# Originals are uploaded as {imageName}.jpeg. The image processor writes
+# every size in VARIANT_SIZES in every format in VARIANT_FORMATS under
+# variants/{imageName}/ and records the ones it kept in the ImageVariant
+# table, so readers can tell which exist without listing the bucket.
+
+image_variants_table_name = 'ImageVariant'
+
+ORIGINAL = 'original'
+
+# Longest edge in pixels for each size hint
+VARIANT_SIZES = {
+    'thumb': 160,
+    'small': 480,
+    'medium': 1024,
+}
+
+# Variant formats and their file extensions. JPEG variants use .jpg so they
+# never match the .jpeg upload notification of originals.
+VARIANT_FORMATS = {
+    'webp': 'webp',
+    'jpeg': 'jpg',
+}
+
+DEFAULT_FORMAT = 'webp'
+
+
+def original_key(image_name):
+    return f'{image_name}.jpeg'
+
+
+def image_name(key):
+    """Returns the image name of an original's key, or None for any other key."""
+    if '/' in key or not key.endswith('.jpeg'):
+        return None
+    return key[:-len('.jpeg')]
+
+
+def variant_id(size, image_format):
+    return f'{size}.{VARIANT_FORMATS[image_format]}'
+
+
+def variant_key(image_name, size, image_format):
+    return f'variants/{image_name}/{variant_id(size, image_format)}'
+
+
+def parse_image_hint(params):
+    """Returns the (size, format) requested by imageSize and imageFormat."""
+    size = params.get('imageSize', ORIGINAL)
+    if size != ORIGINAL and size not in VARIANT_SIZES:
+        raise ValueError(f'imageSize must be one of {", ".join([ORIGINAL, *VARIANT_SIZES])}')
+    image_format = params.get('imageFormat', DEFAULT_FORMAT)
+    if image_format not in VARIANT_FORMATS:
+        raise ValueError(f'imageFormat must be one of {", ".join(VARIANT_FORMATS)}')
+    return size, image_format
+
+
+def image_key(image_name, variants, size, image_format):
+    """Returns the key to serve for a size hint, falling back to the original.
+
+    variants holds the variant ids processed for the image; it is empty
+    until the processor has run, and lacks variants that would not have
+    been smaller than the original.
+    """
+    if size != ORIGINAL and variant_id(size, image_format) in variants:
+        return variant_key(image_name, size, image_format)
+    return original_key(image_name)
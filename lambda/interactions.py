@@ -0,0 +1,129 @@
+import os
+import base64
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import clients
+import like_counters
+import metrics
+
+interactions_table_name = 'UserInteraction'
+
+# Transactions touching a shard another transaction holds are cancelled;
+# they are retried on another random shard
+MAX_CONFLICT_RETRIES = 5
+
+MAX_BATCH_EVENTS = int(os.environ.get('MAX_BATCH_EVENTS', 100))
+INTERACTION_CONCURRENCY = int(os.environ.get('INTERACTION_CONCURRENCY', 8))
+interaction_executor = ThreadPoolExecutor(max_workers=INTERACTION_CONCURRENCY)
+
+ACTIONS = ('like', 'unlike')
+
+
+def response(status_code, body):
+    return {
+        'statusCode': status_code,
+        'body': json.dumps(body),
+        'headers': {
+            'Content-Type': 'application/json'
+        }
+    }
+
+
+def apply_event(event):
+    """Applies one like/unlike event and returns its result.
+
+    The per-user interaction item and a random counter shard are written in
+    one transaction. The interaction write is conditional, so liking twice,
+    unliking something never liked or unliking it under another landmark
+    changes no counter. Interactions are keyed by user, so likes on one
+    fact spread over every liker's partition.
+    """
+    try:
+        user_id = event['userId']
+        landmark_id = event['landmarkId']
+        fun_fact_id = event['funFactId']
+        action = event['action']
+    except (KeyError, TypeError) as e:
+        return {'status': 'error', 'error': f'Missing field: {e}'}
+    if action not in ACTIONS:
+        return {'status': 'error', 'error': f'action must be one of {", ".join(ACTIONS)}'}
+
+    result = {'userId': user_id, 'funFactId': fun_fact_id, 'action': action}
+    interaction_key = {'userId': {'S': user_id}, 'interactionId': {'S': f'like#{fun_fact_id}'}}
+
+    if action == 'like':
+        interaction_write = {'Put': {
+            'TableName': interactions_table_name,
+            'Item': dict(interaction_key, **{
+                'funFactId': {'S': fun_fact_id},
+                'landmarkId': {'S': landmark_id},
+                'interactionType': {'S': 'like'},
+                'createdAt': {'S': datetime.now().isoformat()},
+            }),
+            'ConditionExpression': 'attribute_not_exists(userId)',
+        }}
+    else:
+        interaction_write = {'Delete': {
+            'TableName': interactions_table_name,
+            'Key': interaction_key,
+            # The counter decremented is the landmark's the like was counted under
+            'ConditionExpression': 'attribute_exists(userId) AND landmarkId = :landmarkId',
+            'ExpressionAttributeValues': {':landmarkId': {'S': landmark_id}},
+        }}
+
+    dynamodb_client = clients.client('dynamodb')
+    for attempt in range(MAX_CONFLICT_RETRIES + 1):
+        counter_write = {'Update': {
+            'TableName': like_counters.like_counters_table_name,
+            'Key': {'counterId': {'S': like_counters.shard_id(
+                like_counters.counter_id(landmark_id, fun_fact_id),
+                random.randrange(like_counters.LIKE_COUNTER_SHARDS)
+            )}},
+            'UpdateExpression': 'ADD likes :delta',
+            'ExpressionAttributeValues': {':delta': {'N': '1' if action == 'like' else '-1'}},
+        }}
+
+        try:
+            dynamodb_client.transact_write_items(TransactItems=[interaction_write, counter_write])
+        except dynamodb_client.exceptions.TransactionCanceledException as e:
+            reasons = [reason.get('Code') for reason in e.response.get('CancellationReasons', [])]
+            if reasons and reasons[0] == 'ConditionalCheckFailed':
+                if action == 'unlike' and 'Item' in dynamodb_client.get_item(
+                        TableName=interactions_table_name, Key=interaction_key, ProjectionExpression='userId'):
+                    return dict(result, status='error', error='landmarkId does not match the liked fun fact')
+                return dict(result, status='duplicate')
+            if 'TransactionConflict' in reasons and attempt < MAX_CONFLICT_RETRIES:
+                time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+                continue
+            return dict(result, status='error', error=str(e))
+        except Exception as e:
+            return dict(result, status='error', error=str(e))
+        return dict(result, status='applied')
+
+
+@metrics.instrument
+def handler(event, context):
+    # API Gateway base64 encodes bodies because binary media types are enabled
+    body = event['body']
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    body = json.loads(body)
+
+    if 'events' not in body:
+        result = apply_event(body)
+        return response(400 if result['status'] == 'error' else 202, result)
+
+    # Batched submission, e.g. likes queued by the app while offline
+    events = body['events']
+    if not isinstance(events, list) or len(events) > MAX_BATCH_EVENTS:
+        return response(400, {'error': f'events must be a list of at most {MAX_BATCH_EVENTS} events'})
+
+    results = list(interaction_executor.map(metrics.bind(apply_event), events))
+    return response(202, {
+        'results': results,
+        'failed': sum(1 for result in results if result['status'] == 'error'),
+    })
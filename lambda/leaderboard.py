@@ -0,0 +1,146 @@
+import math
+import os
+from datetime import datetime, timezone
+
+import dynamo
+
+# Per-city leaderboards of trending fun facts.
+#
+# Each city's board is one item of the Leaderboard table holding its
+# STORED_ENTRIES best approved fun facts, so /funFacts/top is one GetItem.
+# A fact's score is
+#
+#     log2(1 + likes + APPROVAL_WEIGHT * approvalCount) + createdAt / HALF_LIFE
+#
+# Ranking by it ranks engagement decayed by half every HALF_LIFE of age: a
+# fact ties with one HALF_LIFE younger that has half its engagement. The
+# score depends only on the fact, never on the current time, so boards are
+# updated per changed fact and never re-scored as time passes.
+#
+# A board also keeps a floor, an upper bound on the key of every approved
+# fact of the city it does not hold. Entries above the floor are certainly
+# the city's best; one below it may be outranked by a fact the board once
+# dropped. Boards with fewer than MAX_K entries above the floor are refilled
+# from the city's fun facts.
+
+leaderboard_table_name = 'Leaderboard'
+
+HALF_LIFE_SECONDS = float(os.environ.get('LEADERBOARD_HALF_LIFE_SECONDS', 7 * 24 * 3600))
+APPROVAL_WEIGHT = float(os.environ.get('LEADERBOARD_APPROVAL_WEIGHT', 2))
+
+STORED_ENTRIES = int(os.environ.get('LEADERBOARD_STORED_ENTRIES', 100))
+MAX_K = int(os.environ.get('LEADERBOARD_MAX_K', 25))
+DEFAULT_K = 10
+
+# Attributes a score is computed from, and those shown with each entry
+SCORE_ATTRIBUTES = ('likes', 'approvalCount', 'createdAt', 'funFactStatus')
+ENTRY_ATTRIBUTES = ('landmarkId', 'funFactId', 'landmarkName', 'funFactTitle', 'imageName', 'likes')
+
+
+def created_seconds(item):
+    # Seconds since the epoch of an ISO createdAt; naive times are UTC
+    try:
+        created = datetime.fromisoformat(item['createdAt'])
+    except (KeyError, TypeError, ValueError):
+        return 0.0
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return created.timestamp()
+
+
+def score(item):
+    engagement = max(item.get('likes', 0), 0) + APPROVAL_WEIGHT * max(item.get('approvalCount', 0), 0)
+    return round(math.log2(1 + engagement) + created_seconds(item) / HALF_LIFE_SECONDS, 9)
+
+
+def eligible(item):
+    return item is not None and item.get('funFactStatus') == 'APPROVED'
+
+
+def fact_key(item):
+    return item['landmarkId'], item['funFactId']
+
+
+def entry(item):
+    return dict({name: item[name] for name in ENTRY_ATTRIBUTES if name in item}, score=score(item))
+
+
+def entry_key(entry):
+    # Total order: by score, ties broken by id
+    return entry['score'], entry['landmarkId'], entry['funFactId']
+
+
+def _ranked(entries, floor):
+    # Keeps the best STORED_ENTRIES, raising the floor over the rest
+    ranked = sorted(entries, key=entry_key, reverse=True)
+    for dropped in ranked[STORED_ENTRIES:]:
+        if floor is None or entry_key(dropped) > floor:
+            floor = entry_key(dropped)
+    return {'entries': ranked[:STORED_ENTRIES], 'floor': floor}
+
+
+def build_board(items):
+    """Returns the board of a city from all of its fun facts."""
+    return _ranked([entry(item) for item in items if eligible(item)], None)
+
+
+def apply(board, changes):
+    """Returns board updated with changed fun facts.
+
+    changes maps a fact key, (landmark id, fun fact id), to the fact's new
+    item, or None if it was deleted. Applying a change twice is harmless.
+    """
+    entries = {fact_key(entry): entry for entry in board['entries']}
+    for key, item in changes.items():
+        entries.pop(key, None)
+        if eligible(item):
+            entries[key] = entry(item)
+    return _ranked(entries.values(), board['floor'])
+
+
+def trusted(board):
+    # Entries no fact outside the board can outrank
+    floor = board['floor']
+    return [entry for entry in board['entries'] if floor is None or entry_key(entry) > floor]
+
+
+def needs_refill(board):
+    return board['floor'] is not None and len(trusted(board)) < MAX_K
+
+
+def top(board, k):
+    return trusted(board)[:k]
+
+
+def empty_board():
+    return {'entries': [], 'floor': None}
+
+
+def read_board(client, slug):
+    """Returns (board, revision) of a city, or (an empty board, 0) if it has none."""
+    item = dynamo.get_item(client, TableName=leaderboard_table_name, Key={'city': slug})
+    if item is None:
+        return empty_board(), 0
+    floor = item.get('floor')
+    return {'entries': item['entries'], 'floor': tuple(floor) if floor else None}, item['revision']
+
+
+def write_board(client, slug, board, revision):
+    """Writes a board read at revision. Raises ConditionalCheckFailedException if it changed since."""
+    item = {'city': slug, 'entries': board['entries'], 'revision': revision + 1,
+            'updatedAt': datetime.now().isoformat()}
+    if board['floor'] is not None:
+        item['floor'] = list(board['floor'])
+    client.put_item(
+        TableName=leaderboard_table_name,
+        Item=dynamo.serialize_item(item),
+        ConditionExpression='attribute_not_exists(city) OR revision = :revision',
+        ExpressionAttributeValues={':revision': {'N': str(revision)}},
+    )
+
+
+def parse_k(params):
+    k = int(params.get('k', DEFAULT_K))
+    if not 1 <= k <= MAX_K:
+        raise ValueError(f'k must be between 1 and {MAX_K}')
+    return k
@@ -0,0 +1,154 @@
+import clients
+import dynamo
+import leaderboard
+import metrics
+import projection
+import snapshots
+
+landmarks_table_name = 'Landmark'
+fun_facts_table_name = 'FunFact'
+
+CITY_INDEX_NAME = 'cityIndex'
+
+# Boards written concurrently by another batch are re-read and updated again
+MAX_WRITE_RETRIES = 5
+
+# Only what scores and entries need
+FUN_FACT_ATTRIBUTES = tuple(dict.fromkeys(leaderboard.ENTRY_ATTRIBUTES + leaderboard.SCORE_ATTRIBUTES))
+
+
+def landmark_cities(landmark_ids):
+    """Returns {landmark id: city} of the landmarks that have a city, read with BatchGetItem."""
+    landmarks = dynamo.batch_get(
+        clients.client('dynamodb'), landmarks_table_name, [{'id': landmark_id} for landmark_id in sorted(landmark_ids)],
+        **projection.projection(('id', 'city', 'state', 'country'))
+    )
+    cities = {landmark['id']: snapshots.city_of(landmark) for landmark in landmarks}
+    return {landmark_id: city for landmark_id, city in cities.items() if city}
+
+
+def _changed(change):
+    # False for edits that change neither the score nor what an entry shows
+    old, new = change.get('OldImage'), change.get('NewImage')
+    if old is None or new is None:
+        return True
+    return any(old.get(name) != new.get(name)
+               for name in leaderboard.ENTRY_ATTRIBUTES + leaderboard.SCORE_ATTRIBUTES)
+
+
+def changes_by_city(records):
+    """Returns {city: {fact key: new item or None}} for a batch of FunFact stream records."""
+    facts = {}
+    for record in records:
+        change = record['dynamodb']
+        if not _changed(change):
+            continue
+        key = (change['Keys']['landmarkId']['S'], change['Keys']['funFactId']['S'])
+        # Records of one fact arrive in order, so the last is its current state
+        new_image = change.get('NewImage')
+        facts[key] = dynamo.deserialize_item(new_image) if new_image else None
+
+    cities = landmark_cities({landmark_id for landmark_id, _ in facts}) if facts else {}
+    changes = {}
+    for key, item in facts.items():
+        city = cities.get(key[0])
+        if city:
+            changes.setdefault(city, {})[key] = item
+    return changes
+
+
+def city_fun_facts(city):
+    # Every fun fact of a city: its landmarks by the city index, then each landmark's partition
+    dynamodb_client = clients.client('dynamodb')
+    landmarks = dynamo.all_items(
+        dynamo.query, dynamodb_client, TableName=landmarks_table_name, IndexName=CITY_INDEX_NAME,
+        KeyConditionExpression='city = :city', ExpressionAttributeValues={':city': city[0]},
+        **projection.projection(('id', 'city', 'state', 'country'))
+    )
+    items = []
+    for landmark in landmarks:
+        if snapshots.city_of(landmark) == city:
+            items.extend(dynamo.all_items(
+                dynamo.query, dynamodb_client, TableName=fun_facts_table_name,
+                KeyConditionExpression='landmarkId = :landmarkId',
+                ExpressionAttributeValues={':landmarkId': landmark['id']}, **projection.projection(FUN_FACT_ATTRIBUTES)
+            ))
+    return items
+
+
+def update_city(city, changes):
+    """Applies one city's changes to its board and returns the board written."""
+    dynamodb_client = clients.client('dynamodb')
+    slug = snapshots.city_slug(city)
+    for attempt in range(MAX_WRITE_RETRIES + 1):
+        board, revision = leaderboard.read_board(dynamodb_client, slug)
+        board = leaderboard.apply(board, changes)
+        if leaderboard.needs_refill(board):
+            # Too few entries are certain; rank the city's facts again
+            metrics.add('refills', 1)
+            board = leaderboard.build_board(city_fun_facts(city))
+        try:
+            leaderboard.write_board(dynamodb_client, slug, board, revision)
+        except dynamodb_client.exceptions.ConditionalCheckFailedException:
+            if attempt == MAX_WRITE_RETRIES:
+                raise
+            continue
+        return board
+
+
+def rebuild_all():
+    """Rebuilds every city's board from full scans, e.g. to backfill or repair."""
+    dynamodb_client = clients.client('dynamodb')
+    cities = {
+        landmark['id']: snapshots.city_of(landmark)
+        for landmark in dynamo.all_items(dynamo.scan, dynamodb_client, TableName=landmarks_table_name,
+                                         **projection.projection(('id', 'city', 'state', 'country')))
+    }
+    facts = {}
+    for item in dynamo.all_items(dynamo.scan, dynamodb_client, TableName=fun_facts_table_name,
+                                 **projection.projection(FUN_FACT_ATTRIBUTES)):
+        city = cities.get(item['landmarkId'])
+        if city:
+            facts.setdefault(snapshots.city_slug(city), []).append(item)
+
+    # Boards of cities left without fun facts are emptied
+    for item in dynamo.all_items(dynamo.scan, dynamodb_client, TableName=leaderboard.leaderboard_table_name,
+                                 ProjectionExpression='city'):
+        facts.setdefault(item['city'], [])
+
+    sizes = {}
+    for slug, items in sorted(facts.items()):
+        board = leaderboard.build_board(items)
+        for attempt in range(MAX_WRITE_RETRIES + 1):
+            _, revision = leaderboard.read_board(dynamodb_client, slug)
+            try:
+                leaderboard.write_board(dynamodb_client, slug, board, revision)
+                break
+            except dynamodb_client.exceptions.ConditionalCheckFailedException:
+                if attempt == MAX_WRITE_RETRIES:
+                    raise
+        sizes[slug] = len(board['entries'])
+    return sizes
+
+
+def update_boards(records):
+    """Updates the boards of the cities a batch of FunFact stream records touches.
+
+    Returns {city slug: number of trusted entries} of the boards written.
+    """
+    changes = changes_by_city(records)
+    metrics.add('boards', len(changes))
+    return {
+        snapshots.city_slug(city): len(leaderboard.trusted(update_city(city, city_changes)))
+        for city, city_changes in sorted(changes.items())
+    }
+
+
+@metrics.instrument
+def handler(event, context):
+    # Invoked directly with {"all": true} to rebuild every board from the
+    # tables. Stream batches are applied by the snapshot generator, which
+    # already reads the FunFact stream, or with {"Records": [...]} here.
+    if event.get('all'):
+        return {'rebuilt': rebuild_all()}
+    return update_boards(event.get('Records', []))
@@ -0,0 +1,53 @@
+import clients
+import dynamo
+import like_counters
+import metrics
+
+fun_facts_table_name = 'FunFact'
+
+
+def count_likes(counter_ids):
+    """Returns {counter id: likes summed over its shards}, reading every shard with BatchGetItem."""
+    shards = dynamo.batch_get(
+        clients.client('dynamodb'), like_counters.like_counters_table_name,
+        [{'counterId': shard} for counter_id in counter_ids for shard in like_counters.shard_ids(counter_id)],
+        ProjectionExpression='counterId, likes'
+    )
+    totals = dict.fromkeys(counter_ids, 0)
+    for shard in shards:
+        totals[like_counters.counter_of(shard['counterId'])] += shard.get('likes', 0)
+    return totals
+
+
+def fold_counters(counter_ids):
+    """Writes the summed shards of each counter into the fun fact's likes."""
+    dynamodb_client = clients.client('dynamodb')
+    totals = {}
+    for counter_id, total in count_likes(counter_ids).items():
+        landmark_id, fun_fact_id = counter_id.split('#', 1)
+        total = max(total, 0)
+        try:
+            dynamodb_client.update_item(
+                TableName=fun_facts_table_name,
+                Key={'landmarkId': {'S': landmark_id}, 'funFactId': {'S': fun_fact_id}},
+                UpdateExpression='SET likes = :likes',
+                ConditionExpression='attribute_exists(funFactId)',
+                ExpressionAttributeValues={':likes': {'N': str(total)}}
+            )
+        except dynamodb_client.exceptions.ConditionalCheckFailedException:
+            # The fun fact was deleted; do not recreate it
+            continue
+        totals[counter_id] = total
+    return totals
+
+
+@metrics.instrument
+def handler(event, context):
+    # Invoked with batched LikeCounter stream records. A burst of likes on one
+    # fact arrives as many records for the same counter, folded once here.
+    counter_ids = {
+        like_counters.counter_of(record['dynamodb']['Keys']['counterId']['S'])
+        for record in event.get('Records', [])
+    }
+    metrics.add('records', len(event.get('Records', [])))
+    return {'folded': fold_counters(sorted(counter_ids))}
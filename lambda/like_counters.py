@@ -0,0 +1,26 @@
+import os
+
+# Likes on a fact are spread over this many counter items. The shard is part
+# of the partition key, so a viral fact's likes land on LIKE_COUNTER_SHARDS
+# partition keys instead of one. The aggregator reads every shard below this
+# number, so it may be raised but never lowered while shards hold likes.
+LIKE_COUNTER_SHARDS = int(os.environ.get('LIKE_COUNTER_SHARDS', 10))
+
+like_counters_table_name = 'LikeCounter'
+
+
+def counter_id(landmark_id, fun_fact_id):
+    return f'{landmark_id}#{fun_fact_id}'
+
+
+def shard_id(counter, shard):
+    return f'{counter}#{shard}'
+
+
+def counter_of(shard):
+    # The counter a shard's counterId belongs to
+    return shard.rsplit('#', 1)[0]
+
+
+def shard_ids(counter):
+    return [shard_id(counter, shard) for shard in range(LIKE_COUNTER_SHARDS)]
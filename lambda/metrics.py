@@ -0,0 +1,273 @@
+import atexit
+import contextvars
+import functools
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+# Per-invocation metrics for the handlers.
+#
+# Each sampled invocation collects phase timings, item and byte counts and
+# the DynamoDB capacity its requests consumed. In Lambda they are written
+# to the log as one CloudWatch Embedded Metric Format line, which
+# CloudWatch turns into metrics without any API calls. Locally they are
+# aggregated and printed as a profile summary at exit instead.
+#
+# Unsampled invocations cost one random() call, so this can stay on at
+# full traffic; cold starts are always sampled.
+
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'FunFacts')
+SAMPLE_RATE = float(os.environ.get('METRICS_SAMPLE_RATE', 1))
+# emf, profile or off; emf in Lambda, off elsewhere
+OUTPUT = os.environ.get('METRICS_OUTPUT', 'emf' if 'AWS_LAMBDA_FUNCTION_NAME' in os.environ else 'off')
+
+# Units of the metrics that are not phase timings; phases are {name}Time in milliseconds
+UNITS = {
+    'duration': 'Milliseconds',
+    'itemsReturned': 'Count',
+    'bytesSerialized': 'Bytes',
+    'readCapacityUnits': 'Count',
+    'writeCapacityUnits': 'Count',
+    'coldStart': 'Count',
+}
+
+
+def unit(name):
+    return 'Milliseconds' if name.endswith('Time') else UNITS.get(name, 'Count')
+
+
+READ_OPERATIONS = ('GetItem', 'Query', 'Scan', 'BatchGetItem', 'TransactGetItems')
+WRITE_OPERATIONS = ('PutItem', 'UpdateItem', 'DeleteItem', 'BatchWriteItem', 'TransactWriteItems')
+
+_current = contextvars.ContextVar('metrics_invocation', default=None)
+_cold = True
+
+
+class Invocation:
+    """Metrics of one handler invocation. Safe to update from several threads."""
+
+    def __init__(self, function, route=None, cold=False):
+        self.function = function
+        self.route = route
+        self.cold = cold
+        self.started = time.perf_counter()
+        self.values = {}
+        self.properties = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, value):
+        with self._lock:
+            self.values[name] = self.values.get(name, 0) + value
+
+    def add_phase(self, name, seconds):
+        self.add(f'{name}Time', seconds * 1000)
+
+    def emf(self):
+        dimensions = {'Function': self.function}
+        if self.route:
+            dimensions['Route'] = self.route
+        return dict(
+            dimensions,
+            _aws={
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': NAMESPACE,
+                    'Dimensions': [list(dimensions)],
+                    'Metrics': [{'Name': name, 'Unit': unit(name)} for name in self.values],
+                }],
+            },
+            sampleRate=SAMPLE_RATE,
+            **self.properties,
+            **{name: round(value, 3) for name, value in self.values.items()},
+        )
+
+
+class _Phase:
+    __slots__ = ('name', 'invocation', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.invocation = _current.get()
+        if self.invocation is not None:
+            self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.invocation is not None:
+            self.invocation.add_phase(self.name, time.perf_counter() - self.started)
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with _Phase(self.name):
+                return func(*args, **kwargs)
+        return timed
+
+
+def phase(name):
+    """Times a block, or a function when used as a decorator, as {name}Time.
+
+    Phases may nest; each is reported on its own. Outside a sampled
+    invocation this does nothing.
+    """
+    return _Phase(name)
+
+
+def mark(name):
+    # Records the time since the invocation started as {name}Time
+    invocation = _current.get()
+    if invocation is not None:
+        invocation.add_phase(name, time.perf_counter() - invocation.started)
+
+
+def add(name, value):
+    invocation = _current.get()
+    if invocation is not None:
+        invocation.add(name, value)
+
+
+def set_property(name, value):
+    # Searchable in the log line but not a metric, e.g. an id
+    invocation = _current.get()
+    if invocation is not None:
+        invocation.properties[name] = value
+
+
+def bind(func):
+    """Returns func running with the caller's invocation, for executor threads.
+
+    Threads of a pool do not inherit the caller's context, so without this
+    their DynamoDB capacity and phases are not recorded.
+    """
+    invocation = _current.get()
+    if invocation is None:
+        return func
+
+    @functools.wraps(func)
+    def bound(*args, **kwargs):
+        token = _current.set(invocation)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return bound
+
+
+def _request_capacity(params, **kwargs):
+    if _current.get() is not None:
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+
+def _record_capacity(parsed, model, **kwargs):
+    invocation = _current.get()
+    consumed = parsed.get('ConsumedCapacity')
+    if invocation is None or not consumed:
+        return
+    # Batch and transaction calls report one entry per table
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    units = sum(entry.get('CapacityUnits', 0) for entry in consumed)
+    invocation.add('readCapacityUnits' if model.name in READ_OPERATIONS else 'writeCapacityUnits', units)
+
+
+def track_capacity(dynamodb_client):
+    """Makes a DynamoDB client report the capacity its calls consume to the current invocation."""
+    events = dynamodb_client.meta.events
+    for operation in READ_OPERATIONS + WRITE_OPERATIONS:
+        events.register(f'provide-client-params.dynamodb.{operation}', _request_capacity)
+        events.register(f'after-call.dynamodb.{operation}', _record_capacity)
+    return dynamodb_client
+
+
+def _route(event):
+    return event.get('resource') if isinstance(event, dict) else None
+
+
+def instrument(handler):
+    """Decorates a Lambda handler to record and emit metrics for its invocations."""
+    function = handler.__module__
+
+    @functools.wraps(handler)
+    def instrumented(event, context):
+        global _cold
+        cold, _cold = _cold, False
+        if OUTPUT == 'off' or not (cold or random.random() < SAMPLE_RATE):
+            return handler(event, context)
+
+        invocation = Invocation(function, _route(event), cold)
+        token = _current.set(invocation)
+        try:
+            response = handler(event, context)
+            if isinstance(response, dict) and 'statusCode' in response:
+                invocation.properties['statusCode'] = response['statusCode']
+            return response
+        except Exception:
+            invocation.properties['error'] = True
+            raise
+        finally:
+            _current.reset(token)
+            invocation.add('duration', (time.perf_counter() - invocation.started) * 1000)
+            invocation.add('coldStart', int(cold))
+            emit(invocation)
+    return instrumented
+
+
+# Profile of every invocation in this process, keyed by (function, route)
+_profile = {}
+_profile_lock = threading.Lock()
+
+
+def emit(invocation):
+    if OUTPUT == 'emf':
+        sys.stdout.write(json.dumps(invocation.emf(), separators=(',', ':')) + '\n')
+    elif OUTPUT == 'profile':
+        with _profile_lock:
+            samples = _profile.setdefault((invocation.function, invocation.route or ''), {})
+            for name, value in invocation.values.items():
+                samples.setdefault(name, []).append(value)
+
+
+def profile():
+    """Returns {function: {route: {metric: {count, mean, p50, p95, max}}}} of the recorded invocations."""
+    with _profile_lock:
+        items = [(key, {name: sorted(values) for name, values in samples.items()}) for key, samples in _profile.items()]
+    result = {}
+    for (function, route), samples in sorted(items):
+        result.setdefault(function, {})[route] = {
+            name: {
+                'count': len(values),
+                'mean': round(sum(values) / len(values), 3),
+                'p50': round(values[len(values) // 2], 3),
+                'p95': round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+                'max': round(values[-1], 3),
+            }
+            for name, values in sorted(samples.items())
+        }
+    return result
+
+
+def summary():
+    lines = [f"{'function / route':<36}{'metric':<22}{'count':>7}{'mean':>11}{'p50':>11}{'p95':>11}{'max':>11}"]
+    for function, routes in profile().items():
+        for route, metrics in routes.items():
+            label = f'{function} {route}'.strip()
+            for name, stats in metrics.items():
+                lines.append(f"{label:<36}{name:<22}{stats['count']:>7}{stats['mean']:>11.2f}{stats['p50']:>11.2f}"
+                             f"{stats['p95']:>11.2f}{stats['max']:>11.2f}")
+                label = ''
+    return '\n'.join(lines)
+
+
+def reset():
+    # Forgets the recorded profile, e.g. after a warmup
+    with _profile_lock:
+        _profile.clear()
+
+
+if OUTPUT == 'profile':
+    atexit.register(lambda: _profile and print(summary(), file=sys.stderr))
@@ -0,0 +1,107 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import threading
+
+import clients
+
+DEFAULT_PAGE_SIZE = int(os.environ.get('DEFAULT_PAGE_SIZE', 20))
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 100))
+
+# Key used to sign continuation tokens, read on first use from the Secrets
+# Manager secret PAGE_TOKEN_SECRET_ARN names. Without it tokens are only
+# valid within the container that issued them.
+PAGE_TOKEN_SECRET_ARN = os.environ.get('PAGE_TOKEN_SECRET_ARN')
+_secret = None
+_secret_lock = threading.Lock()
+
+
+def _signing_key():
+    global _secret
+    if _secret is None:
+        with _secret_lock:
+            if _secret is None:
+                if PAGE_TOKEN_SECRET_ARN:
+                    response = clients.client('secretsmanager').get_secret_value(SecretId=PAGE_TOKEN_SECRET_ARN)
+                    _secret = response['SecretString'].encode()
+                else:
+                    _secret = os.urandom(32)
+    return _secret
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _signature(scope, payload):
+    return hmac.new(_signing_key(), scope.encode() + b'\0' + payload, hashlib.sha256).digest()
+
+
+def encode_token(key, scope):
+    """Wraps an ExclusiveStartKey in an opaque token bound to the query scope."""
+    payload = json.dumps(key, separators=(',', ':'), sort_keys=True).encode()
+    return f"{_b64encode(payload)}.{_b64encode(_signature(scope, payload))}"
+
+
+def decode_token(token, scope):
+    try:
+        payload, signature = token.split('.')
+        payload = _b64decode(payload)
+        signature = _b64decode(signature)
+    except ValueError:
+        raise InvalidToken('Malformed nextToken')
+
+    if not hmac.compare_digest(signature, _signature(scope, payload)):
+        raise InvalidToken('Invalid nextToken')
+    return json.loads(payload)
+
+
+def start_key(params, scope):
+    # Returns the ExclusiveStartKey for a request, or None for the first page
+    if 'nextToken' not in params:
+        return None
+    return decode_token(params['nextToken'], scope)
+
+
+def parse_page_size(params):
+    page_size = int(params.get('pageSize', DEFAULT_PAGE_SIZE))
+    if page_size < 1:
+        raise ValueError('pageSize must be positive')
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def read_page(operation, kwargs, page_size, key_attributes, exclusive_start_key=None):
+    """Reads one page of a query or scan.
+
+    Follows LastEvaluatedKey across 1 MB response pages until page_size
+    items are collected. One item past the page is read so the returned
+    next key is None exactly when there is nothing left.
+    """
+    kwargs = dict(kwargs)
+    if exclusive_start_key:
+        kwargs['ExclusiveStartKey'] = exclusive_start_key
+
+    items = []
+    while len(items) <= page_size:
+        kwargs['Limit'] = page_size + 1 - len(items)
+        response = operation(**kwargs)
+        items.extend(response['Items'])
+        if 'LastEvaluatedKey' not in response:
+            break
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    if len(items) <= page_size:
+        return items, None
+
+    items = items[:page_size]
+    return items, {attribute: items[-1][attribute] for attribute in key_attributes}
@@ -0,0 +1,74 @@
+import os
+
+# Attribute projections for the fields= parameter of the GET endpoints.
+#
+# A client asks for a named view or a comma separated list of attributes.
+# Only whitelisted attributes can be requested, so internal ones such as
+# the geohash or moderation data are never exposed, and every request maps
+# to a ProjectionExpression so DynamoDB returns only what is sent on.
+# Read capacity is charged on the item size before projection, except on
+# an index that projects fewer attributes; the summary view of fun facts
+# is read from such an index.
+
+FUN_FACT_FIELDS = frozenset({
+    'landmarkId', 'funFactId', 'landmarkName', 'funFactTitle', 'description', 'source', 'imageName',
+    'imageCaption', 'tags', 'likes', 'submittedBy', 'funFactStatus', 'createdAt', 'updatedAt',
+})
+LANDMARK_FIELDS = frozenset({
+    'id', 'name', 'type', 'address', 'city', 'state', 'country', 'zipcode', 'coordinates', 'image', 'likes',
+    'numOfFunFacts', 'createdAt', 'updatedAt',
+})
+
+VIEWS = {
+    'funFacts': {
+        'summary': frozenset({'landmarkId', 'funFactId', 'funFactTitle', 'imageName', 'likes'}),
+        'full': FUN_FACT_FIELDS,
+    },
+    'landmarks': {
+        'summary': frozenset({'id', 'name', 'type', 'city', 'coordinates', 'image', 'likes'}),
+        'full': LANDMARK_FIELDS,
+    },
+}
+
+ALLOWED_FIELDS = {'funFacts': FUN_FACT_FIELDS, 'landmarks': LANDMARK_FIELDS}
+
+# FunFact GSI with the table's keys that projects only the summary view's
+# attributes, so list queries read small items
+SUMMARY_INDEX_NAME = os.environ.get('SUMMARY_INDEX_NAME', 'summaryIndex')
+SUMMARY_INDEX_ATTRIBUTES = VIEWS['funFacts']['summary']
+
+
+def parse_fields(value, kind, required=()):
+    """Returns the sorted attributes a fields= value asks for, or None for whole items.
+
+    value is a view name or a comma separated list of attributes of kind,
+    'funFacts' or 'landmarks'. The required attributes, e.g. keys needed
+    for pagination, are always included.
+    """
+    if value is None:
+        return None
+    views = VIEWS[kind]
+    if value in views:
+        fields = views[value]
+    else:
+        fields = {field.strip() for field in value.split(',') if field.strip()}
+        if not fields:
+            raise ValueError(f'fields must be one of {", ".join(views)} or a list of attributes')
+        unknown = fields - ALLOWED_FIELDS[kind]
+        if unknown:
+            raise ValueError(f'unknown fields: {", ".join(sorted(unknown))}')
+    return tuple(sorted(fields | set(required)))
+
+
+def projection(fields):
+    # Request kwargs reading only fields; placeholders because several
+    # attribute names, e.g. name and source, are reserved words
+    if fields is None:
+        return {}
+    names = {f'#f{i}': field for i, field in enumerate(fields)}
+    return {'ProjectionExpression': ', '.join(names), 'ExpressionAttributeNames': names}
+
+
+def summary_index(fields):
+    # True if a fun fact query for fields can be served from the slim index
+    return fields is not None and SUMMARY_INDEX_ATTRIBUTES.issuperset(fields)
@@ -0,0 +1,181 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+FRESH = 'HIT'
+STALE = 'STALE'
+MISS = 'MISS'
+
+
+def json_size(value):
+    # Approximate size of a cached value by its JSON encoding
+    return len(json.dumps(value, default=str))
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'tags', 'loaded_at', 'refreshing', 'memo')
+
+    def __init__(self, value, size, tags, loaded_at):
+        self.value = value
+        self.size = size
+        self.tags = tags
+        self.loaded_at = loaded_at
+        self.refreshing = False
+        self.memo = None
+
+
+class ReadCache:
+    """In-process LRU+TTL cache for read results, shared by warm invocations.
+
+    Entries younger than ttl are served as hits. Entries older than ttl but
+    within ttl + stale_ttl are served stale while executor reloads them.
+    Older entries are reloaded inline. The cache evicts least recently used
+    entries to stay under max_bytes.
+
+    Lambda freezes the container once the handler returns, so a handler
+    calls wait_for_refreshes() before returning; reloads then overlap the
+    rest of the request instead of stalling until the next invocation.
+
+    Cached values are shared between invocations and must not be mutated
+    by callers.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=60, stale_ttl=300, sizeof=json_size, clock=time.time,
+                 executor=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.sizeof = sizeof
+        self.clock = clock
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        # id of each entry's value to its key; the entry keeps the value
+        # alive, so the id is not reused while the entry exists
+        self._keys_by_id = {}
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix='read-cache-refresh')
+        self._refreshes = set()
+        self._lock = threading.Lock()
+
+    def get(self, key, loader, tags=()):
+        """Returns (value, status) for key, calling loader() to fill it."""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = now - entry.loaded_at
+                if age < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry.value, FRESH
+                if age < self.ttl + self.stale_ttl:
+                    self._entries.move_to_end(key)
+                    self.stale_hits += 1
+                    if not entry.refreshing:
+                        entry.refreshing = True
+                        self._refreshes.add(self._executor.submit(self._refresh, key, loader, tags))
+                    return entry.value, STALE
+            self.misses += 1
+
+        value = loader()
+        self.put(key, value, tags)
+        return value, MISS
+
+    def _refresh(self, key, loader, tags):
+        try:
+            value = loader()
+            with self._lock:
+                # Do not resurrect an entry invalidated while reloading
+                if key not in self._entries:
+                    return
+            self.put(key, value, tags)
+        except Exception:
+            # Keep serving the stale value; the next expired read retries inline
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+
+    def wait_for_refreshes(self, timeout=None):
+        """Waits for the reloads started by stale reads. Returns the number still running."""
+        with self._lock:
+            refreshes, self._refreshes = self._refreshes, set()
+        _, running = wait(refreshes, timeout)
+        with self._lock:
+            self._refreshes |= running
+        return len(running)
+
+    def put(self, key, value, tags=()):
+        size = self.sizeof(value)
+        with self._lock:
+            self._remove(key)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = _Entry(value, size, frozenset(tags), self.clock())
+            self._keys_by_id[id(value)] = key
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+            if self._keys_by_id.get(id(entry.value)) == key:
+                del self._keys_by_id[id(entry.value)]
+
+    def _entry_of(self, value):
+        entry = self._entries.get(self._keys_by_id.get(id(value)))
+        return entry if entry is not None and entry.value is value else None
+
+    def memoize(self, value, compute):
+        """Returns compute(value), kept on the entry holding value.
+
+        The result is dropped with the entry, so it is only computed again
+        once value has been reloaded. Values the cache does not hold are
+        computed every time.
+        """
+        with self._lock:
+            entry = self._entry_of(value)
+            if entry is not None and entry.memo is not None:
+                return entry.memo
+        result = compute(value)
+        with self._lock:
+            entry = self._entry_of(value)
+            if entry is not None:
+                entry.memo = result
+        return result
+
+    def invalidate(self, tag):
+        """Drops every entry carrying tag. Returns the number dropped."""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if tag in entry.tags]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'staleHits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self._entries),
+                'bytes': self.bytes,
+            }
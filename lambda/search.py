@@ -0,0 +1,283 @@
+import bisect
+import gzip
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+import clients
+
+# Full-text and hashtag search over approved fun facts.
+#
+# The index is built offline by scripts/build_search_index.py or by the
+# SearchIndexBuilder Lambda and published to S3 as a gzipped JSON artifact
+# named after its content hash. BM25 weights are computed at build time, so
+# a query only sums the precomputed weights of its terms' postings.
+
+FORMAT_VERSION = 1
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Title terms are counted this many times so title matches rank first
+TITLE_WEIGHT = 2
+
+INDEX_PREFIX = 'search-index/'
+LATEST_KEY = f'{INDEX_PREFIX}LATEST'
+
+SEARCH_INDEX_BUCKET = os.environ.get('SEARCH_INDEX_BUCKET', 'fun-facts-images')
+# A local artifact, e.g. one bundled with the function, is used instead of S3
+SEARCH_INDEX_PATH = os.environ.get('SEARCH_INDEX_PATH')
+# How often a warm container checks S3 for a newer index
+SEARCH_INDEX_CHECK_SECONDS = float(os.environ.get('SEARCH_INDEX_CHECK_SECONDS', 300))
+
+STOPWORDS = frozenset(
+    'a an and are as at be but by for from had has have he her his in is it its of on or that the their '
+    'there they this to was were which who with you'.split()
+)
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def _fold(text):
+    # Lowercases and strips accents so "Café" matches "cafe"
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+
+
+def tokenize(text):
+    return [word for word in _WORD.findall(_fold(text)) if word not in STOPWORDS]
+
+
+def normalize_tag(tag):
+    return ''.join(_WORD.findall(_fold(tag)))
+
+
+def parse_query(text):
+    """Splits a query into free-text terms and #hashtag filters."""
+    terms = []
+    tags = []
+    for word in text.split():
+        if word.startswith('#'):
+            tag = normalize_tag(word)
+            if tag:
+                tags.append(tag)
+        else:
+            terms.extend(tokenize(word))
+    return terms, tags
+
+
+def build_index(fun_facts):
+    """Builds the index artifact from fun facts shaped like FunFact items.
+
+    Facts with a funFactStatus other than APPROVED are left out. Documents
+    are ordered by id, so the same facts always give the same artifact and
+    version.
+    """
+    documents = []
+    for fun_fact in fun_facts:
+        if fun_fact.get('funFactStatus', 'APPROVED') != 'APPROVED':
+            continue
+        documents.append(fun_fact)
+    documents.sort(key=lambda fun_fact: fun_fact.get('funFactId') or fun_fact['id'])
+
+    docs = []
+    lengths = []
+    postings = {}
+    tag_docs = {}
+    for doc_id, fun_fact in enumerate(documents):
+        title = fun_fact.get('funFactTitle', '')
+        tags = sorted({normalize_tag(tag) for tag in fun_fact.get('tags') or ()} - {''})
+        words = (tokenize(title) * TITLE_WEIGHT + tokenize(fun_fact.get('description', ''))
+                 + tokenize(fun_fact.get('landmarkName', '')) + tags)
+
+        docs.append([fun_fact.get('funFactId') or fun_fact['id'], fun_fact['landmarkId'],
+                     fun_fact.get('landmarkName', ''), title])
+        lengths.append(len(words))
+        for term, frequency in Counter(words).items():
+            postings.setdefault(term, []).append((doc_id, frequency))
+        for tag in tags:
+            tag_docs.setdefault(tag, []).append(doc_id)
+
+    count = len(docs)
+    average_length = sum(lengths) / count if count else 0.0
+    terms = {}
+    for term in sorted(postings):
+        idf = math.log(1 + (count - len(postings[term]) + 0.5) / (len(postings[term]) + 0.5))
+        doc_ids = []
+        weights = []
+        previous = 0
+        for doc_id, frequency in postings[term]:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc_id] / average_length)
+            # Doc ids are stored as gaps, which keeps long postings small
+            doc_ids.append(doc_id - previous)
+            weights.append(round(idf * frequency * (BM25_K1 + 1) / (frequency + norm), 4))
+            previous = doc_id
+        terms[term] = [doc_ids, weights]
+
+    artifact = {
+        'format': FORMAT_VERSION,
+        'docs': docs,
+        'terms': terms,
+        'tags': [[tag, tag_docs[tag]] for tag in sorted(tag_docs)],
+    }
+    artifact['version'] = hashlib.sha256(encode_artifact(artifact)).hexdigest()[:16]
+    return artifact
+
+
+def encode_artifact(artifact):
+    return json.dumps(artifact, sort_keys=True, separators=(',', ':')).encode()
+
+
+def artifact_key(version):
+    return f'{INDEX_PREFIX}{version}.json.gz'
+
+
+class SearchIndex:
+    """Read-only view of an index artifact answering searches in memory."""
+
+    def __init__(self, artifact):
+        if artifact.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported search index format: {artifact.get('format')}")
+        self.version = artifact['version']
+        self.docs = artifact['docs']
+        self.terms = {
+            term: (tuple(itertools.accumulate(gaps)), tuple(weights))
+            for term, (gaps, weights) in artifact['terms'].items()
+        }
+        self.tag_names = [tag for tag, _ in artifact['tags']]
+        self.tag_docs = [frozenset(doc_ids) for _, doc_ids in artifact['tags']]
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _tag_docs(self, tag):
+        position = bisect.bisect_left(self.tag_names, tag)
+        if position < len(self.tag_names) and self.tag_names[position] == tag:
+            return self.tag_docs[position]
+        return frozenset()
+
+    def search(self, text, limit):
+        """Returns up to limit hits ranked by BM25.
+
+        Every #hashtag in the query must be on a fact for it to match, and
+        also counts towards its score like any other term.
+        """
+        terms, tags = parse_query(text)
+        allowed = None
+        for tag in tags:
+            docs = self._tag_docs(tag)
+            allowed = docs if allowed is None else allowed & docs
+
+        scores = {}
+        for term in terms + tags:
+            doc_ids, weights = self.terms.get(term, ((), ()))
+            for doc_id, weight in zip(doc_ids, weights):
+                if allowed is None or doc_id in allowed:
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda hit: (hit[1], -hit[0]))
+        results = []
+        for doc_id, score in top:
+            fun_fact_id, landmark_id, landmark_name, title = self.docs[doc_id]
+            results.append({
+                'funFactId': fun_fact_id,
+                'landmarkId': landmark_id,
+                'landmarkName': landmark_name,
+                'funFactTitle': title,
+                'score': round(score, 3),
+            })
+        return results
+
+    def suggest_tags(self, prefix, limit):
+        """Returns up to limit tags starting with prefix, most used first."""
+        prefix = normalize_tag(prefix)
+        if not prefix:
+            return []
+        # Tags are sorted, so the matches are one contiguous slice
+        start = bisect.bisect_left(self.tag_names, prefix)
+        end = bisect.bisect_left(self.tag_names, prefix + '\x7f', start)
+        top = heapq.nsmallest(limit, range(start, end), key=lambda i: (-len(self.tag_docs[i]), i))
+        return [{'tag': self.tag_names[i], 'count': len(self.tag_docs[i])} for i in top]
+
+
+def read_artifact(data):
+    if data[:2] == b'\x1f\x8b':
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+def publish_index(s3, bucket, artifact):
+    """Uploads an artifact and points LATEST at it.
+
+    Artifacts are named after their content hash, so publishing an index
+    identical to the current one writes nothing. Returns True if LATEST
+    moved.
+    """
+    try:
+        latest = s3.get_object(Bucket=bucket, Key=LATEST_KEY)['Body'].read().decode().strip()
+    except s3.exceptions.NoSuchKey:
+        latest = None
+    if latest == artifact['version']:
+        return False
+
+    s3.put_object(Bucket=bucket, Key=artifact_key(artifact['version']),
+                  Body=gzip.compress(encode_artifact(artifact), mtime=0),
+                  ContentType='application/json', ContentEncoding='gzip')
+    # Written last so readers never see a version whose artifact is missing
+    s3.put_object(Bucket=bucket, Key=LATEST_KEY, Body=artifact['version'].encode(), ContentType='text/plain')
+    return True
+
+
+def _load(current):
+    if SEARCH_INDEX_PATH:
+        if current is not None:
+            return current
+        with open(SEARCH_INDEX_PATH, 'rb') as f:
+            return SearchIndex(read_artifact(f.read()))
+
+    s3 = clients.client('s3')
+    version = s3.get_object(Bucket=SEARCH_INDEX_BUCKET, Key=LATEST_KEY)['Body'].read().decode().strip()
+    if current is not None and current.version == version:
+        return current
+    body = s3.get_object(Bucket=SEARCH_INDEX_BUCKET, Key=artifact_key(version))['Body'].read()
+    return SearchIndex(read_artifact(body))
+
+
+_index = None
+_checked_at = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Returns the container's index, loading it on first use.
+
+    A warm container checks for a newer version every
+    SEARCH_INDEX_CHECK_SECONDS and keeps serving the index it has if the
+    check fails.
+    """
+    global _index, _checked_at
+    if _index is not None and time.monotonic() - _checked_at < SEARCH_INDEX_CHECK_SECONDS:
+        return _index
+    with _lock:
+        if _index is None or time.monotonic() - _checked_at >= SEARCH_INDEX_CHECK_SECONDS:
+            try:
+                _index = _load(_index)
+            except Exception:
+                if _index is None:
+                    raise
+            _checked_at = time.monotonic()
+    return _index
+
+
+def reset():
+    global _index, _checked_at
+    with _lock:
+        _index = None
+        _checked_at = None
@@ -0,0 +1,53 @@
+import clients
+import dynamo
+import metrics
+import search
+
+fun_facts_table_name = 'FunFact'
+
+# Only the attributes the index is built from
+INDEXED_ATTRIBUTES = ('funFactId', 'landmarkId', 'landmarkName', 'funFactTitle', 'description', 'tags',
+                      'funFactStatus')
+
+
+def approved_fun_facts():
+    dynamodb_client = clients.client('dynamodb')
+    names = {f'#a{i}': name for i, name in enumerate(INDEXED_ATTRIBUTES)}
+    kwargs = {
+        'TableName': fun_facts_table_name,
+        'ProjectionExpression': ', '.join(names),
+        'ExpressionAttributeNames': names,
+        'FilterExpression': f"#a{INDEXED_ATTRIBUTES.index('funFactStatus')} = :approved",
+        'ExpressionAttributeValues': {':approved': 'APPROVED'},
+    }
+    while True:
+        response = dynamo.scan(dynamodb_client, **kwargs)
+        yield from response['Items']
+        if 'LastEvaluatedKey' not in response:
+            return
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def _changed(change):
+    # False for edits that leave the indexed text and status as they were, e.g. likes
+    old, new = change.get('OldImage'), change.get('NewImage')
+    if old is None or new is None:
+        return True
+    return any(old.get(name) != new.get(name) for name in INDEXED_ATTRIBUTES)
+
+
+@metrics.instrument
+def handler(event, context):
+    # Invoked with batched FunFact stream records for approved facts, or
+    # directly with {"all": true}. The index is rebuilt from the table rather
+    # than patched, so a batch of any size costs one scan, and a batch that
+    # changes nothing indexed, such as folded likes, costs none.
+    if not event.get('all') and not any(_changed(record['dynamodb']) for record in event.get('Records', [])):
+        return {'version': None, 'documents': None, 'published': False}
+
+    with metrics.phase('build'):
+        artifact = search.build_index(approved_fun_facts())
+    with metrics.phase('publish'):
+        published = search.publish_index(clients.client('s3'), search.SEARCH_INDEX_BUCKET, artifact)
+    metrics.add('documents', len(artifact['docs']))
+    return {'version': artifact['version'], 'documents': len(artifact['docs']), 'published': published}
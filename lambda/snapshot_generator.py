@@ -0,0 +1,137 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import clients
+import dynamo
+import leaderboard_updater
+import metrics
+import snapshots
+
+landmarks_table_name = 'Landmark'
+fun_facts_table_name = 'FunFact'
+
+CITY_INDEX_NAME = 'cityIndex'
+
+SNAPSHOT_CONCURRENCY = int(os.environ.get('SNAPSHOT_CONCURRENCY', 8))
+snapshot_executor = ThreadPoolExecutor(max_workers=SNAPSHOT_CONCURRENCY)
+
+
+def city_landmarks(city):
+    # The index is keyed by city name only; same-named cities are told apart here
+    items = dynamo.all_items(
+        dynamo.query, clients.client('dynamodb'),
+        TableName=landmarks_table_name,
+        IndexName=CITY_INDEX_NAME,
+        KeyConditionExpression='city = :city',
+        ExpressionAttributeValues={':city': city[0]},
+    )
+    return [item for item in items if snapshots.city_of(item) == city]
+
+
+def landmark_fun_facts(landmark_id):
+    return dynamo.all_items(
+        dynamo.query, clients.client('dynamodb'),
+        TableName=fun_facts_table_name,
+        KeyConditionExpression='landmarkId = :landmarkId',
+        ExpressionAttributeValues={':landmarkId': landmark_id},
+    )
+
+
+def regenerate(city):
+    """Rebuilds one city's snapshot and publishes it if it changed."""
+    landmarks = city_landmarks(city)
+    fun_facts = dict(zip(
+        (landmark['id'] for landmark in landmarks),
+        snapshot_executor.map(metrics.bind(landmark_fun_facts), [landmark['id'] for landmark in landmarks])
+    ))
+    document = snapshots.build_snapshot(city, landmarks, fun_facts)
+    pointer = snapshots.publish_snapshot(clients.client('s3'), snapshots.SNAPSHOT_BUCKET, document)
+    return {'version': document['version'], 'landmarks': len(landmarks), 'published': pointer is not None}
+
+
+def landmark_cities(landmark_ids):
+    """Looks up the city of each landmark with BatchGetItem."""
+    keys = [{'id': landmark_id} for landmark_id in sorted(landmark_ids)]
+    landmarks = dynamo.batch_get(
+        clients.client('dynamodb'), landmarks_table_name, keys,
+        ProjectionExpression='city, #s, country',
+        ExpressionAttributeNames={'#s': 'state'},
+    )
+    return set(filter(None, map(snapshots.city_of, landmarks)))
+
+
+def table_of(record):
+    # Name of the table a stream record comes from
+    return record['eventSourceARN'].split(':table/', 1)[1].split('/', 1)[0]
+
+
+def _changed(change, attributes):
+    # False for edits to attributes snapshots do not include
+    old, new = change.get('OldImage'), change.get('NewImage')
+    if old is None or new is None:
+        return True
+    return any(old.get(name) != new.get(name) for name in attributes)
+
+
+def _shown(image):
+    # Only approved fun facts are in snapshots
+    return image is not None and image.get('funFactStatus', {'S': 'APPROVED'}) == {'S': 'APPROVED'}
+
+
+def affected_cities(records):
+    """Returns the cities whose snapshots a batch of stream records changes."""
+    cities = set()
+    fun_fact_landmarks = set()
+    for record in records:
+        change = record['dynamodb']
+        if table_of(record) == landmarks_table_name:
+            if not _changed(change, snapshots.LANDMARK_ATTRIBUTES):
+                continue
+            # A landmark that moved city changes both snapshots
+            for image in (change.get('OldImage'), change.get('NewImage')):
+                city = image and snapshots.city_of(dynamo.deserialize_item(image))
+                if city:
+                    cities.add(city)
+        elif ((_shown(change.get('OldImage')) or _shown(change.get('NewImage')))
+              and _changed(change, snapshots.FUN_FACT_ATTRIBUTES + ('funFactStatus',))):
+            fun_fact_landmarks.add(change['Keys']['landmarkId']['S'])
+    if fun_fact_landmarks:
+        cities |= landmark_cities(fun_fact_landmarks)
+    return cities
+
+
+def all_cities():
+    cities = set()
+    kwargs = {
+        'TableName': landmarks_table_name,
+        'ProjectionExpression': 'city, #s, country',
+        'ExpressionAttributeNames': {'#s': 'state'},
+    }
+    while True:
+        response = dynamo.scan(clients.client('dynamodb'), **kwargs)
+        cities.update(filter(None, map(snapshots.city_of, response['Items'])))
+        if 'LastEvaluatedKey' not in response:
+            return cities
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+@metrics.instrument
+def handler(event, context):
+    # Invoked with batched Landmark and FunFact stream records, regenerating
+    # only the cities they touch, or directly with {"all": true} to rebuild
+    # every city, e.g. after a bulk load. A stream shard serves at most two
+    # readers, so this function also keeps the leaderboards current from
+    # the FunFact records rather than another function reading the stream.
+    if event.get('all'):
+        cities = all_cities()
+    else:
+        records = event.get('Records', [])
+        leaderboard_updater.update_boards([record for record in records
+                                           if table_of(record) == fun_facts_table_name])
+        cities = affected_cities(records)
+    metrics.add('cities', len(cities))
+
+    return {
+        snapshots.city_slug(city): regenerate(city)
+        for city in sorted(cities)
+    }
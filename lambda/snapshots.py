@@ -0,0 +1,131 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+
+# Per-city snapshots of the home feed: every landmark of a city with its
+# top fun facts, stored in S3 as one gzipped JSON document named after its
+# content hash. A small pointer object per city names the current version,
+# so a feed read is one pointer lookup and one immutable object fetch.
+
+SNAPSHOT_BUCKET = os.environ.get('SNAPSHOT_BUCKET', 'fun-facts-images')
+SNAPSHOT_PREFIX = 'snapshots/'
+
+# Fun facts included per landmark, most liked first
+TOP_FUN_FACTS = int(os.environ.get('SNAPSHOT_TOP_FUN_FACTS', 5))
+
+LANDMARK_ATTRIBUTES = ('id', 'name', 'type', 'address', 'city', 'state', 'country', 'zipcode', 'coordinates',
+                       'image', 'likes', 'numOfFunFacts')
+FUN_FACT_ATTRIBUTES = ('funFactId', 'landmarkId', 'funFactTitle', 'description', 'tags', 'imageName',
+                       'imageCaption', 'source', 'likes', 'submittedBy')
+
+
+def city_of(landmark):
+    """Returns the (city, state, country) a landmark belongs to, or None."""
+    if not landmark.get('city'):
+        return None
+    return landmark['city'], landmark.get('state', ''), landmark.get('country', '')
+
+
+def city_slug(city):
+    # ("New York", "NY", "US") -> "us/ny/new-york"
+    return '/'.join(re.sub(r'[^a-z0-9]+', '-', part.lower()).strip('-') or '-' for part in reversed(city))
+
+
+def pointer_key(slug):
+    return f'{SNAPSHOT_PREFIX}{slug}/latest.json'
+
+
+def snapshot_key(slug, version):
+    return f'{SNAPSHOT_PREFIX}{slug}/{version}.json.gz'
+
+
+def top_fun_facts(fun_facts, limit=None):
+    approved = [fun_fact for fun_fact in fun_facts if fun_fact.get('funFactStatus', 'APPROVED') == 'APPROVED']
+    approved.sort(key=lambda fun_fact: (-fun_fact.get('likes', 0), fun_fact['funFactId']))
+    return approved[:TOP_FUN_FACTS if limit is None else limit]
+
+
+def _pick(item, attributes):
+    return {name: item[name] for name in attributes if name in item}
+
+
+def build_snapshot(city, landmarks, fun_facts_by_landmark):
+    """Builds a city's snapshot document.
+
+    fun_facts_by_landmark maps landmark ids to their fun facts. The
+    document holds no generation time, so unchanged data gives the same
+    version.
+    """
+    document = {
+        'city': city[0],
+        'state': city[1],
+        'country': city[2],
+        'landmarks': [
+            dict(_pick(landmark, LANDMARK_ATTRIBUTES), funFacts=[
+                _pick(fun_fact, FUN_FACT_ATTRIBUTES)
+                for fun_fact in top_fun_facts(fun_facts_by_landmark.get(landmark['id'], ()))
+            ])
+            for landmark in sorted(landmarks, key=lambda landmark: landmark['id'])
+        ],
+    }
+    document['version'] = hashlib.sha256(encode_snapshot(document)).hexdigest()[:16]
+    return document
+
+
+def encode_snapshot(document):
+    return json.dumps(document, sort_keys=True, separators=(',', ':')).encode()
+
+
+def snapshot_images(document):
+    # Names of the landmark and fun fact images in the snapshot
+    images = set()
+    for landmark in document['landmarks']:
+        if 'image' in landmark:
+            images.add(landmark['image'])
+        images.update(fun_fact['imageName'] for fun_fact in landmark['funFacts'] if 'imageName' in fun_fact)
+    return sorted(images)
+
+
+def read_pointer(s3, bucket, slug):
+    try:
+        return json.loads(s3.get_object(Bucket=bucket, Key=pointer_key(slug))['Body'].read())
+    except s3.exceptions.NoSuchKey:
+        return None
+
+
+def publish_snapshot(s3, bucket, document):
+    """Uploads a snapshot and moves its city's pointer to it.
+
+    Returns the pointer, or None if the city already points at this
+    version and nothing was written.
+    """
+    slug = city_slug((document['city'], document['state'], document['country']))
+    current = read_pointer(s3, bucket, slug)
+    if current and current['version'] == document['version']:
+        return None
+
+    key = snapshot_key(slug, document['version'])
+    s3.put_object(Bucket=bucket, Key=key, Body=gzip.compress(encode_snapshot(document), mtime=0),
+                  ContentType='application/json', ContentEncoding='gzip',
+                  # Content-addressed, so the object never changes
+                  CacheControl='public, max-age=31536000, immutable')
+
+    pointer = {
+        'version': document['version'],
+        'key': key,
+        'landmarks': len(document['landmarks']),
+        'images': snapshot_images(document),
+    }
+    # Written last so the pointer never names a missing object
+    s3.put_object(Bucket=bucket, Key=pointer_key(slug), Body=json.dumps(pointer).encode(),
+                  ContentType='application/json', CacheControl='no-cache')
+    return pointer
+
+
+def read_snapshot(s3, bucket, key):
+    body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+    if body[:2] == b'\x1f\x8b':
+        body = gzip.decompress(body)
+    return json.loads(body)
@@ -0,0 +1,69 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class PresignedUrlCache:
+    """Warm-container cache of presigned URLs keyed by S3 key.
+
+    Time is cut into fixed buckets of bucket_seconds. Every URL signed
+    during a bucket expires at the same moment, bucket start + expires_in,
+    and is served from the cache until the bucket ends, so repeat requests
+    within a bucket return byte-identical URLs. Cached URLs therefore
+    always have at least expires_in - bucket_seconds of validity left.
+    """
+
+    def __init__(self, sign, expires_in=3600, bucket_seconds=900, max_size=2048, clock=time.time):
+        if bucket_seconds >= expires_in:
+            raise ValueError('bucket_seconds must be shorter than expires_in')
+        self.sign = sign
+        self.expires_in = expires_in
+        self.bucket_seconds = bucket_seconds
+        self.max_size = max_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._urls = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = self.clock()
+        bucket_start = int(now // self.bucket_seconds) * self.bucket_seconds
+
+        with self._lock:
+            entry = self._urls.get(key)
+            if entry is not None and entry[0] == bucket_start:
+                self._urls.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Sign outside the lock; expiry is aligned to the bucket, not to now
+        expires_in = max(int(bucket_start + self.expires_in - now), 1)
+        url = self.sign(key, expires_in)
+
+        with self._lock:
+            self._urls[key] = (bucket_start, url)
+            self._urls.move_to_end(key)
+            while len(self._urls) > self.max_size:
+                self._urls.popitem(last=False)
+                self.evictions += 1
+        return url
+
+    def current_bucket(self):
+        """Start of the current time bucket; URLs served until it ends are byte-identical."""
+        return int(self.clock() // self.bucket_seconds) * self.bucket_seconds
+
+    def clear(self):
+        with self._lock:
+            self._urls.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._urls),
+            }
@@ -1,59 +1,116 @@
+import argparse
+import hashlib
 import json
 import datetime
+import math
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from decimal import Decimal
+
 import boto3
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
 
+# Length of the geohash prefix used as the partition key of the Landmark
+# geohashIndex GSI. Must match GEOHASH_INDEX_PRECISION in lambda/geo.py.
+GEOHASH_INDEX_PRECISION = 4
 
-def clean_landmarks_data():
-    # Load the data from the JSON file
-    with open("../firestore_data/landmarks.json") as f:
-        data = json.load(f)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "firestore_data")
 
-    # Clean the data
-    for landmark in data:
-        del landmark["l"]
-        del landmark["g"]
-        del landmark["dislikes"]
-        landmark["createdAt"] = datetime.datetime.now().isoformat()
-        landmark["updatedAt"] = datetime.datetime.now().isoformat()
-        landmark["likes"] = 0
+# BatchWriteItem accepts at most 25 items per request
+BATCH_SIZE = 25
+
+
+def iter_json_records(path, chunk_size=1 << 16):
+    """Yields the records of a JSON array or NDJSON file one at a time.
+
+    Arrays are decoded element by element from a sliding buffer, so memory
+    stays proportional to one record rather than the whole export. Array
+    elements must be objects. Numbers are parsed as Decimal.
+    """
+    decoder = json.JSONDecoder(parse_float=Decimal)
+    with open(path) as f:
+        buffer = f.read(chunk_size)
+        start = len(buffer) - len(buffer.lstrip())
+        if buffer[start:start + 1] != "[":
+            # Newline delimited JSON
+            f.seek(0)
+            for line in f:
+                if line.strip():
+                    yield decoder.decode(line)
+            return
 
-        # Convert the coordinates to decimal
-        landmark["coordinates"]["latitude"] = str(landmark["coordinates"]["latitude"])
-        landmark["coordinates"]["longitude"] = str(landmark["coordinates"]["longitude"])
+        pos = start + 1
+        eof = False
+        while True:
+            # Skip separators between elements
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos >= len(buffer):
+                    raise ValueError("need more data")
+                record, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError(f"Truncated JSON array in {path}")
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            yield record
 
-    # Write the cleaned data back to the JSON file
-    return data
 
+def clean_landmark(landmark):
+    # Keep the geohash for the nearby landmarks index
+    landmark["geohash"] = landmark["g"]
+    landmark["geohashPrefix"] = landmark["g"][:GEOHASH_INDEX_PRECISION]
+    del landmark["l"]
+    del landmark["g"]
+    del landmark["dislikes"]
+    landmark["createdAt"] = datetime.datetime.now().isoformat()
+    landmark["updatedAt"] = datetime.datetime.now().isoformat()
+    landmark["likes"] = 0
 
-def clean_fun_facts_data():
-    # Load the data from the JSON file
-    with open("../firestore_data/funFacts.json") as f:
-        data = json.load(f)
+    # Convert the coordinates to decimal
+    landmark["coordinates"]["latitude"] = str(landmark["coordinates"]["latitude"])
+    landmark["coordinates"]["longitude"] = str(landmark["coordinates"]["longitude"])
+    return landmark
 
-    # Clean the data
-    for fun_fact in data:
-        del fun_fact["dislikes"]
-        fun_fact["createdAt"] = datetime.datetime.now().isoformat()
-        fun_fact["updatedAt"] = datetime.datetime.now().isoformat()
-        fun_fact["likes"] = 0
-        fun_fact["funFactId"] = fun_fact["id"]
-        del fun_fact["id"]
-        del fun_fact["verificationFlag"]
-        del fun_fact["disputeFlag"]
-        del fun_fact["dateSubmitted"]
-        fun_fact["funFactStatus"] = "APPROVED"
 
-        if "rejectionUsers" in fun_fact:
-            del fun_fact["rejectionUsers"]
+def clean_fun_fact(fun_fact):
+    del fun_fact["dislikes"]
+    fun_fact["createdAt"] = datetime.datetime.now().isoformat()
+    fun_fact["updatedAt"] = datetime.datetime.now().isoformat()
+    fun_fact["likes"] = 0
+    fun_fact["funFactId"] = fun_fact["id"]
+    del fun_fact["id"]
+    del fun_fact["verificationFlag"]
+    del fun_fact["disputeFlag"]
+    del fun_fact["dateSubmitted"]
+    fun_fact["funFactStatus"] = "APPROVED"
 
-        if "approvalUsers" in fun_fact:
-            del fun_fact["approvalUsers"]
+    if "rejectionUsers" in fun_fact:
+        del fun_fact["rejectionUsers"]
 
-        if "rejectionReason" in fun_fact:
-            del fun_fact["rejectionReason"]
+    if "approvalUsers" in fun_fact:
+        del fun_fact["approvalUsers"]
 
-    # Write the cleaned data back to the JSON file
-    return data
+    if "rejectionReason" in fun_fact:
+        del fun_fact["rejectionReason"]
+    return fun_fact
+
+
+def clean_landmarks_data(path=os.path.join(DATA_DIR, "landmarks.json")):
+    return [clean_landmark(landmark) for landmark in iter_json_records(path)]
+
+
+def clean_fun_facts_data(path=os.path.join(DATA_DIR, "funFacts.json")):
+    return [clean_fun_fact(fun_fact) for fun_fact in iter_json_records(path)]
 
 
 def get_distinct_categories(data):
@@ -74,11 +131,401 @@ def add_data(data, table_name):
             batch.put_item(Item=item)
 
 
+class Checkpoint:
+    """Number of leading records already written, persisted after each advance.
+
+    Batches finish out of order, so only the contiguous prefix of finished
+    batches counts as committed. A rerun skips that prefix; batches that
+    finished past a gap are rewritten, which is safe because puts are
+    idempotent.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.committed = 0
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.committed = json.load(f)["committed"]
+
+    def save(self, committed):
+        self.committed = committed
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"committed": committed}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class LoadStats:
+
+    def __init__(self, skipped=0):
+        self.started = time.monotonic()
+        self.skipped = skipped
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.consumed_wcu = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items, retries, consumed_wcu):
+        with self._lock:
+            self.written += items
+            self.batches += 1
+            self.retries += retries
+            self.consumed_wcu += consumed_wcu
+
+    def as_dict(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            "written": self.written,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "retries": self.retries,
+            "consumedWCU": round(self.consumed_wcu, 1),
+            "seconds": round(elapsed, 2),
+            "itemsPerSecond": round(self.written / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def write_batch(client, table_name, items, max_retries=8, base_delay=0.05, max_delay=5.0):
+    """Writes up to 25 serialized items, retrying unprocessed ones with full jitter backoff.
+
+    Returns (retries, consumed WCU).
+    """
+    return _write_requests(client, table_name, [{"PutRequest": {"Item": item}} for item in items],
+                           max_retries, base_delay, max_delay)
+
+
+def _write_requests(client, table_name, requests, max_retries, base_delay, max_delay):
+    retries = 0
+    consumed = 0.0
+    while True:
+        response = client.batch_write_item(
+            RequestItems={table_name: requests},
+            ReturnConsumedCapacity="TOTAL"
+        )
+        for capacity in response.get("ConsumedCapacity", []):
+            consumed += capacity.get("CapacityUnits", 0)
+
+        requests = response.get("UnprocessedItems", {}).get(table_name, [])
+        if not requests:
+            return retries, consumed
+        if retries >= max_retries:
+            raise RuntimeError(f"{len(requests)} items still unprocessed after {max_retries} retries")
+        time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** retries)))
+        retries += 1
+
+
+def load_records(records, table_name, workers=4, checkpoint_path=None, client=None,
+                 report=None, report_interval=5.0, **retry_options):
+    """Writes records to a table with parallel BatchWriteItem workers.
+
+    Records are consumed lazily with at most 2 * workers batches in flight.
+    Progress is checkpointed so a rerun with the same input and checkpoint
+    resumes after the last committed record. report(stats) is called about
+    every report_interval seconds. Returns the final stats dict.
+    """
+    client = client or boto3.client("dynamodb")
+    serializer = TypeSerializer()
+    checkpoint = Checkpoint(checkpoint_path)
+    resume_from = checkpoint.committed
+    stats = LoadStats(skipped=resume_from)
+
+    finished = {}
+    next_to_commit = resume_from
+    in_flight = set()
+    last_report = time.monotonic()
+
+    def batches():
+        batch = []
+        offset = 0
+        for index, record in enumerate(records):
+            if index < resume_from:
+                continue
+            if not batch:
+                offset = index
+            batch.append({name: serializer.serialize(value) for name, value in record.items()})
+            if len(batch) == BATCH_SIZE:
+                yield offset, batch
+                batch = []
+        if batch:
+            yield offset, batch
+
+    def collect(done):
+        nonlocal next_to_commit
+        error = None
+        for future in done:
+            in_flight.discard(future)
+            offset, size = future.batch
+            try:
+                retries, consumed = future.result()
+            except Exception as e:
+                error = error or e
+                continue
+            stats.record(size, retries, consumed)
+            finished[offset] = size
+
+        # Advance the checkpoint over the contiguous prefix of finished batches
+        advanced = False
+        while next_to_commit in finished:
+            next_to_commit += finished.pop(next_to_commit)
+            advanced = True
+        if advanced:
+            checkpoint.save(next_to_commit)
+        if error:
+            raise error
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for offset, batch in batches():
+            if len(in_flight) >= 2 * workers:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+
+            future = executor.submit(write_batch, client, table_name, batch, **retry_options)
+            future.batch = (offset, len(batch))
+            in_flight.add(future)
+
+            if report and time.monotonic() - last_report >= report_interval:
+                report(stats.as_dict())
+                last_report = time.monotonic()
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done)
+
+    # A finished load needs no resume point
+    checkpoint.clear()
+    return stats.as_dict()
+
+
+# Attributes stamped by the cleaning functions or owned by the live table.
+# They are left out of the content hash, and updates never overwrite the
+# server-owned ones. sourceFields lists the attributes a sync wrote, the
+# only ones a later sync removes when the source drops them.
+VOLATILE_FIELDS = {"createdAt", "updatedAt", "likes", "contentHash", "sourceFields"}
+SERVER_OWNED_FIELDS = {"createdAt", "likes"}
+
+
+def content_hash(record):
+    content = {name: value for name, value in record.items() if name not in VOLATILE_FIELDS}
+    encoded = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def item_key(record, key_attributes):
+    return json.dumps([record[name] for name in key_attributes], default=str)
+
+
+def estimate_wcu(item):
+    # One WCU per started KB of item size (attribute names plus values)
+    size = sum(len(name) + len(json.dumps(value, default=str)) for name, value in item.items())
+    return max(1, math.ceil(size / 1024))
+
+
+def load_manifest(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(path, hashes):
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(hashes, f)
+    os.replace(f"{path}.tmp", path)
+
+
+def scan_hashes(client, table_name, key_attributes):
+    """Reads the key and content hash of every item in the table.
+
+    Items without a contentHash were not written by a sync (e.g. seeded by
+    add_data or created by the app) and get a None hash, so they are
+    updated in place, keeping their likes, and never deleted.
+    """
+    names = {f"#k{i}": name for i, name in enumerate(key_attributes)}
+    kwargs = {
+        "TableName": table_name,
+        "ProjectionExpression": ", ".join(list(names) + ["contentHash"]),
+        "ExpressionAttributeNames": names,
+    }
+    deserializer = TypeDeserializer()
+    hashes = {}
+    consumed = 0.0
+    for page in client.get_paginator("scan").paginate(ReturnConsumedCapacity="TOTAL", **kwargs):
+        consumed += page.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+        for raw in page["Items"]:
+            item = {name: deserializer.deserialize(value) for name, value in raw.items()}
+            hashes[item_key(item, key_attributes)] = item.get("contentHash")
+    return hashes, consumed
+
+
+def compute_diff(records, existing_hashes, key_attributes, partial=False):
+    """Splits source records into puts, updates and unchanged, plus keys to delete.
+
+    Only items a sync wrote, i.e. with a hash, are deleted, and none when
+    the records are partial, such as the changes of an incremental export.
+    """
+    puts = []
+    updates = []
+    unchanged = 0
+    seen = set()
+    for record in records:
+        record["contentHash"] = content_hash(record)
+        record["sourceFields"] = sorted(name for name in record
+                                        if name not in VOLATILE_FIELDS and name not in key_attributes)
+        key = item_key(record, key_attributes)
+        seen.add(key)
+        if key not in existing_hashes:
+            puts.append(record)
+        elif existing_hashes[key] != record["contentHash"]:
+            updates.append(record)
+        else:
+            unchanged += 1
+    deletes = [] if partial else [json.loads(key) for key, existing_hash in existing_hashes.items()
+                                  if existing_hash is not None and key not in seen]
+    return puts, updates, deletes, unchanged
+
+
+def update_item(client, table_name, record, key_attributes):
+    """Overwrites the content of an existing item, keeping its server-owned fields.
+
+    Attributes the last sync wrote that the source no longer has are removed
+    in a second request, which only happens when the export's schema
+    changed. Attributes other writers added are kept. Returns consumed WCU.
+    """
+    serializer = TypeSerializer()
+    key = {name: serializer.serialize(record[name]) for name in key_attributes}
+    fields = [name for name in record if name not in key_attributes and name not in SERVER_OWNED_FIELDS]
+
+    response = client.update_item(
+        TableName=table_name,
+        Key=key,
+        UpdateExpression="SET " + ", ".join(f"#f{i} = :v{i}" for i in range(len(fields))),
+        ExpressionAttributeNames={f"#f{i}": name for i, name in enumerate(fields)},
+        ExpressionAttributeValues={f":v{i}": serializer.serialize(record[name]) for i, name in enumerate(fields)},
+        ReturnValues="ALL_OLD",
+        ReturnConsumedCapacity="TOTAL"
+    )
+    consumed = response.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+
+    synced = response.get("Attributes", {}).get("sourceFields")
+    stale = set(TypeDeserializer().deserialize(synced) if synced else ()) - set(record) - SERVER_OWNED_FIELDS
+    if stale:
+        stale = sorted(stale)
+        response = client.update_item(
+            TableName=table_name,
+            Key=key,
+            UpdateExpression="REMOVE " + ", ".join(f"#r{i}" for i in range(len(stale))),
+            ExpressionAttributeNames={f"#r{i}": name for i, name in enumerate(stale)},
+            ReturnConsumedCapacity="TOTAL"
+        )
+        consumed += response.get("ConsumedCapacity", {}).get("CapacityUnits", 0)
+    return consumed
+
+
+def delete_batch(client, table_name, keys, key_attributes, max_retries=8, base_delay=0.05, max_delay=5.0):
+    """Deletes up to 25 items by key, retrying unprocessed ones like write_batch. Returns consumed WCU."""
+    serializer = TypeSerializer()
+    requests = [{"DeleteRequest": {"Key": {name: serializer.serialize(value)
+                                           for name, value in zip(key_attributes, key)}}} for key in keys]
+    _, consumed = _write_requests(client, table_name, requests, max_retries, base_delay, max_delay)
+    return consumed
+
+
+def sync_records(records, table_name, key_attributes, client=None, manifest_path=None, workers=4, dry_run=False,
+                 partial=False):
+    """Writes only the difference between source records and the table.
+
+    Existing content hashes come from the manifest saved by the last sync
+    when there is one, otherwise from a keys-only scan of the table. New
+    items are put, changed items are updated in place (keeping likes and
+    createdAt), and synced items missing from the source are deleted unless
+    the records are partial. Returns a report of the diff and of the write
+    capacity saved compared with rewriting every item.
+    """
+    client = client or boto3.client("dynamodb")
+
+    manifest = load_manifest(manifest_path)
+    if manifest is not None:
+        existing_hashes, consumed_rcu = manifest, 0.0
+    else:
+        existing_hashes, consumed_rcu = scan_hashes(client, table_name, key_attributes)
+
+    records = list(records)
+    puts, updates, deletes, unchanged = compute_diff(records, existing_hashes, key_attributes, partial)
+    full_reseed_wcu = sum(estimate_wcu(record) for record in records)
+
+    consumed_wcu = 0.0
+    if not dry_run:
+        if puts:
+            consumed_wcu += load_records(puts, table_name, workers=workers)["consumedWCU"]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            consumed_wcu += sum(executor.map(
+                lambda record: update_item(client, table_name, record, key_attributes), updates))
+            consumed_wcu += sum(executor.map(
+                lambda batch: delete_batch(client, table_name, batch, key_attributes),
+                [deletes[i:i + BATCH_SIZE] for i in range(0, len(deletes), BATCH_SIZE)]))
+
+        if manifest_path:
+            hashes = {item_key(record, key_attributes): record["contentHash"] for record in records}
+            # Partial records leave every other item as it was
+            save_manifest(manifest_path, {**existing_hashes, **hashes} if partial else hashes)
+
+    # DynamoDB Local and some stand-ins report no capacity; fall back to estimates
+    if not consumed_wcu and (puts or updates or deletes):
+        consumed_wcu = (sum(estimate_wcu(record) for record in puts + updates) + len(deletes))
+
+    return {
+        "source": len(records),
+        "puts": len(puts),
+        "updates": len(updates),
+        "deletes": len(deletes),
+        "unchanged": unchanged,
+        "consumedRCU": round(consumed_rcu, 1),
+        "consumedWCU": round(consumed_wcu, 1),
+        "fullReseedWCU": full_reseed_wcu,
+        "savedWCU": round(full_reseed_wcu - consumed_wcu, 1),
+        "dryRun": dry_run,
+        "partial": partial,
+    }
+
+
+DATASETS = {
+    "landmarks": ("landmarks.json", clean_landmark, "Landmark", ("id",)),
+    "funFacts": ("funFacts.json", clean_fun_fact, "FunFact", ("landmarkId", "funFactId")),
+}
+
+
 if __name__ == "__main__":
-    # Clean the data
-    landmarks_data = clean_landmarks_data()
-    # fun_facts_data = clean_fun_facts_data()
-    print(get_distinct_categories(landmarks_data))
+    parser = argparse.ArgumentParser(description="Load a Firestore export into DynamoDB")
+    parser.add_argument("dataset", choices=sorted(DATASETS))
+    parser.add_argument("--input", help="JSON array or NDJSON export (defaults to firestore_data/)")
+    parser.add_argument("--table", help="Target table (defaults to the dataset's table)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--checkpoint", help="Progress file used to resume an interrupted load")
+    parser.add_argument("--sync", action="store_true", help="Only write items that differ from the table")
+    parser.add_argument("--manifest", help="Content hashes from the last sync, used instead of scanning the table")
+    parser.add_argument("--dry-run", action="store_true", help="With --sync, report the diff without writing")
+    parser.add_argument("--partial", action="store_true",
+                        help="With --sync, the input holds only changed records, so nothing is deleted; "
+                             "implied for *.changes.ndjson exports")
+    args = parser.parse_args()
+
+    file_name, clean, table_name, key_attributes = DATASETS[args.dataset]
+    input_path = args.input or os.path.join(DATA_DIR, file_name)
+    records = (clean(record) for record in iter_json_records(input_path))
 
-    # Add the data to the Landmarks table
-    # add_data(fun_facts_data, "FunFact")
\ No newline at end of file
+    if args.sync:
+        # Incremental exports hold only the documents changed since the last one
+        partial = args.partial or input_path.endswith(".changes.ndjson")
+        print(sync_records(records, args.table or table_name, key_attributes, manifest_path=args.manifest,
+                           workers=args.workers, dry_run=args.dry_run, partial=partial))
+    else:
+        checkpoint_path = args.checkpoint or f"{os.path.basename(input_path)}.{args.dataset}.checkpoint"
+        print(load_records(records, args.table or table_name, workers=args.workers,
+                           checkpoint_path=checkpoint_path, report=print))
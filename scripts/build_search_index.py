@@ -0,0 +1,43 @@
+"""Builds the fun fact search index from a Firestore export.
+
+Fun facts are cleaned exactly as add_dynamodb_data.py loads them, so the
+index matches the FunFact table. The artifact is written locally and,
+with --bucket, published to S3 where the GET handler picks it up.
+
+    python scripts/build_search_index.py --out search-index.json.gz --bucket fun-facts-images
+"""
+import argparse
+import gzip
+import os
+import sys
+
+import boto3
+
+from add_dynamodb_data import DATA_DIR, clean_fun_fact, iter_json_records
+
+# The index format lives with the handler that reads it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda"))
+import search  # noqa: E402
+
+
+def build(input_path):
+    return search.build_index(clean_fun_fact(record) for record in iter_json_records(input_path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the fun fact search index")
+    parser.add_argument("--input", default=os.path.join(DATA_DIR, "funFacts.json"),
+                        help="JSON array or NDJSON export of fun facts")
+    parser.add_argument("--out", default="search-index.json.gz")
+    parser.add_argument("--bucket", help="Also publish the index to this bucket")
+    args = parser.parse_args()
+
+    artifact = build(args.input)
+    with open(args.out, "wb") as f:
+        f.write(gzip.compress(search.encode_artifact(artifact), mtime=0))
+    print({"version": artifact["version"], "documents": len(artifact["docs"]),
+           "terms": len(artifact["terms"]), "bytes": os.path.getsize(args.out)})
+
+    if args.bucket:
+        published = search.publish_index(boto3.client("s3"), args.bucket, artifact)
+        print(f"Published {search.artifact_key(artifact['version'])}" if published else "Index unchanged")
@@ -0,0 +1,25 @@
+"""Rebuilds the map cluster pyramid of landmarks from the Landmark table.
+
+The pyramid is kept current from the Landmark stream; this backfills it
+after a bulk load, which the stream does not see, or repairs counts that a
+retried stream batch applied twice. It scans the Landmark table once and
+rewrites every cell, so prefer invoking the ClusterUpdater function with
+{"all": true} for large tables, and run it while writes are quiet.
+
+    python scripts/rebuild_clusters.py
+"""
+import argparse
+import os
+import sys
+
+# The pyramid format lives with the handler that maintains it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda"))
+import cluster_updater  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the landmark cluster pyramid")
+    parser.parse_args()
+
+    result = cluster_updater.rebuild_all()
+    print(f"Rebuilt {result['cells']} cells, deleted {result['deleted']} empty cells")
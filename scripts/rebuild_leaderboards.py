@@ -0,0 +1,28 @@
+"""Rebuilds every city's trending fun facts board from the tables.
+
+Boards are kept current from the FunFact stream; this backfills them after
+a bulk load, which the stream does not see, or repairs them. It scans the
+Landmark and FunFact tables once, so prefer invoking the LeaderboardUpdater
+function with {"all": true} for large tables. Stream updates arriving
+during the rebuild may be overwritten until their fact changes again, so run
+it while writes are quiet.
+
+    python scripts/rebuild_leaderboards.py
+"""
+import argparse
+import os
+import sys
+
+# The board format lives with the handler that maintains it
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda"))
+import leaderboard_updater  # noqa: E402
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the trending fun facts leaderboards")
+    parser.parse_args()
+
+    sizes = leaderboard_updater.rebuild_all()
+    for slug, entries in sizes.items():
+        print(f"{slug}: {entries} entries")
+    print(f"Rebuilt {len(sizes)} boards")
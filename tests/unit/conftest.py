@@ -0,0 +1,90 @@
+import importlib
+import importlib.util
+import os
+import sys
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from benchmarks.local_aws import LAMBDA_DIR, create_bucket, create_tables
+# Importable once benchmarks.local_aws has put lambda/ on sys.path
+import dynamo
+
+LOADER_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "scripts", "add_dynamodb_data.py")
+
+
+@pytest.fixture
+def aws():
+    with mock_aws():
+        dynamodb = boto3.resource("dynamodb")
+        create_tables(dynamodb)
+        create_bucket(boto3.client("s3"))
+        yield dynamodb
+
+
+@pytest.fixture
+def load_handler(aws):
+    # Import a fresh copy of a handler module so module-level clients are
+    # created inside the mock and no warm-container state leaks between tests
+    def load(name):
+        for module_name, module in list(sys.modules.items()):
+            if getattr(module, "__file__", None) and module.__file__.startswith(LAMBDA_DIR):
+                del sys.modules[module_name]
+        return importlib.import_module(name)
+    return load
+
+
+@pytest.fixture(scope="session")
+def loader():
+    # scripts/add_dynamodb_data.py, which is not a package module
+    spec = importlib.util.spec_from_file_location("add_dynamodb_data", LOADER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeStream:
+    """Writes items to a table and returns the stream records DynamoDB would emit."""
+
+    def __init__(self, table_name, key_attributes):
+        self.table_name = table_name
+        self.key_attributes = key_attributes
+        self.client = boto3.client("dynamodb")
+        # Current items by key, the key's value for a single key attribute
+        self.items = {}
+        self.sequence = 0
+
+    def key(self, item):
+        values = tuple(item[name] for name in self.key_attributes)
+        return values[0] if len(values) == 1 else values
+
+    def put(self, item):
+        old = self.items.get(self.key(item))
+        self.items[self.key(item)] = item
+        self.client.put_item(TableName=self.table_name, Item=dynamo.serialize_item(item))
+        return self.record("MODIFY" if old else "INSERT", old, item)
+
+    def delete(self, key):
+        old = self.items.pop(key)
+        self.client.delete_item(TableName=self.table_name, Key=self._key_attributes(old))
+        return self.record("REMOVE", old, None)
+
+    def _key_attributes(self, item):
+        return dynamo.serialize_item({name: item[name] for name in self.key_attributes})
+
+    def record(self, event_name, old, new):
+        self.sequence += 1
+        change = {"Keys": self._key_attributes(new or old), "SequenceNumber": str(self.sequence)}
+        if old:
+            change["OldImage"] = dynamo.serialize_item(old)
+        if new:
+            change["NewImage"] = dynamo.serialize_item(new)
+        return {"eventName": event_name, "dynamodb": change,
+                "eventSourceARN": f"arn:aws:dynamodb:us-east-1:123456789012:table/{self.table_name}/stream/1"}
+
+
+@pytest.fixture
+def stream(aws):
+    # stream(table name, key attributes) -> FakeStream
+    return FakeStream
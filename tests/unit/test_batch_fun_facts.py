@@ -0,0 +1,62 @@
+import json
+
+
+def batch_event(landmark_ids, **params):
+    return {"resource": "/funFacts", "queryStringParameters": dict(params, landmarkIds=landmark_ids)}
+
+
+def test_batch_groups_fun_facts_by_landmark(aws, load_handler):
+    table = aws.Table("FunFact")
+    for landmark_id, count in (("L1", 2), ("L2", 3)):
+        for i in range(count):
+            table.put_item(Item={"landmarkId": landmark_id, "funFactId": f"{landmark_id}-F{i}", "likes": i})
+
+    get_fun_fact = load_handler("get_fun_fact")
+    response = get_fun_fact.handler(batch_event("L1,L2,L3,L1", pageSize="2"), None)
+
+    assert response["statusCode"] == 200
+    body = json.loads(response["body"])
+    assert list(body["results"]) == ["L1", "L2", "L3"]
+    assert [item["funFactId"] for item in body["results"]["L1"]["items"]] == ["L1-F0", "L1-F1"]
+    assert "nextToken" not in body["results"]["L1"]
+    assert body["results"]["L3"] == {"items": []}
+    assert body["errors"] == {}
+
+    # The per-landmark token continues with the single-landmark endpoint
+    response = get_fun_fact.handler({"resource": "/funFacts", "queryStringParameters": {
+        "landmarkId": "L2", "pageSize": "2", "nextToken": body["results"]["L2"]["nextToken"]}}, None)
+    assert [item["funFactId"] for item in json.loads(response["body"])] == ["L2-F2"]
+
+
+def test_batch_reports_partial_failures(aws, load_handler, monkeypatch):
+    get_fun_fact = load_handler("get_fun_fact")
+    fun_facts_page = get_fun_fact.fun_facts_page
+
+    def failing_page(landmark_id, page_size, token=None, fields=None):
+        if landmark_id == "bad":
+            raise RuntimeError("throttled")
+        return fun_facts_page(landmark_id, page_size, token, fields)
+
+    monkeypatch.setattr(get_fun_fact, "fun_facts_page", failing_page)
+    response = get_fun_fact.handler(batch_event("good,bad"), None)
+    body = json.loads(response["body"])
+
+    assert body["results"] == {"good": {"items": []}}
+    # The exception text is logged, not returned
+    assert "throttled" not in response["body"]
+    assert body["errors"] == {"bad": get_fun_fact.BATCH_READ_ERROR}
+
+
+def test_batch_rejects_too_many_landmarks(aws, load_handler):
+    get_fun_fact = load_handler("get_fun_fact")
+    landmark_ids = ",".join(f"L{i}" for i in range(get_fun_fact.MAX_BATCH_LANDMARKS + 1))
+
+    assert get_fun_fact.handler(batch_event(landmark_ids), None)["statusCode"] == 400
+
+
+def test_fun_facts_require_a_landmark(aws, load_handler):
+    get_fun_fact = load_handler("get_fun_fact")
+    response = get_fun_fact.handler({"resource": "/funFacts", "queryStringParameters": {"pageSize": "2"}}, None)
+
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"]) == {"error": "landmarkId or landmarkIds is required"}
@@ -0,0 +1,82 @@
+import boto3
+import pytest
+
+from benchmarks import synthetic
+
+
+@pytest.fixture
+def export(tmp_path):
+    # 40x the real landmark export, in the Firestore array layout
+    path = tmp_path / "landmarks.json"
+    synthetic.write_json_array(synthetic.landmarks(40), path)
+    return path
+
+
+def count_items(table_name):
+    pages = boto3.client("dynamodb").get_paginator("scan").paginate(TableName=table_name, Select="COUNT")
+    return sum(page["Count"] for page in pages)
+
+
+def test_streams_json_arrays_and_ndjson(loader, export, tmp_path):
+    ndjson = tmp_path / "landmarks.ndjson"
+    synthetic.write_ndjson(synthetic.landmarks(2), ndjson)
+
+    from_array = list(loader.iter_json_records(export, chunk_size=512))
+    assert len(from_array) == 40 * 88
+    assert from_array[:176] == list(loader.iter_json_records(ndjson))
+
+
+def test_parallel_load_writes_every_record(aws, loader, export):
+    records = (loader.clean_landmark(record) for record in loader.iter_json_records(export))
+    stats = loader.load_records(records, "Landmark", workers=8)
+
+    assert stats["written"] == 40 * 88
+    assert count_items("Landmark") == 40 * 88
+
+
+def test_rerun_resumes_from_checkpoint(aws, loader, export, tmp_path):
+    checkpoint = tmp_path / "landmarks.checkpoint"
+    client = boto3.client("dynamodb")
+    calls = []
+
+    class FailingClient:
+        def batch_write_item(self, **kwargs):
+            calls.append(1)
+            if len(calls) > 30:
+                raise RuntimeError("connection reset")
+            return client.batch_write_item(**kwargs)
+
+    def records():
+        return (loader.clean_landmark(record) for record in loader.iter_json_records(export))
+
+    with pytest.raises(RuntimeError):
+        loader.load_records(records(), "Landmark", workers=1, checkpoint_path=str(checkpoint), client=FailingClient())
+    assert loader.Checkpoint(str(checkpoint)).committed == 30 * loader.BATCH_SIZE
+
+    stats = loader.load_records(records(), "Landmark", workers=4, checkpoint_path=str(checkpoint))
+    assert stats["skipped"] == 30 * loader.BATCH_SIZE
+    assert stats["written"] == 40 * 88 - 30 * loader.BATCH_SIZE
+    assert count_items("Landmark") == 40 * 88
+    assert not checkpoint.exists()
+
+
+def test_unprocessed_items_are_retried(aws, loader):
+    client = boto3.client("dynamodb")
+
+    class ThrottlingClient:
+        throttled = False
+
+        def batch_write_item(self, RequestItems, **kwargs):
+            requests = RequestItems["FunFact"]
+            if not self.throttled:
+                # Accept only the first item, as DynamoDB does under throttling
+                self.throttled = True
+                client.batch_write_item(RequestItems={"FunFact": requests[:1]}, **kwargs)
+                return {"UnprocessedItems": {"FunFact": requests[1:]}}
+            return client.batch_write_item(RequestItems=RequestItems, **kwargs)
+
+    records = [{"landmarkId": "L1", "funFactId": f"F{i}"} for i in range(10)]
+    stats = loader.load_records(records, "FunFact", workers=1, client=ThrottlingClient(), base_delay=0.001)
+
+    assert stats["retries"] == 1
+    assert count_items("FunFact") == 10
@@ -0,0 +1,188 @@
+import json
+import random
+
+import boto3
+import pytest
+
+from benchmarks import synthetic
+
+NEW_YORK = "40.6,-74.1,40.95,-73.7"
+
+
+def move(updater, landmarks, item, latitude, longitude):
+    geohash = updater.geo.encode(latitude, longitude)
+    return landmarks.put(dict(item, coordinates={"latitude": str(latitude), "longitude": str(longitude)},
+                              geohash=geohash, geohashPrefix=geohash[:4]))
+
+
+@pytest.fixture
+def updater(aws, load_handler):
+    return load_handler("cluster_updater")
+
+
+@pytest.fixture
+def landmarks(updater, loader, stream):
+    landmarks = stream("Landmark", ("id",))
+    rng = random.Random(5)
+    records = []
+    for landmark in synthetic.landmarks(1):
+        landmark = loader.clean_landmark(landmark)
+        landmark["likes"] = rng.randrange(10)
+        records.append(landmarks.put(landmark))
+    updater.handler({"Records": records}, None)
+    return landmarks
+
+
+def stored_pyramid():
+    client = boto3.client("dynamodb")
+    items = client.scan(TableName="LandmarkCluster")["Items"]
+    return {item["cell"]["S"]: item for item in items if int(item["count"]["N"]) > 0}
+
+
+def assert_matches(updater, landmarks):
+    expected = updater.clusters.build_pyramid(landmarks.items.values())
+    stored = stored_pyramid()
+    assert set(stored) == set(expected)
+    for cell, item in expected.items():
+        stored_item = updater.dynamo.deserialize_item(stored[cell])
+        assert stored_item == item
+
+
+def test_incremental_updates_match_a_full_rebuild(updater, landmarks):
+    assert_matches(updater, landmarks)
+
+    # Landmarks are liked, unliked, moved, renamed, added and deleted
+    rng = random.Random(11)
+    records = []
+    for step in range(300):
+        landmark = dict(landmarks.items[rng.choice(sorted(landmarks.items))])
+        action = rng.random()
+        if action < 0.4:
+            landmark["likes"] = max(0, landmark["likes"] + rng.randrange(-8, 9))
+            records.append(landmarks.put(landmark))
+        elif action < 0.6:
+            latitude = float(landmark["coordinates"]["latitude"]) + rng.uniform(-0.05, 0.05)
+            longitude = float(landmark["coordinates"]["longitude"]) + rng.uniform(-0.05, 0.05)
+            records.append(move(updater, landmarks, landmark, latitude, longitude))
+        elif action < 0.75:
+            landmark["name"] += " (renamed)"
+            records.append(landmarks.put(landmark))
+        elif action < 0.85:
+            records.append(landmarks.put(dict(landmark, id=f"new-{step}", likes=rng.randrange(20))))
+        elif action < 0.95:
+            records.append(landmarks.delete(landmark["id"]))
+        else:
+            # Not shown by clusters
+            landmark["numOfFunFacts"] = landmark.get("numOfFunFacts", 0) + 1
+            records.append(landmarks.put(landmark))
+
+    for start in range(0, len(records), 20):
+        updater.handler({"Records": records[start:start + 20]}, None)
+    assert_matches(updater, landmarks)
+
+    # A rebuild writes the same pyramid and drops the cells left empty
+    assert updater.handler({"all": True}, None)["deleted"] > 0
+    assert_matches(updater, landmarks)
+    assert len(boto3.client("dynamodb").scan(TableName="LandmarkCluster")["Items"]) == len(stored_pyramid())
+
+
+def test_retried_records_are_applied_once(updater, landmarks, monkeypatch):
+    rng = random.Random(3)
+    records = []
+    for landmark_id in sorted(landmarks.items)[:10]:
+        landmark = landmarks.items[landmark_id]
+        latitude = float(landmark["coordinates"]["latitude"]) + rng.uniform(-0.05, 0.05)
+        longitude = float(landmark["coordinates"]["longitude"]) + rng.uniform(-0.05, 0.05)
+        records.append(move(updater, landmarks, dict(landmark, likes=landmark["likes"] - 1), latitude, longitude))
+    records.append(landmarks.delete(sorted(landmarks.items)[20]))
+
+    # The sixth record fails after the first five were applied
+    apply_change = updater.apply_change
+    calls = []
+
+    def failing(old, new):
+        calls.append(old["id"])
+        if len(calls) == 6:
+            raise RuntimeError("throttled")
+        return apply_change(old, new)
+    monkeypatch.setattr(updater, "apply_change", failing)
+    result = updater.handler({"Records": records}, None)
+    assert result["applied"] == 5
+    assert result["batchItemFailures"] == [{"itemIdentifier": records[5]["dynamodb"]["SequenceNumber"]}]
+
+    # Lambda retries from the failed record, and a whole batch may come again
+    assert updater.handler({"Records": records[5:]}, None)["batchItemFailures"] == []
+    assert updater.handler({"Records": records}, None)["batchItemFailures"] == []
+    assert_matches(updater, landmarks)
+
+
+def test_representative_offered_while_choosing_is_kept(updater, landmarks, monkeypatch):
+    landmark = landmarks.items[sorted(landmarks.items)[0]]
+    cell = updater.clusters.cells_of(landmark["geohash"])[-1]
+    cell_candidates = updater.cell_candidates
+    calls = []
+
+    def racing(candidate_cell):
+        candidates = cell_candidates(candidate_cell)
+        calls.append(candidate_cell)
+        if len(calls) == 1:
+            # The landmark is liked and offered after the candidates were read
+            liked = dict(landmark, likes=1000)
+            landmarks.put(liked)
+            updater.offer_representative(liked["geohash"], liked, landmark["likes"])
+        return candidates
+    monkeypatch.setattr(updater, "cell_candidates", racing)
+
+    updater.choose_representatives([cell])
+
+    assert calls == [cell, cell]
+    stored = updater.dynamo.get_item(boto3.client("dynamodb"), TableName="LandmarkCluster",
+                                     Key={"tile": updater.clusters.tile_key(cell), "cell": cell})
+    assert (stored["repId"], stored["repLikes"]) == (landmark["id"], 1000)
+    assert_matches(updater, landmarks)
+
+
+@pytest.fixture
+def get(load_handler):
+    get_fun_fact = load_handler("get_fun_fact")
+
+    def get(**params):
+        response = get_fun_fact.handler({"resource": "/landmarks", "queryStringParameters": params}, None)
+        return response["statusCode"], json.loads(response["body"])
+    return get
+
+
+def test_clusters_by_zoom(get, landmarks):
+    counts = {}
+    for zoom in (2, 8, 12):
+        status, view = get(bbox=NEW_YORK, zoom=str(zoom))
+        assert status == 200 and view["landmarks"] == []
+        assert len(view["clusters"]) <= 1024
+        assert all(len(cluster["cell"]) == view["precision"] for cluster in view["clusters"])
+        assert all("imageUrl" in cluster["landmark"] for cluster in view["clusters"] if "image" in cluster["landmark"])
+        counts[zoom] = sum(cluster["count"] for cluster in view["clusters"])
+        assert len(view["clusters"]) > 1 or zoom == 2
+    # Cells covering the box may reach outside it, never miss a landmark
+    assert counts[2] == len(landmarks.items) and all(count <= counts[2] for count in counts.values())
+
+
+def test_points_when_zoomed_in(get, landmarks):
+    landmark = max(landmarks.items.values(), key=lambda item: (item["likes"], item["id"]))
+    latitude, longitude = float(landmark["coordinates"]["latitude"]), float(landmark["coordinates"]["longitude"])
+    bbox = f"{latitude - 0.002},{longitude - 0.004},{latitude + 0.002},{longitude + 0.004}"
+    status, view = get(bbox=bbox, zoom="18")
+    assert status == 200 and view["precision"] is None and view["clusters"] == []
+    assert landmark["id"] in [item["id"] for item in view["landmarks"]]
+
+
+@pytest.mark.parametrize("params", [
+    {"bbox": "40.9,-74,40.6,-73.7", "zoom": "10"},
+    {"bbox": "40.6,-74", "zoom": "10"},
+    {"bbox": NEW_YORK, "zoom": "23"},
+    {"bbox": NEW_YORK},
+    # Too many cells for the zoom
+    {"bbox": "-60,-170,70,170", "zoom": "14"},
+    {"bbox": "30,-90,50,-60", "zoom": "18"},
+])
+def test_invalid_views(get, params):
+    assert get(**params)[0] == 400
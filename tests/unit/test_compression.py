@@ -0,0 +1,42 @@
+import base64
+import gzip
+import json
+
+import pytest
+
+import compression
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip, deflate", "gzip"),
+    ("gzip;q=0, *;q=0.5", "br" if compression.brotli else None),
+    ("br;q=0.5, gzip;q=0.8", "gzip"),
+    ("*", compression.ENCODINGS[0]),
+])
+def test_choose_encoding(header, expected):
+    assert compression.choose_encoding(header) == expected
+
+
+def test_large_fun_fact_pages_are_gzipped(aws, load_handler):
+    table = aws.Table("FunFact")
+    for i in range(10):
+        table.put_item(Item={"landmarkId": "L1", "funFactId": f"F{i}", "description": "x" * 200})
+    get_fun_fact = load_handler("get_fun_fact")
+    event = {"resource": "/funFacts", "queryStringParameters": {"landmarkId": "L1"}}
+
+    plain = get_fun_fact.handler(event, None)
+    compressed = get_fun_fact.handler(dict(event, headers={"accept-encoding": "gzip"}), None)
+
+    assert "Content-Encoding" not in plain["headers"]
+    assert compressed["headers"]["Content-Encoding"] == "gzip"
+    assert compressed["headers"]["Vary"] == "Accept-Encoding"
+    assert compressed["isBase64Encoded"] is True
+    assert json.loads(gzip.decompress(base64.b64decode(compressed["body"]))) == json.loads(plain["body"])
+
+
+def test_small_bodies_are_not_compressed():
+    response = compression.compress_response({"headers": {"Accept-Encoding": "gzip"}}, {"statusCode": 200, "body": "[]"})
+    assert "isBase64Encoded" not in response
+    assert response["body"] == "[]"
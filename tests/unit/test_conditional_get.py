@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+
+def fun_facts_event(**headers):
+    return {"resource": "/funFacts", "queryStringParameters": {"landmarkId": "L1"}, "headers": headers}
+
+
+@pytest.fixture
+def get_fun_fact(aws, load_handler):
+    table = aws.Table("FunFact")
+    for i in range(3):
+        table.put_item(Item={"landmarkId": "L1", "funFactId": f"F{i}", "imageName": f"F{i}", "likes": i})
+    return load_handler("get_fun_fact")
+
+
+def test_matching_etag_returns_304_without_presigning(get_fun_fact):
+    first = get_fun_fact.handler(fun_facts_event(), None)
+    etag = first["headers"]["ETag"]
+    assert first["statusCode"] == 200 and etag.startswith('W/"')
+    assert first["headers"]["Cache-Control"] == "private, max-age=60"
+
+    signed = get_fun_fact.url_cache.stats()
+    # The weak comparison also matches the tag without its W/ prefix
+    strong = etag.removeprefix("W/")
+    revalidated = get_fun_fact.handler(fun_facts_event(**{"If-None-Match": f'"other", {strong}'}), None)
+    assert revalidated["statusCode"] == 304
+    assert revalidated["body"] == ""
+    assert revalidated["headers"]["ETag"] == etag
+    assert get_fun_fact.url_cache.stats() == signed
+
+    assert get_fun_fact.handler(fun_facts_event(**{"if-none-match": '"stale"'}), None)["statusCode"] == 200
+
+
+def test_etag_follows_data_urls_and_encoding(aws, get_fun_fact, monkeypatch):
+    etag = get_fun_fact.handler(fun_facts_event(), None)["headers"]["ETag"]
+    # Same data and URL bucket: identical bytes, identical tag
+    again = get_fun_fact.handler(fun_facts_event(), None)
+    assert again["headers"]["ETag"] == etag
+
+    gzip_etag = get_fun_fact.handler(fun_facts_event(**{"Accept-Encoding": "gzip"}), None)["headers"]["ETag"]
+    assert gzip_etag != etag
+
+    aws.Table("FunFact").update_item(Key={"landmarkId": "L1", "funFactId": "F0"},
+                                     UpdateExpression="SET likes = :likes", ExpressionAttributeValues={":likes": 9})
+    get_fun_fact.invalidate_fun_facts("L1")
+    changed = get_fun_fact.handler(fun_facts_event(**{"If-None-Match": etag}), None)
+    assert changed["statusCode"] == 200 and changed["headers"]["ETag"] != etag
+
+    # A new URL bucket re-signs the image URLs, so the body and tag change
+    bucket_seconds = get_fun_fact.url_cache.bucket_seconds
+    clock = get_fun_fact.url_cache.clock
+    monkeypatch.setattr(get_fun_fact.url_cache, "clock", lambda: clock() + bucket_seconds)
+    assert get_fun_fact.handler(fun_facts_event(), None)["headers"]["ETag"] != changed["headers"]["ETag"]
+
+
+def test_batch_and_landmark_pages_revalidate(aws, get_fun_fact):
+    aws.Table("Landmark").put_item(Item={"id": "L1", "name": "Flatiron", "image": "L1"})
+    for params in ({"landmarkIds": "L1,L2"}, {}):
+        resource = "/funFacts" if params else "/landmarks"
+        first = get_fun_fact.handler({"resource": resource, "queryStringParameters": params}, None)
+        assert json.loads(first["body"])
+        second = get_fun_fact.handler({"resource": resource, "queryStringParameters": params,
+                                       "headers": {"If-None-Match": first["headers"]["ETag"]}}, None)
+        assert second["statusCode"] == 304
@@ -0,0 +1,100 @@
+import pytest
+
+from benchmarks import synthetic
+
+
+def source(loader, scale=3):
+    return [loader.clean_landmark(record) for record in synthetic.landmarks(scale)]
+
+
+@pytest.mark.parametrize("use_manifest", [False, True])
+def test_resync_writes_only_the_diff_and_keeps_live_counters(aws, loader, tmp_path, use_manifest):
+    table = aws.Table("Landmark")
+    manifest = str(tmp_path / "landmarks.manifest") if use_manifest else None
+
+    first = loader.sync_records(source(loader), "Landmark", ("id",), manifest_path=manifest)
+    assert first["puts"] == 3 * 88 and first["updates"] == first["deletes"] == 0
+
+    # Live traffic: a like on a synced item and a landmark created by the app
+    landmark_id = "0h8VeIhGLnLwoJWHMTQS"
+    table.update_item(Key={"id": landmark_id}, UpdateExpression="SET likes = :l, geohashPrefix = :g",
+                      ExpressionAttributeValues={":l": 7, ":g": "dr5r"})
+    table.put_item(Item={"id": "app-created", "name": "Submitted in the app"})
+
+    records = source(loader)
+    changed = next(record for record in records if record["id"] == landmark_id)
+    changed["name"] = "58 Joralemon Street"
+    del changed["zipcode"]
+    removed = records.pop()
+    records.append(dict(records[0], id="new-landmark"))
+
+    second = loader.sync_records(records, "Landmark", ("id",), manifest_path=manifest)
+
+    assert (second["puts"], second["updates"], second["deletes"]) == (1, 1, 1)
+    assert second["unchanged"] == 3 * 88 - 2
+    assert second["savedWCU"] > 0.9 * second["fullReseedWCU"]
+    if use_manifest:
+        assert second["consumedRCU"] == 0
+
+    item = table.get_item(Key={"id": landmark_id})["Item"]
+    assert item["name"] == "58 Joralemon Street"
+    assert "zipcode" not in item
+    # Attributes other writers own are kept
+    assert item["likes"] == 7 and item["geohashPrefix"] == "dr5r"
+    assert "Item" not in table.get_item(Key={"id": removed["id"]})
+    assert "Item" in table.get_item(Key={"id": "app-created"})
+
+
+def test_content_hash_ignores_volatile_fields(loader):
+    record = {"id": "L1", "name": "x", "likes": 1, "createdAt": "a", "updatedAt": "b"}
+    same = dict(record, likes=9, createdAt="c", updatedAt="d")
+
+    assert loader.content_hash(record) == loader.content_hash(same)
+    assert loader.content_hash(record) != loader.content_hash(dict(record, name="y"))
+
+
+def test_first_sync_of_a_table_seeded_without_hashes_keeps_live_counters(aws, loader):
+    table = aws.Table("Landmark")
+    loader.load_records(source(loader, scale=1), "Landmark", workers=1)
+    landmark_id = "0h8VeIhGLnLwoJWHMTQS"
+    table.update_item(Key={"id": landmark_id}, UpdateExpression="SET likes = :l", ExpressionAttributeValues={":l": 7})
+
+    report = loader.sync_records(source(loader, scale=1), "Landmark", ("id",))
+
+    assert (report["puts"], report["updates"], report["deletes"]) == (0, 88, 0)
+    assert table.get_item(Key={"id": landmark_id})["Item"]["likes"] == 7
+    # The hashes written by the update make the next sync a no-op
+    assert loader.sync_records(source(loader, scale=1), "Landmark", ("id",))["unchanged"] == 88
+
+
+@pytest.mark.parametrize("use_manifest", [False, True])
+def test_partial_sync_never_deletes(aws, loader, tmp_path, use_manifest):
+    table = aws.Table("Landmark")
+    manifest = str(tmp_path / "landmarks.manifest") if use_manifest else None
+    loader.sync_records(source(loader, scale=1), "Landmark", ("id",), manifest_path=manifest)
+
+    # The changes of an incremental export: one edited landmark
+    changed = source(loader, scale=1)[:1]
+    changed[0]["name"] = "Renamed"
+    report = loader.sync_records(changed, "Landmark", ("id",), manifest_path=manifest, partial=True)
+
+    assert (report["puts"], report["updates"], report["deletes"]) == (0, 1, 0)
+    assert table.scan(Select="COUNT")["Count"] == 88
+    assert table.get_item(Key={"id": changed[0]["id"]})["Item"]["name"] == "Renamed"
+    if use_manifest:
+        # The manifest still knows every item
+        assert loader.sync_records(source(loader, scale=1), "Landmark", ("id",), manifest_path=manifest)["updates"] == 1
+
+
+def test_deletes_give_up_after_retries(loader):
+    class ThrottledClient:
+        calls = 0
+
+        def batch_write_item(self, RequestItems, **kwargs):
+            self.calls += 1
+            return {"UnprocessedItems": RequestItems}
+
+    client = ThrottledClient()
+    with pytest.raises(RuntimeError):
+        loader.delete_batch(client, "Landmark", [["L1"], ["L2"]], ("id",), max_retries=3, max_delay=0)
+    assert client.calls == 4
@@ -0,0 +1,47 @@
+from decimal import Decimal
+
+from boto3.dynamodb.types import TypeSerializer
+
+import dynamo
+
+
+def test_deserialize_item_returns_native_numbers():
+    item = {
+        "likes": 3,
+        "score": Decimal("2.5"),
+        "title": "Burnham's Folly",
+        "tags": ["flatiron"],
+        "coordinates": {"latitude": "40.74", "longitude": "-73.98"},
+        "approved": True,
+        "caption": None,
+        "labels": {"a", "b"},
+        "counts": {Decimal(1), Decimal(2)},
+    }
+    serializer = TypeSerializer()
+    wire = {name: serializer.serialize(value) for name, value in item.items()}
+
+    result = dynamo.deserialize_item(wire)
+
+    assert type(result["likes"]) is int and result["likes"] == 3
+    assert type(result["score"]) is float and result["score"] == 2.5
+    assert result["coordinates"] == item["coordinates"]
+    assert result["tags"] == ["flatiron"]
+    assert result["approved"] is True and result["caption"] is None
+    assert sorted(result["labels"]) == ["a", "b"] and sorted(result["counts"]) == [1, 2]
+
+
+def test_serialize_item_round_trips():
+    item = {"id": "L1", "likes": 2, "ratio": 0.5, "flag": False, "nested": {"list": [1, "x", None]}}
+    assert dynamo.deserialize_item(dynamo.serialize_item(item)) == item
+
+
+def test_all_items_follows_every_page():
+    pages = [{"Items": [{"id": "L1"}], "LastEvaluatedKey": {"id": "L1"}}, {"Items": [{"id": "L2"}]}]
+    requests = []
+
+    def scan(client, **kwargs):
+        requests.append(dict(kwargs))
+        return pages[len(requests) - 1]
+
+    assert dynamo.all_items(scan, None, TableName="Landmark") == [{"id": "L1"}, {"id": "L2"}]
+    assert requests == [{"TableName": "Landmark"}, {"TableName": "Landmark", "ExclusiveStartKey": {"id": "L1"}}]
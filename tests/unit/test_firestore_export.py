@@ -0,0 +1,112 @@
+import datetime
+import importlib.util
+import json
+import os
+
+import pytest
+from google.cloud import firestore
+from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+
+EXPORTER_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "firestore_data", "firestore_connect.py")
+
+
+@pytest.fixture(scope="module")
+def exporter():
+    spec = importlib.util.spec_from_file_location("firestore_connect", EXPORTER_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeSnapshot:
+    def __init__(self, data):
+        self.data = data
+
+    def to_dict(self):
+        return dict(self.data)
+
+
+class FakeQuery:
+    # Local stand-in for a Firestore collection supporting `>` filters
+    def __init__(self, documents):
+        self.documents = documents
+
+    def where(self, filter):
+        assert filter.op_string == ">"
+        return FakeQuery([doc for doc in self.documents
+                          if filter.field_path in doc and doc[filter.field_path] > filter.value])
+
+    def stream(self):
+        for doc in self.documents:
+            yield FakeSnapshot(doc)
+
+
+class FakeFirestore:
+    def __init__(self, collections):
+        self.collections = collections
+
+    def collection(self, name):
+        return FakeQuery(self.collections.get(name, []))
+
+
+def at(hour):
+    return DatetimeWithNanoseconds(2024, 1, 1, hour, tzinfo=datetime.timezone.utc)
+
+
+def read_ndjson(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_converts_special_types_recursively(exporter):
+    value = {"l": firestore.GeoPoint(40.7, -73.9), "history": [{"at": at(1)}], "name": "x"}
+
+    assert exporter.convert_value(value) == {
+        "l": {"latitude": 40.7, "longitude": -73.9},
+        "history": [{"at": "2024-01-01T01:00:00+00:00"}],
+        "name": "x",
+    }
+
+
+def test_export_is_parallel_and_incremental(exporter, tmp_path):
+    db = FakeFirestore({
+        "funFacts": [{"id": f"F{i}", "dateSubmitted": at(i), "location": firestore.GeoPoint(40, -73)}
+                     for i in range(5)],
+        "users": [{"uid": "U1"}],
+    })
+
+    counts = exporter.export_collections(["funFacts", "users"], str(tmp_path), db=db)
+    assert counts == {"funFacts": 5, "users": 1}
+    fun_facts = read_ndjson(tmp_path / "funFacts.ndjson")
+    assert fun_facts[0]["location"] == {"latitude": 40, "longitude": -73}
+    assert exporter.load_watermarks(str(tmp_path)) == {"funFacts": at(4)}
+
+    # Nightly sync: only documents submitted since the watermark move, and
+    # collections without a watermark field are exported in full
+    db.collections["funFacts"].append({"id": "F9", "dateSubmitted": at(9)})
+    db.collections["users"].append({"uid": "U2"})
+    with pytest.warns(UserWarning, match="users has no watermark field"):
+        counts = exporter.export_collections(["funFacts", "users"], str(tmp_path), db=db, incremental=True)
+
+    assert counts == {"funFacts": 1, "users": 2}
+    assert [doc["id"] for doc in read_ndjson(tmp_path / "funFacts.changes.ndjson")] == ["F9"]
+    assert [doc["uid"] for doc in read_ndjson(tmp_path / "users.ndjson")] == ["U1", "U2"]
+    assert exporter.load_watermarks(str(tmp_path))["funFacts"] == at(9)
+
+
+def test_warns_when_no_document_has_the_watermark_field(exporter, tmp_path):
+    db = FakeFirestore({"funFacts": [{"id": "F1"}]})
+
+    with pytest.warns(UserWarning, match="No funFacts document has dateSubmitted"):
+        exporter.export_collections(["funFacts"], str(tmp_path), db=db)
+    assert exporter.load_watermarks(str(tmp_path)) == {}
+
+
+def test_custom_converters_can_be_registered(exporter, monkeypatch):
+    class Money:
+        cents = 250
+
+    monkeypatch.setattr(exporter, "CONVERTERS", list(exporter.CONVERTERS))
+    exporter.register_converter(Money, lambda value: value.cents / 100)
+
+    assert exporter.convert_value({"price": Money()}) == {"price": 2.5}
@@ -1,5 +1,6 @@
 import aws_cdk as core
 import aws_cdk.assertions as assertions
+import pytest
 
 from fun_facts_backend.fun_facts_backend_stack import FunFactsBackendStack
 
@@ -13,3 +14,58 @@ def test_sqs_queue_created():
 #     template.has_resource_properties("AWS::SQS::Queue", {
 #         "VisibilityTimeout": 300
 #     })
+
+
+@pytest.fixture(scope="module")
+def template():
+    app = core.App()
+    stack = FunFactsBackendStack(app, "fun-facts-backend")
+    return assertions.Template.from_stack(stack)
+
+
+def test_landmark_geohash_index_created(template):
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "TableName": "Landmark",
+        "GlobalSecondaryIndexes": assertions.Match.array_with([{
+            "IndexName": "geohashIndex",
+            "KeySchema": [
+                {"AttributeName": "geohashPrefix", "KeyType": "HASH"},
+                {"AttributeName": "geohash", "KeyType": "RANGE"},
+            ],
+            "Projection": {"ProjectionType": "ALL"},
+        }])
+    })
+
+
+def test_landmark_city_index_created(template):
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "TableName": "Landmark",
+        "GlobalSecondaryIndexes": assertions.Match.array_with([{
+            "IndexName": "cityIndex",
+            "KeySchema": [{"AttributeName": "city", "KeyType": "HASH"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }])
+    })
+
+
+def test_city_index_can_be_staged_for_a_later_deploy():
+    # One GSI is created per table update, so cityIndex follows geohashIndex
+    app = core.App(context={"stageCityIndex": "true"})
+    template = assertions.Template.from_stack(FunFactsBackendStack(app, "fun-facts-backend"))
+    landmark = next(table for table in template.find_resources("AWS::DynamoDB::Table").values()
+                    if table["Properties"]["TableName"] == "Landmark")
+    assert [index["IndexName"] for index in landmark["Properties"]["GlobalSecondaryIndexes"]] == ["geohashIndex"]
+
+
+def test_fun_fact_summary_index_projects_summary_attributes(template):
+    template.has_resource_properties("AWS::DynamoDB::Table", {
+        "TableName": "FunFact",
+        "GlobalSecondaryIndexes": [{
+            "IndexName": "summaryIndex",
+            "KeySchema": [
+                {"AttributeName": "landmarkId", "KeyType": "HASH"},
+                {"AttributeName": "funFactId", "KeyType": "RANGE"},
+            ],
+            "Projection": {"ProjectionType": "INCLUDE", "NonKeyAttributes": ["funFactTitle", "imageName", "likes"]},
+        }]
+    })
@@ -0,0 +1,92 @@
+import json
+
+import geo
+
+
+def landmark(landmark_id, latitude, longitude):
+    geohash = geo.encode(latitude, longitude)
+    return {
+        "id": landmark_id,
+        "name": landmark_id,
+        "geohash": geohash,
+        "geohashPrefix": geohash[:geo.GEOHASH_INDEX_PRECISION],
+        "coordinates": {"latitude": str(latitude), "longitude": str(longitude)},
+    }
+
+
+def test_encode_matches_firestore_export():
+    # 58 Joralemon St from firestore_data/landmarks.json
+    assert geo.encode(40.6933772, -73.9973992) == "dr5rs0h8pe"
+
+
+def test_covering_cells_contain_every_point_in_radius():
+    latitude, longitude, radius = 40.7484, -73.9857, 2000
+    cells = geo.covering_cells(latitude, longitude, radius)
+    precision = len(next(iter(cells)))
+
+    assert len(cells) <= geo.MAX_COVERING_CELLS
+    assert precision >= geo.GEOHASH_INDEX_PRECISION
+    south, west, north, east = geo.bounding_box(latitude, longitude, radius)
+    for i in range(11):
+        for j in range(11):
+            lat = south + (north - south) * i / 10
+            lon = west + (east - west) * j / 10
+            assert geo.encode(lat, lon, precision) in cells
+
+
+def test_zoom_precision_cells_fit_half_a_tile():
+    for zoom in range(23):
+        precision = geo.zoom_precision(zoom)
+        tile_width = 360 / 2 ** zoom
+        assert geo.cell_size(precision)[1] <= tile_width / 2
+        assert precision == 1 or geo.cell_size(precision - 1)[1] > tile_width / 2
+
+
+def test_box_cell_count_matches_box_cells():
+    box = (40.6, -74.1, 40.95, -73.7)
+    for precision in range(1, 7):
+        assert geo.box_cell_count(*box, precision) == len(geo.box_cells(*box, precision))
+
+
+def test_nearby_landmarks_sorted_by_distance(aws, load_handler):
+    table = aws.Table("Landmark")
+    table.put_item(Item=landmark("empire", 40.7484, -73.9857))
+    table.put_item(Item=landmark("flatiron", 40.7411, -73.9897))
+    table.put_item(Item=landmark("brooklyn", 40.6933772, -73.9973992))
+    table.put_item(Item=landmark("boston", 42.3601, -71.0589))
+
+    get_fun_fact = load_handler("get_fun_fact")
+    response = get_fun_fact.handler({
+        "resource": "/landmarks",
+        "queryStringParameters": {"lat": "40.7480", "lon": "-73.9860", "radius": "2000"},
+    }, None)
+
+    assert response["statusCode"] == 200
+    items = json.loads(response["body"])
+    assert [item["id"] for item in items] == ["empire", "flatiron"]
+    assert items[0]["distance"] <= items[1]["distance"] <= 2000
+
+
+def test_nearby_landmarks_rejects_bad_radius(aws, load_handler):
+    get_fun_fact = load_handler("get_fun_fact")
+    response = get_fun_fact.handler({
+        "resource": "/landmarks",
+        "queryStringParameters": {"lat": "40.7", "lon": "-73.9", "radius": "1e9"},
+    }, None)
+
+    assert response["statusCode"] == 400
+
+
+def test_nearby_landmarks_bounds_index_queries(aws, load_handler):
+    get_fun_fact = load_handler("get_fun_fact")
+
+    def get(lat):
+        return get_fun_fact.handler({
+            "resource": "/landmarks",
+            "queryStringParameters": {"lat": lat, "lon": "0", "radius": "50000"},
+        }, None)["statusCode"]
+
+    # The largest radius is served up to latitude 60, not near the poles
+    assert get("60") == 200
+    assert len(geo.covering_cells(60, 0, 50000)) <= geo.MAX_QUERY_CELLS
+    assert get("89.9") == 400
@@ -0,0 +1,74 @@
+import io
+import json
+
+import boto3
+import pytest
+from PIL import Image
+
+from benchmarks import synthetic
+
+BUCKET = "fun-facts-images"
+
+
+def upload(name, data):
+    boto3.client("s3").put_object(Bucket=BUCKET, Key=f"{name}.jpeg", Body=data)
+    return {"Records": [{"s3": {"bucket": {"name": BUCKET}, "object": {"key": f"{name}.jpeg"}}}]}
+
+
+@pytest.fixture
+def processed(aws, load_handler):
+    processor = load_handler("image_processor")
+    result = processor.handler(upload("big", synthetic.sample_jpeg(1600, 1200)), None)
+    upload("pending", synthetic.sample_jpeg(1600, 1200, seed=1))
+    return result
+
+
+def test_variants_are_resized_and_smaller(aws, processed):
+    assert processed["processed"][0]["imageName"] == "big"
+    s3 = boto3.client("s3")
+    original_bytes = s3.head_object(Bucket=BUCKET, Key="big.jpeg")["ContentLength"]
+
+    item = aws.Table("ImageVariant").get_item(Key={"imageName": "big"})["Item"]
+    assert set(item["variants"]) == {"thumb.webp", "thumb.jpg", "small.webp", "small.jpg", "medium.webp",
+                                     "medium.jpg"}
+    thumb = s3.get_object(Bucket=BUCKET, Key="variants/big/thumb.webp")
+    assert thumb["ContentType"] == "image/webp"
+    image = Image.open(io.BytesIO(thumb["Body"].read()))
+    assert image.format == "WEBP" and max(image.size) == 160
+    assert all(size < original_bytes for size in item["variants"].values())
+
+
+def test_variants_are_never_larger_than_the_original(aws, load_handler):
+    processor = load_handler("image_processor")
+    small = io.BytesIO()
+    Image.new("RGB", (120, 80), "white").save(small, "JPEG", quality=30)
+    processor.handler(upload("tiny", small.getvalue()), None)
+
+    variants = aws.Table("ImageVariant").get_item(Key={"imageName": "tiny"})["Item"]["variants"]
+    assert all(size < len(small.getvalue()) for size in variants.values())
+    # Keys that are not originals, such as variants, are ignored
+    assert processor.handler(upload("variants/tiny/thumb", b""), None) == {"processed": []}
+
+
+def test_size_hint_picks_variants_and_falls_back_to_originals(aws, load_handler, processed):
+    for fun_fact_id, image_name in (("F1", "big"), ("F2", "pending")):
+        aws.Table("FunFact").put_item(Item={"landmarkId": "L1", "funFactId": fun_fact_id, "imageName": image_name})
+    get_fun_fact = load_handler("get_fun_fact")
+
+    def get(params):
+        response = get_fun_fact.handler({"resource": "/funFacts", "queryStringParameters": params}, None)
+        return response["statusCode"], json.loads(response["body"])
+
+    status, items = get({"landmarkId": "L1", "imageSize": "thumb"})
+    assert status == 200
+    urls = {item["imageName"]: item["imageUrl"] for item in items}
+    assert "variants/big/thumb.webp" in urls["big"]
+    assert "/pending.jpeg" in urls["pending"]
+
+    _, items = get({"landmarkId": "L1", "imageSize": "medium", "imageFormat": "jpeg"})
+    assert "variants/big/medium.jpg" in items[0]["imageUrl"]
+
+    _, items = get({"landmarkId": "L1"})
+    assert "/big.jpeg" in items[0]["imageUrl"]
+
+    assert get({"landmarkId": "L1", "imageSize": "huge"})[0] == 400
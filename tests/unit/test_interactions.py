@@ -0,0 +1,97 @@
+import json
+import random
+
+import pytest
+
+
+def post(interactions, body):
+    response = interactions.handler({"body": json.dumps(body)}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def like(user_id, action="like", fun_fact_id="F1", landmark_id="L1"):
+    return {"userId": user_id, "landmarkId": landmark_id, "funFactId": fun_fact_id, "action": action}
+
+
+@pytest.fixture
+def fun_fact(aws):
+    aws.Table("FunFact").put_item(Item={"landmarkId": "L1", "funFactId": "F1", "likes": 0})
+
+
+def fold(load_handler):
+    aggregator = load_handler("like_aggregator")
+    # The stream carries each shard's key
+    counters = [item["counterId"] for item in
+                aggregator.clients.client("dynamodb").scan(TableName="LikeCounter")["Items"]]
+    records = [{"dynamodb": {"Keys": {"counterId": counter}}} for counter in counters]
+    return aggregator.handler({"Records": records}, None)["folded"]
+
+
+def test_likes_are_deduplicated_per_user(aws, load_handler, fun_fact):
+    interactions = load_handler("interactions")
+
+    assert post(interactions, like("U1"))[1]["status"] == "applied"
+    assert post(interactions, like("U1"))[1]["status"] == "duplicate"
+    assert post(interactions, like("U2", "unlike"))[1]["status"] == "duplicate"
+    assert post(interactions, like("U2"))[1]["status"] == "applied"
+    assert post(interactions, like("U1", "unlike"))[1]["status"] == "applied"
+
+    assert fold(load_handler) == {"L1#F1": 1}
+    assert aws.Table("FunFact").get_item(Key={"landmarkId": "L1", "funFactId": "F1"})["Item"]["likes"] == 1
+
+    by_user = aws.Table("UserInteraction").query(
+        KeyConditionExpression="userId = :u", ExpressionAttributeValues={":u": "U2"})
+    assert [item["funFactId"] for item in by_user["Items"]] == ["F1"]
+
+
+def test_unlike_under_another_landmark_changes_nothing(aws, load_handler, fun_fact):
+    interactions = load_handler("interactions")
+    post(interactions, like("U1"))
+    post(interactions, like("U2"))
+
+    status, result = post(interactions, like("U1", "unlike", landmark_id="L2"))
+    assert status == 400 and result["status"] == "error"
+    assert post(interactions, like("U1", "unlike", fun_fact_id="F9", landmark_id="L2"))[1]["status"] == "duplicate"
+
+    assert fold(load_handler) == {"L1#F1": 2}
+    assert "Item" in aws.Table("UserInteraction").get_item(Key={"userId": "U1", "interactionId": "like#F1"})
+
+
+def test_hot_key_burst_spreads_over_shards_and_folds_exactly(aws, load_handler, fun_fact, monkeypatch):
+    # moto's in-memory backend is not thread-safe under concurrent transactions
+    monkeypatch.setenv("INTERACTION_CONCURRENCY", "1")
+    interactions = load_handler("interactions")
+    random.seed(7)
+
+    # 600 users like one fact in batches of 100, with a retried batch mixed in
+    events = [like(f"U{i}") for i in range(600)]
+    for start in range(0, len(events), 100):
+        status, body = post(interactions, {"events": events[start:start + 100]})
+        assert status == 202 and body["failed"] == 0
+    status, body = post(interactions, {"events": events[:100]})
+    assert {result["status"] for result in body["results"]} == {"duplicate"}
+
+    # One partition key per shard
+    shards = aws.Table("LikeCounter").scan()["Items"]
+    assert sorted(shard["counterId"] for shard in shards) == sorted(
+        interactions.like_counters.shard_ids("L1#F1"))
+    assert max(shard["likes"] for shard in shards) < 600 / 2
+
+    assert fold(load_handler) == {"L1#F1": 600}
+    assert aws.Table("FunFact").get_item(Key={"landmarkId": "L1", "funFactId": "F1"})["Item"]["likes"] == 600
+
+
+def test_aggregator_does_not_recreate_deleted_fun_facts(aws, load_handler):
+    interactions = load_handler("interactions")
+    post(interactions, like("U1", fun_fact_id="gone"))
+
+    assert fold(load_handler) == {}
+    assert "Item" not in aws.Table("FunFact").get_item(Key={"landmarkId": "L1", "funFactId": "gone"})
+
+
+def test_rejects_invalid_events(aws, load_handler):
+    interactions = load_handler("interactions")
+
+    assert post(interactions, like("U1", action="love"))[0] == 400
+    assert post(interactions, {"userId": "U1"})[0] == 400
+    assert post(interactions, {"events": [like("U1")] * (interactions.MAX_BATCH_EVENTS + 1)})[0] == 400
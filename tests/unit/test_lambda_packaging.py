@@ -0,0 +1,19 @@
+import pytest
+
+from benchmarks.cold_start import measure
+from fun_facts_backend.fun_facts_backend_stack import HANDLER_MODULES
+
+
+@pytest.mark.parametrize("function_id", sorted(HANDLER_MODULES))
+def test_handler_imports_from_its_own_package(function_id):
+    # Fails if a handler imports a module its function is not packaged with
+    timings = measure(function_id)
+    assert timings["import_ms"] > 0
+
+
+def test_handlers_create_no_clients_at_import(load_handler):
+    get_fun_fact = load_handler("get_fun_fact")
+    load_handler("add_fun_fact")
+
+    assert get_fun_fact.clients._clients == {}
+    assert get_fun_fact.clients._resources == {}
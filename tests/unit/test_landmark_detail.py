@@ -0,0 +1,65 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def get_fun_fact(aws, load_handler):
+    aws.Table("Landmark").put_item(Item={
+        "id": "L1", "name": "Flatiron", "image": "L1-image", "city": "New York",
+        "coordinates": {"latitude": "40.7411", "longitude": "-73.9897"}, "geohash": "dr5ru6j", "geohashPrefix": "dr5r",
+    })
+    for i, submitter in enumerate(["U1", "U2", "U1", "U3"]):
+        aws.Table("FunFact").put_item(Item={"landmarkId": "L1", "funFactId": f"F{i}", "funFactTitle": f"Fact {i}",
+                                            "imageName": f"F{i}", "submittedBy": submitter})
+    for user_id in ("U1", "U2"):
+        aws.Table("User").put_item(Item={"userId": user_id, "username": f"user {user_id}",
+                                         "email": f"{user_id}@example.com", "userCategory": "Rookie"})
+    return load_handler("get_fun_fact")
+
+
+def detail_event(landmark_id, **params):
+    return {"resource": "/landmarks/{id}", "pathParameters": {"id": landmark_id}, "queryStringParameters": params}
+
+
+def test_detail_composes_landmark_fun_facts_and_submitters(get_fun_fact, monkeypatch):
+    batch_gets = []
+    batch_get = get_fun_fact.dynamo.batch_get
+    monkeypatch.setattr(get_fun_fact.dynamo, "batch_get",
+                        lambda client, table, keys, **kwargs: batch_gets.append((table, keys))
+                        or batch_get(client, table, keys, **kwargs))
+
+    response = get_fun_fact.handler(detail_event("L1", pageSize="3"), None)
+    assert response["statusCode"] == 200
+    document = json.loads(response["body"])
+
+    landmark = document["landmark"]
+    assert landmark["name"] == "Flatiron" and "L1-image" in landmark["imageUrl"]
+    assert "geohash" not in landmark
+
+    assert [fun_fact["funFactId"] for fun_fact in document["funFacts"]] == ["F0", "F1", "F2"]
+    assert document["funFacts"][0]["submitter"] == {"userId": "U1", "username": "user U1", "userCategory": "Rookie"}
+    assert document["funFacts"][1]["submitter"]["username"] == "user U2"
+    assert all("imageUrl" in fun_fact for fun_fact in document["funFacts"])
+
+    # Submitters are deduplicated into one BatchGetItem
+    assert batch_gets == [("User", [{"userId": "U1"}, {"userId": "U2"}])]
+
+    # The remaining fun facts continue on /funFacts
+    rest = get_fun_fact.handler({"resource": "/funFacts", "queryStringParameters": {
+        "landmarkId": "L1", "nextToken": document["nextToken"]}}, None)
+    assert [item["funFactId"] for item in json.loads(rest["body"])] == ["F3"]
+
+
+def test_unknown_submitters_and_landmarks(get_fun_fact):
+    document = json.loads(get_fun_fact.handler(detail_event("L1"), None)["body"])
+    assert document["funFacts"][3]["submitter"] is None
+    assert "nextToken" not in document
+
+    assert get_fun_fact.handler(detail_event("missing"), None)["statusCode"] == 404
+
+
+def test_detail_revalidates(get_fun_fact):
+    first = get_fun_fact.handler(detail_event("L1"), None)
+    event = dict(detail_event("L1"), headers={"If-None-Match": first["headers"]["ETag"]})
+    assert get_fun_fact.handler(event, None)["statusCode"] == 304
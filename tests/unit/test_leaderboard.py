@@ -0,0 +1,141 @@
+import json
+import random
+from datetime import datetime, timedelta
+
+import boto3
+import pytest
+
+from benchmarks import synthetic
+
+CITY = {"city": "New York", "state": "NY", "country": "US"}
+
+
+@pytest.fixture
+def updater(aws, load_handler, monkeypatch):
+    updater = load_handler("leaderboard_updater")
+    # Small boards, so facts drop off them and refills happen
+    monkeypatch.setattr(updater.leaderboard, "STORED_ENTRIES", 8)
+    monkeypatch.setattr(updater.leaderboard, "MAX_K", 4)
+    return updater
+
+
+@pytest.fixture
+def tables(stream):
+    return stream("FunFact", ("landmarkId", "funFactId"))
+
+
+def seed_landmarks(updater, loader, rng):
+    client = boto3.client("dynamodb")
+    for i, landmark in enumerate(loader.clean_landmark(record) for record in synthetic.landmarks(1)):
+        if i % 3 == 0:
+            landmark.update(city="Boston", state="MA")
+        client.put_item(TableName="Landmark", Item=updater.dynamo.serialize_item(landmark))
+    now = datetime(2026, 1, 1)
+    fun_facts = []
+    for fun_fact in synthetic.fun_facts(1):
+        fun_fact = loader.clean_fun_fact(fun_fact)
+        fun_fact.update(
+            likes=rng.randrange(50), approvalCount=rng.randrange(5),
+            createdAt=(now - timedelta(hours=rng.randrange(24 * 60))).isoformat(),
+            funFactStatus=rng.choice(["APPROVED"] * 4 + ["PENDING"]),
+        )
+        fun_facts.append(fun_fact)
+    return fun_facts
+
+
+def served_boards(updater):
+    client = boto3.client("dynamodb")
+    boards = {}
+    for item in client.scan(TableName="Leaderboard")["Items"]:
+        slug = item["city"]["S"]
+        board, _ = updater.leaderboard.read_board(client, slug)
+        boards[slug] = updater.leaderboard.top(board, updater.leaderboard.MAX_K)
+    return boards
+
+
+def test_score_halves_engagement_per_half_life(load_handler):
+    leaderboard = load_handler("leaderboard")
+    created = datetime(2026, 1, 1)
+    older = {"likes": 3, "createdAt": created.isoformat()}
+    younger = {"likes": 1, "createdAt": (created + timedelta(seconds=leaderboard.HALF_LIFE_SECONDS)).isoformat()}
+    assert leaderboard.score(older) == pytest.approx(leaderboard.score(younger))
+    assert leaderboard.score(dict(older, likes=4)) > leaderboard.score(younger)
+
+
+def test_incremental_updates_match_a_full_rebuild(aws, updater, monkeypatch, loader, tables):
+    rng = random.Random(7)
+    fun_facts = seed_landmarks(updater, loader, rng)
+
+    refills = []
+    city_fun_facts = updater.city_fun_facts
+    monkeypatch.setattr(updater, "city_fun_facts", lambda city: refills.append(city) or city_fun_facts(city))
+
+    # Facts arrive in stream batches, then get liked, unliked, moderated and deleted
+    rng.shuffle(fun_facts)
+    records = [tables.put(fun_fact) for fun_fact in fun_facts]
+    for _ in range(400):
+        key = rng.choice(list(tables.items))
+        item = dict(tables.items[key])
+        action = rng.random()
+        if action < 0.45:
+            item["likes"] += rng.randrange(1, 20)
+        elif action < 0.8:
+            item["likes"] = max(0, item["likes"] - rng.randrange(1, 40))
+        elif action < 0.9:
+            item["funFactStatus"] = "REJECTED" if item["funFactStatus"] == "APPROVED" else "APPROVED"
+        elif action < 0.95:
+            item["description"] += " Edited."
+        else:
+            records.append(tables.delete(key))
+            continue
+        records.append(tables.put(item))
+
+    for start in range(0, len(records), 25):
+        updater.handler({"Records": records[start:start + 25]}, None)
+    incremental = served_boards(updater)
+    assert refills
+
+    updater.handler({"all": True}, None)
+    assert served_boards(updater) == incremental
+
+    # Both are the true best of each city
+    cities = {}
+    for landmark in aws.Table("Landmark").scan()["Items"]:
+        cities[landmark["id"]] = updater.snapshots.city_slug(updater.snapshots.city_of(landmark))
+    leaderboard = updater.leaderboard
+    for slug, entries in incremental.items():
+        expected = sorted((leaderboard.entry(item) for item in tables.items.values()
+                           if cities[item["landmarkId"]] == slug and leaderboard.eligible(item)),
+                          key=leaderboard.entry_key, reverse=True)[:leaderboard.MAX_K]
+        assert entries == expected
+
+
+def test_snapshot_generator_keeps_boards_current(aws, updater, load_handler, loader, tables):
+    # The snapshot generator applies the FunFact stream, which allows only two readers
+    fun_facts = seed_landmarks(updater, loader, random.Random(5))
+    records = [tables.put(fun_fact) for fun_fact in fun_facts]
+    load_handler("snapshot_generator").handler({"Records": records}, None)
+    streamed = served_boards(updater)
+    assert streamed
+
+    updater.handler({"all": True}, None)
+    assert served_boards(updater) == streamed
+
+
+def test_top_endpoint(aws, updater, load_handler, loader, tables):
+    fun_facts = seed_landmarks(updater, loader, random.Random(3))
+    updater.handler({"Records": [tables.put(fun_fact) for fun_fact in fun_facts]}, None)
+    get_fun_fact = load_handler("get_fun_fact")
+
+    def get(**params):
+        response = get_fun_fact.handler({"resource": "/funFacts/top", "queryStringParameters": params}, None)
+        return response["statusCode"], json.loads(response["body"])
+
+    status, entries = get(k="3", **CITY)
+    assert status == 200 and len(entries) == 3
+    assert [entry["score"] for entry in entries] == sorted((entry["score"] for entry in entries), reverse=True)
+    assert all("imageUrl" in entry for entry in entries if "imageName" in entry)
+
+    assert get(**dict(CITY, city="Nowhere")) == (200, [])
+    assert get(k="0", **CITY)[0] == 400
+    assert get(city="New York")[0] == 400
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def get_fun_fact(aws, load_handler):
+    table = aws.Table("FunFact")
+    for landmark_id in ("L1", "L2"):
+        for i in range(3):
+            table.put_item(Item={"landmarkId": landmark_id, "funFactId": f"F{i}", "imageName": f"F{i}"})
+    return load_handler("get_fun_fact")
+
+
+def emitted(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_invocations_emit_embedded_metric_format(get_fun_fact, monkeypatch, capsys):
+    monkeypatch.setattr(get_fun_fact.metrics, "OUTPUT", "emf")
+    for _ in range(2):
+        get_fun_fact.handler({"resource": "/funFacts", "queryStringParameters": {"landmarkId": "L1"}}, None)
+
+    cold, warm = emitted(capsys)
+    assert cold["Function"] == "get_fun_fact" and cold["Route"] == "/funFacts"
+    assert cold["statusCode"] == 200
+    assert cold["coldStart"] == 1 and warm["coldStart"] == 0
+    assert cold["itemsReturned"] == 3 and cold["bytesSerialized"] > 0
+    assert cold["readCapacityUnits"] > 0
+    # The second request is served from the read cache
+    assert "readCapacityUnits" not in warm
+
+    definition, = cold["_aws"]["CloudWatchMetrics"]
+    assert definition["Dimensions"] == [["Function", "Route"]]
+    units = {metric["Name"]: metric["Unit"] for metric in definition["Metrics"]}
+    assert units["serializeTime"] == units["presignTime"] == units["duration"] == "Milliseconds"
+    assert units["bytesSerialized"] == "Bytes"
+    assert {"readTime", "renderTime", "compressTime"} <= set(units)
+
+
+def test_executor_threads_report_to_the_invocation(get_fun_fact, monkeypatch, capsys):
+    monkeypatch.setattr(get_fun_fact.metrics, "OUTPUT", "emf")
+    get_fun_fact.handler({"resource": "/funFacts", "queryStringParameters": {"landmarkIds": "L1,L2"}}, None)
+
+    metrics, = emitted(capsys)
+    assert metrics["itemsReturned"] == 6
+    assert metrics["readCapacityUnits"] > 0
+
+
+def test_only_cold_starts_are_sampled_at_rate_zero(get_fun_fact, monkeypatch, capsys):
+    monkeypatch.setattr(get_fun_fact.metrics, "OUTPUT", "emf")
+    monkeypatch.setattr(get_fun_fact.metrics, "SAMPLE_RATE", 0.0)
+    for _ in range(3):
+        response = get_fun_fact.handler({"resource": "/funFacts", "queryStringParameters": {"landmarkId": "L1"}},
+                                        None)
+        assert response["statusCode"] == 200
+
+    assert [metrics["coldStart"] for metrics in emitted(capsys)] == [1]
+
+
+def test_profile_aggregates_invocations(aws, load_handler, monkeypatch, capsys):
+    user_handler = load_handler("add_fun_fact")
+    monkeypatch.setattr(user_handler.metrics, "OUTPUT", "profile")
+    for i in range(4):
+        user_handler.handler({"body": json.dumps({"userId": f"U{i}", "username": "u", "email": "e"})}, None)
+
+    assert capsys.readouterr().out == ""
+    profile = user_handler.metrics.profile()["add_fun_fact"][""]
+    assert profile["duration"]["count"] == 4
+    assert profile["writeCapacityUnits"]["mean"] > 0
+    assert "writeCapacityUnits" in user_handler.metrics.summary()
@@ -0,0 +1,76 @@
+import json
+
+import boto3
+import pytest
+
+
+def get_all_pages(get_fun_fact, resource, params):
+    items = []
+    pages = 0
+    while True:
+        response = get_fun_fact.handler({"resource": resource, "queryStringParameters": dict(params)}, None)
+        assert response["statusCode"] == 200
+        items.extend(json.loads(response["body"]))
+        pages += 1
+        if "X-Next-Token" not in response["headers"]:
+            return items, pages
+        params["nextToken"] = response["headers"]["X-Next-Token"]
+
+
+def test_fun_facts_pages_follow_next_token(aws, load_handler):
+    table = aws.Table("FunFact")
+    for i in range(5):
+        table.put_item(Item={"landmarkId": "L1", "funFactId": f"F{i}"})
+    table.put_item(Item={"landmarkId": "L2", "funFactId": "other"})
+
+    get_fun_fact = load_handler("get_fun_fact")
+    items, pages = get_all_pages(get_fun_fact, "/funFacts", {"landmarkId": "L1", "pageSize": "2"})
+
+    assert [item["funFactId"] for item in items] == [f"F{i}" for i in range(5)]
+    assert pages == 3
+
+
+def test_landmarks_pages_cover_table_without_trailing_empty_page(aws, load_handler):
+    table = aws.Table("Landmark")
+    for i in range(6):
+        table.put_item(Item={"id": f"L{i}"})
+
+    get_fun_fact = load_handler("get_fun_fact")
+    items, pages = get_all_pages(get_fun_fact, "/landmarks", {"pageSize": "3"})
+
+    assert sorted(item["id"] for item in items) == [f"L{i}" for i in range(6)]
+    assert pages == 2
+
+
+def test_page_size_is_capped(aws, load_handler):
+    get_fun_fact = load_handler("get_fun_fact")
+    assert get_fun_fact.pagination.parse_page_size({"pageSize": "100000"}) == get_fun_fact.pagination.MAX_PAGE_SIZE
+
+
+@pytest.mark.parametrize("token_for", ["tampered", "other-scope"])
+def test_rejects_foreign_tokens(aws, load_handler, token_for):
+    get_fun_fact = load_handler("get_fun_fact")
+    if token_for == "tampered":
+        token = get_fun_fact.pagination.encode_token({"id": "L1"}, "/landmarks")[:-2] + "AA"
+    else:
+        token = get_fun_fact.pagination.encode_token({"id": "L1"}, "/funFacts:L1")
+
+    response = get_fun_fact.handler({
+        "resource": "/landmarks",
+        "queryStringParameters": {"nextToken": token},
+    }, None)
+
+    assert response["statusCode"] == 400
+
+
+def test_tokens_signed_with_the_secret_work_in_other_containers(aws, load_handler, monkeypatch):
+    arn = boto3.client("secretsmanager").create_secret(Name="PageTokenSecret", SecretString="k" * 64)["ARN"]
+    monkeypatch.setenv("PAGE_TOKEN_SECRET_ARN", arn)
+    token = load_handler("get_fun_fact").pagination.encode_token({"id": "L1"}, "/landmarks")
+
+    # A fresh import stands in for another container
+    assert load_handler("get_fun_fact").pagination.decode_token(token, "/landmarks") == {"id": "L1"}
+    monkeypatch.delenv("PAGE_TOKEN_SECRET_ARN")
+    pagination = load_handler("get_fun_fact").pagination
+    with pytest.raises(pagination.InvalidToken):
+        pagination.decode_token(token, "/landmarks")
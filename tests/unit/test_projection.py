@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+DESCRIPTION = "A long story about the landmark. " * 40
+
+
+@pytest.fixture
+def get_fun_fact(aws, load_handler):
+    table = aws.Table("FunFact")
+    for i in range(3):
+        table.put_item(Item={"landmarkId": "L1", "funFactId": f"F{i}", "funFactTitle": f"Fact {i}",
+                             "description": DESCRIPTION, "source": "archive", "imageName": f"F{i}",
+                             "imageCaption": "caption", "tags": ["#nyc"], "likes": i, "rejectionCount": 2})
+    aws.Table("Landmark").put_item(Item={
+        "id": "L1", "name": "Flatiron", "type": "building", "city": "New York", "image": "L1",
+        "coordinates": {"latitude": "40.7411", "longitude": "-73.9897"},
+        "geohash": "dr5ru6j", "geohashPrefix": "dr5r",
+    })
+    return load_handler("get_fun_fact")
+
+
+def get(get_fun_fact, resource, **params):
+    response = get_fun_fact.handler({"resource": resource, "queryStringParameters": params}, None)
+    return response["statusCode"], response["headers"], json.loads(response["body"])
+
+
+def test_summary_view_reads_the_slim_index(get_fun_fact, monkeypatch):
+    queries = []
+    query = get_fun_fact.query
+    monkeypatch.setattr(get_fun_fact, "query", lambda **kwargs: queries.append(kwargs) or query(**kwargs))
+
+    status, headers, items = get(get_fun_fact, "/funFacts", landmarkId="L1", fields="summary", pageSize="2")
+    assert status == 200
+    assert queries[0]["IndexName"] == "summaryIndex"
+    assert set(items[0]) == {"landmarkId", "funFactId", "funFactTitle", "imageName", "likes", "imageUrl"}
+
+    # Tokens continue on the index
+    _, _, rest = get(get_fun_fact, "/funFacts", landmarkId="L1", fields="summary", pageSize="2",
+                     nextToken=headers["X-Next-Token"])
+    assert [item["funFactId"] for item in items + rest] == ["F0", "F1", "F2"]
+
+    # Other fields read the table, whitelisted attributes only
+    _, _, items = get(get_fun_fact, "/funFacts", landmarkId="L1", fields="full")
+    assert "IndexName" not in queries[-1]
+    assert "description" in items[0] and "rejectionCount" not in items[0]
+
+
+def test_fields_without_images_skip_presigning(get_fun_fact, monkeypatch):
+    signed = get_fun_fact.url_cache.stats()
+    status, headers, items = get(get_fun_fact, "/funFacts", landmarkId="L1", fields="funFactTitle, likes")
+    assert status == 200
+    assert items[0] == {"landmarkId": "L1", "funFactId": "F0", "funFactTitle": "Fact 0", "likes": 0}
+    assert get_fun_fact.url_cache.stats() == signed
+
+    # Nothing signed, so the ETag does not change with the URL bucket
+    clock = get_fun_fact.url_cache.clock
+    monkeypatch.setattr(get_fun_fact.url_cache, "clock", lambda: clock() + get_fun_fact.url_cache.bucket_seconds)
+    assert get(get_fun_fact, "/funFacts", landmarkId="L1", fields="funFactTitle, likes")[1]["ETag"] == headers["ETag"]
+
+
+def test_landmark_fields(get_fun_fact):
+    _, _, items = get(get_fun_fact, "/landmarks", lat="40.7411", lon="-73.9897", fields="name")
+    assert items == [{"id": "L1", "name": "Flatiron", "coordinates": {"latitude": "40.7411", "longitude": "-73.9897"},
+                      "distance": 0.0}]
+
+    _, _, items = get(get_fun_fact, "/landmarks", fields="summary")
+    assert set(items[0]) == {"id", "name", "type", "city", "coordinates", "image", "imageUrl"}
+
+
+@pytest.mark.parametrize("resource,fields", [
+    ("/funFacts", "description,rejectionCount"),
+    ("/funFacts", ","),
+    ("/landmarks", "geohash"),
+])
+def test_unknown_fields_are_rejected(get_fun_fact, resource, fields):
+    status, _, body = get(get_fun_fact, resource, landmarkId="L1", fields=fields)
+    assert status == 400
+    assert body["error"].startswith("Invalid fields")
@@ -0,0 +1,121 @@
+import json
+import threading
+
+from read_cache import ReadCache, FRESH, STALE, MISS
+
+
+class FakeClock:
+    def __init__(self, now=0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_serves_stale_value_while_refreshing_in_background():
+    clock = FakeClock()
+    cache = ReadCache(ttl=10, stale_ttl=20, clock=clock)
+    versions = iter(["v1", "v2"])
+    refreshed = threading.Event()
+
+    def load():
+        value = next(versions)
+        if value == "v2":
+            refreshed.set()
+        return value
+
+    assert cache.get("k", load) == ("v1", MISS)
+    assert cache.get("k", load) == ("v1", FRESH)
+
+    clock.now = 15
+    assert cache.get("k", load) == ("v1", STALE)
+    assert cache.wait_for_refreshes(timeout=5) == 0
+    assert refreshed.is_set()
+    assert cache.get("k", load) == ("v2", FRESH)
+
+    # Past the stale window the value is reloaded inline
+    clock.now = 100
+    assert cache.get("k", lambda: "v3") == ("v3", MISS)
+
+
+def test_evicts_least_recently_used_to_stay_under_byte_budget():
+    cache = ReadCache(max_bytes=10, sizeof=len, clock=FakeClock())
+    cache.put("a", "aaaa")
+    cache.put("b", "bbbb")
+    cache.get("a", lambda: "unused")
+    cache.put("c", "cccc")
+
+    assert cache.get("a", lambda: "reloaded") == ("aaaa", FRESH)
+    assert cache.get("b", lambda: "reloaded") == ("reloaded", MISS)
+    assert cache.stats()["bytes"] <= 10
+
+
+def test_invalidate_drops_tagged_entries_only():
+    cache = ReadCache(clock=FakeClock())
+    cache.put("facts-1", [1], tags=("funFacts:L1",))
+    cache.put("facts-2", [2], tags=("funFacts:L2",))
+
+    assert cache.invalidate("funFacts:L1") == 1
+    assert cache.get("facts-1", lambda: [3]) == ([3], MISS)
+    assert cache.get("facts-2", lambda: [4]) == ([2], FRESH)
+
+
+def test_handler_serves_repeat_fun_fact_queries_from_cache(aws, load_handler, monkeypatch):
+    monkeypatch.setenv("DEBUG", "true")
+    aws.Table("FunFact").put_item(Item={"landmarkId": "L1", "funFactId": "F1", "imageName": "F1"})
+    get_fun_fact = load_handler("get_fun_fact")
+    event = {"resource": "/funFacts", "queryStringParameters": {"landmarkId": "L1"}}
+
+    first = get_fun_fact.handler(event, None)
+    second = get_fun_fact.handler(event, None)
+
+    assert first["headers"]["X-Cache"] == "MISS"
+    assert second["headers"]["X-Cache"] == "HIT"
+    assert json.loads(second["body"]) == json.loads(first["body"])
+    assert json.loads(second["headers"]["X-Cache-Stats"])["url"]["hits"] == 1
+
+    # Cached items are not mutated by presigning
+    cached_items, _ = get_fun_fact.read_cache.get(("/funFacts", "L1", 20, None, None), lambda: None)[0]
+    assert "imageUrl" not in cached_items[0]
+
+    get_fun_fact.invalidate_fun_facts("L1")
+    assert get_fun_fact.handler(event, None)["headers"]["X-Cache"] == "MISS"
+
+
+def test_memoized_results_live_on_the_entry():
+    cache = ReadCache(clock=FakeClock())
+    value = [1, 2]
+    cache.put("k", value)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return len(calls)
+
+    assert cache.memoize(value, compute) == cache.memoize(value, compute) == 1
+    # Equal values the cache does not hold are not memoized
+    assert cache.memoize([1, 2], compute) == 2
+    cache.put("k", [1, 2])
+    assert cache.memoize(value, compute) == 3
+    cache.clear()
+    assert cache.memoize(value, compute) == 4
+
+
+def test_handler_finishes_refreshes_before_returning(aws, load_handler, monkeypatch):
+    # Every entry is stale at once, so each read after the first refreshes
+    monkeypatch.setenv("READ_CACHE_TTL", "0")
+    table = aws.Table("FunFact")
+    table.put_item(Item={"landmarkId": "L1", "funFactId": "F1", "likes": 1})
+    get_fun_fact = load_handler("get_fun_fact")
+
+    def likes():
+        response = get_fun_fact.handler({"resource": "/funFacts", "queryStringParameters": {"landmarkId": "L1"}},
+                                        None)
+        return json.loads(response["body"])[0]["likes"]
+
+    assert likes() == 1
+    table.put_item(Item={"landmarkId": "L1", "funFactId": "F1", "likes": 2})
+    # Served stale, and reloaded before the container could be frozen
+    assert likes() == 1
+    assert get_fun_fact.read_cache.wait_for_refreshes(timeout=0) == 0
+    assert likes() == 2
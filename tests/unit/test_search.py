@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+import benchmarks.local_aws  # noqa: F401  (puts lambda/ on sys.path)
+import search
+
+
+@pytest.fixture(scope="module")
+def fun_facts(loader):
+    return loader.clean_fun_facts_data()
+
+
+@pytest.fixture(scope="module")
+def index(fun_facts):
+    return search.SearchIndex(search.read_artifact(search.encode_artifact(search.build_index(fun_facts))))
+
+
+def test_title_match_ranks_first(index):
+    hits = index.search("Burnham's folly", 5)
+    assert hits[0]["funFactTitle"] == "Burnham's Folly"
+    assert hits == sorted(hits, key=lambda hit: -hit["score"])
+
+
+def test_hashtags_filter_results(index, fun_facts):
+    tagged = {fun_fact["funFactId"] for fun_fact in fun_facts if "flatiron" in fun_fact.get("tags", [])}
+    hits = index.search("#Flatiron", 100)
+    assert {hit["funFactId"] for hit in hits} == tagged
+    assert index.search("#flatiron #nosuchtag", 100) == []
+
+
+def test_tag_prefix_suggestions_are_most_used_first(index):
+    suggestions = index.suggest_tags("#Empire", 5)
+    assert [suggestion["tag"] for suggestion in suggestions] == ["empirestate", "empirestatebuilding"]
+    assert suggestions[0]["count"] >= suggestions[1]["count"]
+    assert index.suggest_tags("zzz", 5) == []
+
+
+def test_version_tracks_indexed_content_only(fun_facts):
+    version = search.build_index(fun_facts)["version"]
+    assert search.build_index(reversed(fun_facts))["version"] == version
+    assert search.build_index([dict(fun_fact, likes=99) for fun_fact in fun_facts])["version"] == version
+
+    rejected = [dict(fun_facts[0], funFactStatus="REJECTED")] + fun_facts[1:]
+    assert search.build_index(rejected)["version"] != version
+
+
+def test_search_endpoint_serves_the_published_index(aws, load_handler, fun_facts):
+    table = aws.Table("FunFact")
+    for fun_fact in fun_facts[:20]:
+        table.put_item(Item=fun_fact)
+
+    builder = load_handler("search_index_builder")
+    result = builder.handler({"all": True}, None)
+    assert result["documents"] == 20 and result["published"]
+    assert not builder.handler({"all": True}, None)["published"]
+
+    get_fun_fact = load_handler("get_fun_fact")
+
+    def get(params):
+        response = get_fun_fact.handler({"resource": "/search", "queryStringParameters": params}, None)
+        return response["statusCode"], json.loads(response["body"])
+
+    title = fun_facts[0]["funFactTitle"]
+    status, hits = get({"q": title, "pageSize": "3"})
+    assert status == 200 and len(hits) <= 3
+    assert hits[0]["funFactId"] == fun_facts[0]["funFactId"]
+
+    tag = fun_facts[0]["tags"][0]
+    status, suggestions = get({"prefix": tag[:3]})
+    assert tag in [suggestion["tag"] for suggestion in suggestions]
+
+    assert get({})[0] == 400
+
+
+def test_builder_skips_batches_that_change_nothing_indexed(aws, load_handler, monkeypatch):
+    builder = load_handler("search_index_builder")
+    scans = []
+    monkeypatch.setattr(builder, "approved_fun_facts", lambda: scans.append(1) or iter(()))
+
+    def record(old, new):
+        return {"dynamodb": {"OldImage": builder.dynamo.serialize_item(old),
+                             "NewImage": builder.dynamo.serialize_item(new)}}
+
+    fact = {"landmarkId": "L1", "funFactId": "F1", "funFactTitle": "Title", "funFactStatus": "APPROVED", "likes": 1}
+    liked = record(fact, dict(fact, likes=2))
+    assert builder.handler({"Records": [liked, liked]}, None)["published"] is False
+    assert scans == []
+
+    builder.handler({"Records": [liked, record(fact, dict(fact, funFactStatus="REJECTED"))]}, None)
+    assert scans == [1]
@@ -0,0 +1,90 @@
+import json
+
+import pytest
+from boto3.dynamodb.types import TypeSerializer
+
+NEW_YORK = {"city": "New York", "state": "NY", "country": "US"}
+
+
+@pytest.fixture
+def seeded(aws, loader):
+    landmarks = loader.clean_landmarks_data()[:12]
+    # Move a few landmarks to a second city
+    for landmark in landmarks[:3]:
+        landmark.update(city="Jersey City", state="NJ")
+    landmark_ids = {landmark["id"] for landmark in landmarks}
+    fun_facts = [fun_fact for fun_fact in loader.clean_fun_facts_data() if fun_fact["landmarkId"] in landmark_ids]
+
+    for landmark in landmarks:
+        aws.Table("Landmark").put_item(Item=landmark)
+    for likes, fun_fact in enumerate(fun_facts):
+        aws.Table("FunFact").put_item(Item=dict(fun_fact, likes=likes))
+    return landmarks, fun_facts
+
+
+def serialize(item):
+    serializer = TypeSerializer()
+    return {name: serializer.serialize(value) for name, value in item.items()}
+
+
+def fun_fact_record(old, new):
+    return {
+        "eventSourceARN": "arn:aws:dynamodb:us-east-1:123456789012:table/FunFact/stream/2024",
+        "dynamodb": {"Keys": {"landmarkId": {"S": new["landmarkId"]}, "funFactId": {"S": new["funFactId"]}},
+                     "OldImage": serialize(old), "NewImage": serialize(new)},
+    }
+
+
+def test_only_affected_cities_are_regenerated(aws, load_handler, seeded):
+    landmarks, fun_facts = seeded
+    generator = load_handler("snapshot_generator")
+
+    results = generator.handler({"all": True}, None)
+    assert {slug: result["landmarks"] for slug, result in results.items()} == {
+        "us/nj/jersey-city": 3, "us/ny/new-york": 9}
+    assert all(result["published"] for result in results.values())
+
+    # Unchanged data publishes nothing
+    assert not any(result["published"] for result in generator.handler({"all": True}, None).values())
+
+    jersey_city_fact = next(fun_fact for fun_fact in fun_facts
+                            if fun_fact["landmarkId"] in {landmark["id"] for landmark in landmarks[:3]})
+    key = {"landmarkId": jersey_city_fact["landmarkId"], "funFactId": jersey_city_fact["funFactId"]}
+    old = aws.Table("FunFact").get_item(Key=key)["Item"]
+    new = aws.Table("FunFact").update_item(
+        Key=key, UpdateExpression="SET likes = :likes", ExpressionAttributeValues={":likes": 1000},
+        ReturnValues="ALL_NEW")["Attributes"]
+
+    results = generator.handler({"Records": [fun_fact_record(old, new)]}, None)
+    assert list(results) == ["us/nj/jersey-city"]
+    assert results["us/nj/jersey-city"]["published"]
+
+    # Edits snapshots do not show, and edits to facts they leave out, regenerate nothing
+    assert generator.handler({"Records": [fun_fact_record(new, dict(new, approvalCount=3))]}, None) == {}
+    pending = dict(new, funFactStatus="PENDING")
+    assert generator.handler({"Records": [fun_fact_record(pending, dict(pending, likes=1))]}, None) == {}
+
+
+def test_landmarks_city_mode_serves_the_snapshot(aws, load_handler, seeded):
+    load_handler("snapshot_generator").handler({"all": True}, None)
+    get_fun_fact = load_handler("get_fun_fact")
+
+    def get(params):
+        response = get_fun_fact.handler({"resource": "/landmarks", "queryStringParameters": params}, None)
+        return response["statusCode"], json.loads(response["body"])
+
+    status, location = get(NEW_YORK)
+    assert status == 200
+    assert "snapshots/us/ny/new-york/" in location["url"]
+    assert all(".jpeg" in url for url in location["imageUrls"].values())
+
+    status, document = get(dict(NEW_YORK, snapshot="content"))
+    assert status == 200 and document["version"] == location["version"]
+    assert len(document["landmarks"]) == 9
+    for landmark in document["landmarks"]:
+        likes = [fun_fact["likes"] for fun_fact in landmark["funFacts"]]
+        assert likes == sorted(likes, reverse=True) and len(likes) <= 5
+        assert all("imageUrl" in fun_fact for fun_fact in landmark["funFacts"] if "imageName" in fun_fact)
+
+    assert get(dict(NEW_YORK, city="Boston"))[0] == 404
+    assert get({"city": "New York"})[0] == 400
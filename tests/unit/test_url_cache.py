@@ -0,0 +1,44 @@
+from url_cache import PresignedUrlCache
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_urls_are_reused_within_a_bucket_and_expire_on_its_boundary():
+    signed = []
+
+    def sign(key, expires_in):
+        signed.append((key, expires_in))
+        return f"{key}?expires={clock.now + expires_in}"
+
+    clock = FakeClock(1000)
+    cache = PresignedUrlCache(sign, expires_in=3600, bucket_seconds=900, clock=clock)
+
+    first = cache.get("a.jpeg")
+    clock.now = 1799
+    assert cache.get("a.jpeg") == first
+    assert signed == [("a.jpeg", 900 + 3600 - 1000)]
+
+    # A new bucket signs again, and every URL in it shares one expiry time
+    clock.now = 1800
+    second = cache.get("a.jpeg")
+    clock.now = 2000
+    assert second == "a.jpeg?expires=5400"
+    assert cache.get("b.jpeg") == "b.jpeg?expires=5400"
+    assert cache.stats() == {"hits": 1, "misses": 3, "evictions": 0, "size": 2}
+
+
+def test_cache_size_is_bounded():
+    cache = PresignedUrlCache(lambda key, expires_in: key, max_size=2, clock=lambda: 0)
+    for key in ("a", "b", "a", "c"):
+        cache.get(key)
+
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+    cache.get("a")
+    assert cache.stats()["hits"] == 2
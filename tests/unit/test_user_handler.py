@@ -0,0 +1,89 @@
+import base64
+import json
+
+import boto3
+
+
+def post(add_fun_fact, body):
+    response = add_fun_fact.handler({"body": json.dumps(body)}, None)
+    return response["statusCode"], json.loads(response["body"])
+
+
+def count_calls(add_fun_fact):
+    calls = []
+    client = add_fun_fact.clients.resource("dynamodb").meta.client
+    client.meta.events.register("before-call.dynamodb", lambda model, **kwargs: calls.append(model.name))
+    return calls
+
+
+def test_upsert_creates_then_updates_in_one_call_each(aws, load_handler):
+    add_fun_fact = load_handler("add_fun_fact")
+    calls = count_calls(add_fun_fact)
+
+    status, created = post(add_fun_fact, {"userId": "U1", "username": "rudy", "email": "a@example.com"})
+    assert status == 201
+    assert created["message"] == "User metadata added successfully"
+
+    status, updated = post(add_fun_fact, {"userId": "U1", "username": "rudy2", "email": "a@example.com",
+                                          "userCategory": "Expert"})
+    assert updated["message"] == "User metadata updated successfully"
+    assert updated["user"]["createdAt"] == created["user"]["createdAt"]
+    assert updated["user"]["username"] == "rudy2"
+    assert calls == ["UpdateItem", "UpdateItem"]
+
+    stored = aws.Table("User").get_item(Key={"userId": "U1"})["Item"]
+    assert stored["userCategory"] == "Expert"
+
+
+def test_base64_encoded_bodies_are_decoded(aws, load_handler):
+    add_fun_fact = load_handler("add_fun_fact")
+    body = json.dumps({"userId": "U1", "username": "rudy", "email": "a@example.com"})
+    event = {"body": base64.b64encode(body.encode()).decode(), "isBase64Encoded": True}
+
+    assert add_fun_fact.handler(event, None)["statusCode"] == 201
+
+
+def test_batch_sync_reports_per_item_results(aws, load_handler):
+    add_fun_fact = load_handler("add_fun_fact")
+    post(add_fun_fact, {"userId": "U1", "username": "rudy", "email": "a@example.com"})
+
+    status, body = post(add_fun_fact, {"users": [
+        {"userId": "U1", "username": "rudy", "email": "new@example.com"},
+        {"userId": "U2", "username": "ana", "email": "b@example.com"},
+        {"userId": "U3", "username": "no-email"},
+        {"username": "no-id", "email": "c@example.com"},
+    ]})
+
+    assert status == 200
+    assert [result["status"] for result in body["results"]] == ["updated", "created", "error", "error"]
+    assert body["results"][2]["error"] == "Missing field: email"
+    assert body["failed"] == 2
+    assert boto3.resource("dynamodb").Table("User").get_item(Key={"userId": "U1"})["Item"]["email"] == "new@example.com"
+
+
+def test_batch_sync_is_capped(aws, load_handler):
+    add_fun_fact = load_handler("add_fun_fact")
+    users = [{"userId": f"U{i}"} for i in range(add_fun_fact.MAX_BATCH_USERS + 1)]
+
+    assert post(add_fun_fact, {"users": users})[0] == 400
+
+
+def test_user_without_created_at_is_reported_as_created(aws, load_handler):
+    add_fun_fact = load_handler("add_fun_fact")
+    aws.Table("User").put_item(Item={"userId": "U1", "username": "rudy", "createdAt": ""})
+
+    status, body = post(add_fun_fact, {"userId": "U1", "username": "rudy", "email": "a@example.com"})
+
+    assert status == 201
+    assert body["message"] == "User metadata added successfully"
+    assert body["user"]["email"] == "a@example.com"
+    assert body["user"]["createdAt"] == aws.Table("User").get_item(Key={"userId": "U1"})["Item"]["createdAt"]
+
+
+def test_non_object_bodies_are_rejected(aws, load_handler):
+    add_fun_fact = load_handler("add_fun_fact")
+
+    for body in ([], "x", 1, None):
+        status, response = post(add_fun_fact, body)
+        assert status == 400
+        assert response["error"] == "Body must be a JSON object"